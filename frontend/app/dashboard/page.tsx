@@ -101,7 +101,7 @@ export default function DashboardPage() {
               status: data.qualitative_analysis_findings?.error ? 'error' : data.qualitative_analysis_findings ? 'complete' : 'pending',
               icon: Eye,
               color: 'purple',
-              output: data.qualitative_analysis_findings || []
+              output: data.qualitative_analysis_findings || data.output?.qualitative_analysis_findings || []
             },
             {
               id: '4',
@@ -110,10 +110,10 @@ export default function DashboardPage() {
               status: data.dollar_impact_summary?.error ? 'error' : data.dollar_impact_summary ? 'complete' : 'pending',
               icon: BarChart3,
               color: 'green',
-              output: data.dollar_impact_summary ? [
-                `Estimated Impact Range: ${data.dollar_impact_summary.estimated_impact_range.join(' - ')}`,
-                `Summary: ${data.dollar_impact_summary.summary_of_impact}`,
-                ...data.dollar_impact_summary.key_contributing_factors
+              output: (data.dollar_impact_summary || data.dollar_impact) ? [
+                `Estimated Impact Range: ${(data.dollar_impact_summary || data.dollar_impact).estimated_impact_range.join(' - ')}`,
+                `Summary: ${(data.dollar_impact_summary || data.dollar_impact).summary_of_impact}`,
+                ...(data.dollar_impact_summary || data.dollar_impact).key_contributing_factors
               ] : []
             },
             {
@@ -145,7 +145,7 @@ export default function DashboardPage() {
                 `Dispute Strength Score: ${data.compliance_review.dispute_strength_score}/10`,
                 ...data.compliance_review.strengths,
                 ...data.compliance_review.weaknesses
-              ] : []
+              ] : data.output?.dispute_letter || []
             }
           ];
           setActiveAgents(agentData);
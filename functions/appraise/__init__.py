@@ -0,0 +1,7 @@
+"""
+Appraisal analysis backend.
+
+`core` holds the lazily initialized SDK clients shared by every function;
+`agents`, `pipeline` and `execution` define and run the agent graph; each
+deployed function lives in its own entry module (see main.FUNCTION_MODULES).
+"""
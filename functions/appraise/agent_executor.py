@@ -0,0 +1,85 @@
+"""Function 4: runs a single agent for a report."""
+import json
+import base64
+import logging
+
+from firebase_functions.pubsub_fn import on_message_published
+
+from .agents import AGENT_MAP, AGENT_SECTIONS
+from .core import get_db, load_parsed_text
+from .execution import (
+    claim_stage, mark_agent_failed, record_suppressed_duplicate, run_agent_function,
+    save_agent_result,
+)
+from .sections import parsed_text_for_agent
+
+@on_message_published(topic="run-agent")
+def agent_executor_v2(event):
+    """
+    Triggered by a message on 'run-agent'. Fetches necessary data,
+    then executes the specified agent.
+    """
+    try:
+        message_data = json.loads(base64.b64decode(event.data.message["data"]).decode('utf-8'))
+        file_id = message_data['fileId']
+        agent_name = message_data['agentName']
+        parsed_text_path = message_data['parsedTextPath']
+    except (json.JSONDecodeError, KeyError) as e:
+        logging.error(f"Failed to parse Pub/Sub message: {e}", exc_info=True)
+        return
+
+    if agent_name not in AGENT_MAP:
+        logging.error(f"[{file_id}] Unknown agent requested: {agent_name}")
+        return
+
+    agent_function, firestore_field, dependencies = AGENT_MAP[agent_name]
+    report_ref = get_db().collection('reports').document(file_id)
+    log_prefix = f"[{file_id}][{agent_name}]"
+
+    try:
+        token, stage_status = claim_stage(report_ref, firestore_field)
+    except Exception as e:
+        logging.error(f"{log_prefix} Failed to claim stage: {e}", exc_info=True)
+        return
+    if token is None:
+        record_suppressed_duplicate(agent_name, stage_status, log_prefix)
+        return
+
+    try:
+        report_data = {}
+        fields = [dep for dep in dependencies if dep != "parsed_text"]
+        if "parsed_text" in dependencies and agent_name in AGENT_SECTIONS:
+            fields.append("sectionIndex")
+        if fields:
+            logging.info(f"{log_prefix} Fetching report fields for dependencies: {fields}")
+            report_doc = report_ref.get(field_paths=fields)
+            if not report_doc.exists:
+                raise FileNotFoundError(f"Report document {file_id} not found.")
+            report_data = report_doc.to_dict()
+            logging.info(f"{log_prefix} Report fields fetched successfully.")
+
+        analysis_context = {"file_id": file_id}
+        for dep in dependencies:
+            if dep == "parsed_text" and "parsedText" in message_data:
+                logging.info(f"{log_prefix} Using parsed text from the message.")
+                analysis_context["parsed_text"] = message_data["parsedText"]
+            elif dep == "parsed_text":
+                analysis_context["parsed_text"] = load_parsed_text(
+                    parsed_text_path, message_data.get("parsedTextGeneration"), log_prefix
+                )
+            else:
+                analysis_context[dep] = report_data.get(dep)
+        if "parsed_text" in analysis_context:
+            analysis_context["parsed_text"] = parsed_text_for_agent(
+                agent_name, analysis_context["parsed_text"], report_data.get("sectionIndex"), log_prefix
+            )
+
+        result = run_agent_function(report_ref, agent_function, firestore_field, analysis_context, log_prefix)
+        save_agent_result(report_ref, firestore_field, result, log_prefix)
+        logging.info(f"{log_prefix} Agent processing finished successfully.")
+
+    except Exception as e:
+        logging.error(f"{log_prefix} An error occurred: {e}", exc_info=True)
+        mark_agent_failed(report_ref, agent_name, firestore_field, e)
+
+    return
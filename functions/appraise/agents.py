@@ -0,0 +1,309 @@
+"""
+The analysis agents. Each takes an analysis context holding the report fields
+it declared in AGENT_MAP and returns the value stored in its result field.
+"""
+import os
+import copy
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from .citation_index import find_learned_citation, get_citation_index, learn_citation, record_citation_lookup
+from .dollar_impact import estimate_impact
+from .llm_cache import generate
+from .red_flags import score_red_flags
+from .sales_grid import ADJUSTMENT_FIELDS
+from .structured import StructuredOutputError, generate_structured
+
+MODEL_NAME = 'gemini-1.5-pro-latest'
+
+def _json_string_line(line):
+    """Shows a streamed line of a JSON array of strings as its string value."""
+    line = line.strip().lstrip('[').rstrip(',]').strip()
+    if not line.startswith('"'):
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+def run_property_info_agent(analysis_context):
+    """Extracts structured property information from the text."""
+    file_id = analysis_context['file_id']
+    parsed_text = analysis_context['parsed_text']
+    logging.info(f"[{file_id}] Running property_info_agent...")
+    prompt = """
+    You are a highly accurate data extraction agent. From the following appraisal text, extract the **Subject Property**'s address, city, state, zip code, county and neighborhood name.
+    **Instructions:**
+    1. Take the values from the subject section of the report, not from the comparables, lender or appraiser.
+    2. If a value is not present, use `null`.
+    """
+    from .schemas import PropertyInfo
+    return generate_structured(
+        MODEL_NAME, f"{prompt}\n\n--- Appraisal Text ---\n{parsed_text}", PropertyInfo, analysis_context,
+        run_property_info_agent
+    )
+
+def resolve_grid_cells(sales_grid, analysis_context):
+    """
+    Completes a sales grid the parser read from the PDF's tables by asking the
+    model only for the cells it could not read. Cells the model cannot resolve
+    keep the parser's value.
+    """
+    file_id = analysis_context['file_id']
+    structured_data = copy.deepcopy(sales_grid['structured_data'])
+    cells = sales_grid.get('ambiguous') or []
+    if not cells:
+        return structured_data
+    logging.info(f"[{file_id}] Resolving {len(cells)} ambiguous sales grid cells...")
+    listing = "\n".join(
+        f"{i}. Comparable {cell['comparable']}, field '{cell['field']}': {json.dumps(cell['text'])}"
+        if cell['comparable'] is not None else f"{i}. Field '{cell['field']}' of the whole grid"
+        for i, cell in enumerate(cells)
+    )
+    prompt = f"""
+    You are a highly accurate data extraction agent. A "Sales Comparison Approach" grid was read from an appraisal, but these cells could not be interpreted:
+    {listing}
+    **Instructions:**
+    Using the appraisal text below, give each cell's value: `number` for prices, adjustments, areas and distances (negative for downward adjustments), `text` for addresses and dates. Leave both `null` if it cannot be determined.
+    **Output:**
+    Return one entry per cell, with `cell` set to its number.
+    """
+    from .schemas import GridCells
+    try:
+        resolved = generate_structured(
+            MODEL_NAME, f"{prompt}\n\n--- Appraisal Text ---\n{analysis_context['parsed_text']}", GridCells,
+            analysis_context, resolve_grid_cells
+        )
+    except StructuredOutputError as e:
+        logging.error(f"[{file_id}] Failed to resolve sales grid cells: {e}")
+        return structured_data
+    values = {
+        str(entry['cell']): entry['number'] if entry['number'] is not None else entry['text'] for entry in resolved
+    }
+
+    comparables = {comparable['id']: comparable for comparable in structured_data['comparables']}
+    for i, cell in enumerate(cells):
+        if str(i) not in values:
+            continue
+        if cell['comparable'] is None:
+            structured_data[cell['field']] = values[str(i)]
+        elif cell['field'] in ADJUSTMENT_FIELDS:
+            comparables[cell['comparable']]['adjustments'][cell['field']] = values[str(i)]
+        else:
+            comparables[cell['comparable']][cell['field']] = values[str(i)]
+    return structured_data
+
+def run_sales_comp_agent(analysis_context):
+    """
+    Extracts the sales comparison approach data grid. When the parser already
+    read the grid from the PDF's tables, only its ambiguous cells go to the model.
+    The parser's effective date is stored with it, for measuring sale ages.
+    """
+    file_id = analysis_context['file_id']
+    parsed_text = analysis_context['parsed_text']
+    logging.info(f"[{file_id}] Running sales_comp_agent...")
+    sales_grid = analysis_context.get('salesGrid')
+    if sales_grid and sales_grid.get('structured_data'):
+        structured_data = resolve_grid_cells(sales_grid, analysis_context)
+        structured_data.setdefault('effective_date', analysis_context.get('effectiveDate'))
+        return structured_data
+    prompt = """
+    You are a highly accurate data extraction agent. From the following "Sales Comparison Approach" text, extract the structured data for the **Subject Property** and all **Comparable Sales**.
+    **Instructions:**
+    1. Number the comparables as the report does, starting at 1.
+    2. Adjustments are signed dollar amounts. If a value is not present, use `null`.
+    """
+    from .schemas import SalesComparison
+    structured_data = generate_structured(
+        MODEL_NAME, f"{prompt}\n\n--- Appraisal Text ---\n{parsed_text}", SalesComparison, analysis_context,
+        run_sales_comp_agent
+    )
+    structured_data['effective_date'] = analysis_context.get('effectiveDate')
+    return structured_data
+
+def run_qualitative_analysis(analysis_context):
+    """Performs a qualitative analysis of the appraisal narrative."""
+    file_id = analysis_context['file_id']
+    parsed_text = analysis_context['parsed_text']
+    logging.info(f"[{file_id}] Running qualitative_analysis_agent...")
+    prompt = """
+    You are a **Senior Appraisal Reviewer**. Your task is to conduct a qualitative analysis of the provided appraisal text.
+    **Analysis Directives:**
+    1.  **Identify Flaws:** Scrutinize the text for logical fallacies, unsupported conclusions, and inconsistencies.
+    2.  **Detect Bias:** Look for subtle language or patterns that could indicate bias.
+    3.  **Assess Professionalism:** Evaluate the overall quality of the narrative.
+    **Output Structure:**
+    Provide your analysis as a JSON array of strings. Each string should be a single, concise sentence.
+    Put each string on its own line.
+    Example: `["The report uses boilerplate language.", "The adjustments for the comparables are not well-supported."]`
+    """
+    from .schemas import QualitativeFindings
+    return generate_structured(
+        MODEL_NAME, f"{prompt}\n\n--- Appraisal Text ---\n{parsed_text}", QualitativeFindings, analysis_context,
+        run_qualitative_analysis, stream=True, format_line=_json_string_line
+    )
+
+def run_red_flag_agent(analysis_context):
+    """Evaluates the declarative red flag rules (see red_flags.py) over the comparables."""
+    file_id = analysis_context['file_id']
+    structured_data = analysis_context.get('structured_data', {})
+    logging.info(f"[{file_id}] Running red_flag_agent...")
+    if not structured_data or "error" in structured_data:
+        logging.warning(f"[{file_id}] Skipping Red Flag agent due to missing or invalid structured data.")
+        return []
+    red_flags = score_red_flags(structured_data)
+    flagged = sum(flag['status'] == 'Flagged' for flag in red_flags)
+    logging.info(f"[{file_id}] Red Flag agent completed: {flagged}/{len(red_flags)} rules flagged.")
+    return red_flags
+
+# The dollar impact numbers are computed; the model only narrates them, and
+# only when this is on.
+IMPACT_SUMMARY_LLM = os.getenv('IMPACT_SUMMARY_LLM', '1') == '1'
+
+def run_dollar_impact_agent(analysis_context):
+    """Computes the impact range and its contributing factors from the sales grid (see dollar_impact.py)."""
+    file_id = analysis_context['file_id']
+    logging.info(f"[{file_id}] Running dollar_impact_agent...")
+    structured_data = analysis_context.get('structured_data') or {}
+    return estimate_impact(structured_data)
+
+def run_impact_summary_agent(analysis_context):
+    """
+    Narrates the computed dollar impact in light of the qualitative findings.
+    The numbers are kept as computed; only summary_of_impact is written by the
+    model, and only when IMPACT_SUMMARY_LLM is on.
+    """
+    file_id = analysis_context['file_id']
+    dollar_impact = analysis_context.get('dollar_impact') or {}
+    if not IMPACT_SUMMARY_LLM or not dollar_impact.get('key_contributing_factors'):
+        return dollar_impact
+    logging.info(f"[{file_id}] Running impact_summary_agent...")
+    low, high = dollar_impact['estimated_impact_range']
+    prompt = f"""
+    You are a **Forensic Accountant**. In two or three sentences, explain to a homeowner what the computed impact below means for their appraisal. Do not change or add numbers.
+    **Input:**
+    - Estimated Impact Range: ${low:,} to ${high:,}
+    - Contributing Factors: {json.dumps(dollar_impact['key_contributing_factors'])}
+    - Qualitative Findings: {json.dumps(analysis_context.get('qualitative_analysis_findings') or [])}
+    **Output:**
+    A JSON object with "summary_of_impact": "<string>".
+    """
+    from .schemas import ImpactSummary
+    summary = generate_structured(MODEL_NAME, prompt, ImpactSummary, analysis_context, run_impact_summary_agent)
+    return {**dollar_impact, "summary_of_impact": summary["summary_of_impact"]}
+
+def run_compilation_agent(analysis_context):
+    """Compiles the executive summary and strategic recommendations."""
+    file_id = analysis_context['file_id']
+    logging.info(f"[{file_id}] Running compilation_agent...")
+    prompt = f"""
+    You are a **Lead Appraisal Analyst**. Synthesize the findings into a coherent summary.
+    **Input:**
+    - Qualitative Findings: {json.dumps(analysis_context.get('qualitative_analysis_findings', []), indent=2)}
+    **Output:**
+    Provide your analysis as a JSON object with "executive_summary": "<string>" and "strategic_recommendations": ["<string>"].
+    """
+    from .schemas import Compilation
+    return generate_structured(MODEL_NAME, prompt, Compilation, analysis_context, run_compilation_agent)
+
+# Upper bound on concurrent citation requests per report.
+CITATION_CONCURRENCY = int(os.getenv('CITATION_CONCURRENCY', '4'))
+
+def cite_red_flag(flag, analysis_context):
+    """
+    Finds a citation for a single red flag in the citation index, asking the
+    model only for rule names the index does not know. Failures are recorded on
+    the flag's citation.
+    """
+    log_prefix = f"[{analysis_context['file_id']}]"
+    entry = get_citation_index().lookup(flag)
+    outcome = 'indexed'
+    if entry is None:
+        entry = find_learned_citation(flag.get('rule_name'))
+        outcome = 'learned'
+    if entry is not None:
+        record_citation_lookup(outcome, log_prefix)
+        return {"flag": flag, "citation": {"citation": entry["citation"], "explanation": entry["explanation"]}}
+
+    prompt = f"""
+    You are a **Paralegal**. For the following red flag, provide a specific legal or statutory citation it may violate (e.g., USPAP, Fannie Mae Selling Guide).
+    **Red Flag:** {json.dumps(flag)}
+    **Output:**
+    Provide your analysis as a JSON object with "citation": "<string>" and "explanation": "<string>".
+    """
+    try:
+        from .schemas import Citation
+        citation_data = generate_structured(MODEL_NAME, prompt, Citation, analysis_context, cite_red_flag)
+    except Exception as e:
+        logging.error(f"{log_prefix} Failed to generate citation for {flag.get('rule_name')}: {e}")
+        return {"flag": flag, "citation": {"error": "Failed to generate citation."}}
+    record_citation_lookup('generated', log_prefix)
+    learn_citation(flag, citation_data, log_prefix)
+    return {"flag": flag, "citation": citation_data}
+
+def run_citation_agent(analysis_context):
+    """Finds legal or statutory citations for red flags, several flags at a time."""
+    file_id = analysis_context['file_id']
+    red_flags = analysis_context.get('red_flags', [])
+    logging.info(f"[{file_id}] Running citation_agent...")
+    flagged = [flag for flag in red_flags if flag.get('status') == 'Flagged']
+    if len(flagged) <= 1:
+        return [cite_red_flag(flag, analysis_context) for flag in flagged]
+    # map() yields results in input order, whatever order they finish in.
+    with ThreadPoolExecutor(max_workers=min(CITATION_CONCURRENCY, len(flagged))) as executor:
+        return list(executor.map(lambda flag: cite_red_flag(flag, analysis_context), flagged))
+
+def run_dispute_letter_agent(analysis_context):
+    """Generates a draft of the dispute letter."""
+    file_id = analysis_context['file_id']
+    logging.info(f"[{file_id}] Running dispute_letter_agent...")
+    prompt = f"""
+    You are the **borrower**. Write a formal Reconsideration of Value letter based on the provided information.
+    **Key Issues:** {json.dumps(analysis_context.get('citations', []), indent=2)}
+    **Property Info:** {json.dumps(analysis_context.get('property_info', {}), indent=2)}
+    **Appraised Value:** {analysis_context.get('structured_data', {}).get('sales_comparison_value')}
+    **Borrower Name:** {analysis_context.get('fullName') or '[Your Full Name]'}
+    **Instructions:**
+    - Write a firm, evidence-based letter, signed with the borrower's name.
+    - Do not suggest an alternative value.
+    - Keep it concise.
+    **Output:**
+    Return only the text of the letter as a single string.
+    """
+    return generate(MODEL_NAME, prompt, analysis_context, run_dispute_letter_agent, stream=True)
+
+def run_compliance_agent(analysis_context):
+    """Reviews the generated dispute letter for compliance."""
+    file_id = analysis_context['file_id']
+    logging.info(f"[{file_id}] Running compliance_agent...")
+    prompt = f"""
+    You are a **Compliance Agent**. Review the following dispute letter and provide a strength score and feedback.
+    **Letter:** {analysis_context.get('dispute_letter', '')}
+    **Output:**
+    Provide your analysis as a JSON object with "dispute_strength_score": <number>, "strengths": ["<string>"], and "weaknesses": ["<string>"].
+    """
+    from .schemas import ComplianceReview
+    return generate_structured(MODEL_NAME, prompt, ComplianceReview, analysis_context, run_compliance_agent)
+
+AGENT_MAP = {
+    "run_property_info_agent": (run_property_info_agent, "property_info", ["parsed_text"]),
+    "run_sales_comp_agent": (run_sales_comp_agent, "structured_data", ["parsed_text", "salesGrid", "effectiveDate"]),
+    "run_qualitative_analysis": (run_qualitative_analysis, "qualitative_analysis_findings", ["parsed_text"]),
+    "run_red_flag_agent": (run_red_flag_agent, "red_flags", ["structured_data"]),
+    "run_dollar_impact_agent": (run_dollar_impact_agent, "dollar_impact", ["structured_data"]),
+    "run_impact_summary_agent": (run_impact_summary_agent, "dollar_impact_summary", ["dollar_impact", "qualitative_analysis_findings"]),
+    "run_compilation_agent": (run_compilation_agent, "compilation", ["qualitative_analysis_findings"]),
+    "run_citation_agent": (run_citation_agent, "citations", ["red_flags"]),
+    "run_dispute_letter_agent": (run_dispute_letter_agent, "dispute_letter", ["citations", "property_info", "structured_data", "fullName"]),
+    "run_compliance_agent": (run_compliance_agent, "compliance", ["dispute_letter"])
+}
+
+ANALYSIS_STAGES = [firestore_field for _, firestore_field, _ in AGENT_MAP.values()]
+
+# Agents that only need part of the report, by the heading titles of the
+# sections they read (matched case-insensitively). Others get the whole text.
+AGENT_SECTIONS = {
+    "run_property_info_agent": ["subject"],
+    "run_sales_comp_agent": ["sales comparison"],
+}
@@ -0,0 +1,165 @@
+"""
+Citation knowledge base for red flags: the bundled citations (citations.json)
+plus those learned from the model for rule names it did not know, kept in the
+`citation_index` collection. Flags are looked up by rule name, then by a BM25
+keyword search over each entry's rule name and keywords; only flags neither
+finds go to the model, and its answer is added to the index for next time.
+A search result is only used when it covers the terms that distinguish the
+flag's rule name, so an unknown rule is never given a look-alike's citation.
+"""
+import os
+import re
+import json
+import math
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+from .core import get_db, record_metric
+
+BUNDLED_CITATIONS_PATH = os.path.join(os.path.dirname(__file__), 'citations.json')
+
+# A keyword match is only used when it covers at least this fraction of the
+# flag's rule name terms, weighted by their IDF: generic terms ('excessive',
+# 'adjustment') count little, rare or unindexed ones ('site') count most.
+CITATION_MIN_OVERLAP = float(os.getenv('CITATION_MIN_OVERLAP', '0.75'))
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = {
+    "a", "an", "and", "are", "at", "be", "by", "for", "from", "in", "is", "not", "of", "on", "or", "over", "than",
+    "the", "to", "too", "under", "very", "with", "comp",
+}
+
+def terms(text):
+    """Lowercase word terms of `text`, without stopwords, numbers or plural 's'."""
+    words = re.findall(r'[a-z][a-z0-9]*', (text or '').lower())
+    return [word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+            for word in words if word not in STOPWORDS]
+
+def rule_key(rule_name):
+    """Normalized rule name, used as the entry's key and document id."""
+    return "-".join(terms(rule_name)) or "unnamed"
+
+class CitationIndex:
+    """An in-memory BM25 index of citation entries ({rule_name, keywords, citation, explanation})."""
+
+    def __init__(self, entries=()):
+        self.entries = []
+        self.by_rule = {}
+        self.postings = {}
+        self.lengths = []
+        self.total_length = 0
+        self.lock = threading.Lock()
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry):
+        with self.lock:
+            key = rule_key(entry['rule_name'])
+            if key in self.by_rule:
+                return
+            document = len(self.entries)
+            document_terms = terms(entry['rule_name']) + terms(" ".join(entry.get('keywords') or []))
+            for term, count in Counter(document_terms).items():
+                self.postings.setdefault(term, {})[document] = count
+            self.entries.append(entry)
+            self.lengths.append(len(document_terms))
+            self.total_length += len(document_terms)
+            self.by_rule[key] = entry
+
+    def idf(self, term):
+        """BM25 inverse document frequency of a term; highest for terms no entry has."""
+        document_count = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.entries) - document_count + 0.5) / (document_count + 0.5))
+
+    def search(self, query):
+        """Returns the best (entry, score) for `query` by BM25, or (None, 0)."""
+        with self.lock:
+            if not self.entries:
+                return None, 0
+            average_length = self.total_length / len(self.entries)
+            scores = Counter()
+            for term in set(terms(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = self.idf(term)
+                for document, count in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[document] / average_length)
+                    scores[document] += idf * count * (BM25_K1 + 1) / (count + norm)
+            if not scores:
+                return None, 0
+            document, score = scores.most_common(1)[0]
+            return self.entries[document], score
+
+    def lookup(self, flag):
+        """Returns the entry for a red flag: by rule name, else by keyword search; None if unknown."""
+        rule_name = flag.get('rule_name') or ''
+        entry = self.by_rule.get(rule_key(rule_name))
+        if entry is not None:
+            return entry
+        entry, _ = self.search(f"{rule_name} {flag.get('details') or ''}")
+        if entry is None:
+            return None
+        name_terms = set(terms(rule_name))
+        entry_terms = set(terms(entry['rule_name'])) | set(terms(" ".join(entry.get('keywords') or [])))
+        with self.lock:
+            weights = {term: self.idf(term) for term in name_terms}
+        total = sum(weights.values())
+        if not total or sum(weights[term] for term in name_terms & entry_terms) / total < CITATION_MIN_OVERLAP:
+            return None
+        return entry
+
+_citation_index = None
+_citation_index_lock = threading.Lock()
+
+def get_citation_index():
+    """The instance's citation index: the bundled entries plus every learned one, loaded once."""
+    global _citation_index
+    if _citation_index is None:
+        with _citation_index_lock:
+            if _citation_index is None:
+                with open(BUNDLED_CITATIONS_PATH) as f:
+                    index = CitationIndex(json.load(f))
+                try:
+                    for snapshot in get_db().collection('citation_index').stream():
+                        index.add(snapshot.to_dict())
+                except Exception as e:
+                    logging.warning(f"Failed to load learned citations: {e}")
+                _citation_index = index
+    return _citation_index
+
+def find_learned_citation(rule_name):
+    """Reads a citation another instance learned after this one loaded its index."""
+    try:
+        snapshot = get_db().collection('citation_index').document(rule_key(rule_name)).get()
+    except Exception as e:
+        logging.warning(f"Failed to read learned citation for {rule_name}: {e}")
+        return None
+    if not snapshot.exists:
+        return None
+    entry = snapshot.to_dict()
+    get_citation_index().add(entry)
+    return entry
+
+def learn_citation(flag, citation, log_prefix):
+    """Adds a model-generated citation for an unknown rule name to the index and persists it."""
+    entry = {
+        'rule_name': flag.get('rule_name') or '',
+        'keywords': terms(flag.get('details')),
+        'citation': citation['citation'],
+        'explanation': citation['explanation'],
+    }
+    get_citation_index().add(entry)
+    try:
+        get_db().collection('citation_index').document(rule_key(entry['rule_name'])).set(
+            {**entry, 'createdAt': datetime.now(timezone.utc)}
+        )
+    except Exception as e:
+        logging.warning(f"{log_prefix} Failed to persist learned citation: {e}")
+
+def record_citation_lookup(outcome, log_prefix):
+    """Records a citation lookup as a `citation_index` metric: 'indexed', 'learned' or 'generated'."""
+    record_metric('citation_index', log_prefix, outcome=outcome)
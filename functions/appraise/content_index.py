@@ -0,0 +1,70 @@
+"""Content-addressed index of parsed uploads, used to deduplicate re-uploads."""
+import logging
+
+from .agents import ANALYSIS_STAGES
+from .core import get_db, get_firestore, record_metric, snapshot_field
+from .pipeline import PARSED_FIELDS, PARSING_STAGE, REPORT_INPUT_FIELDS, dependent_stages
+
+# `content_index/{uid}_{md5}` points at the first report a user parsed from a
+# given PDF, so their re-uploads of identical bytes reuse its parse and
+# document-derived results. The MD5 is the hex digest Cloud Storage reports for
+# the upload. Keys are per user: one user's upload never reaches another's report.
+def content_index_ref(uid, content_digest):
+    return get_db().collection('content_index').document(f"{uid}_{content_digest}")
+
+def index_parsed_content(uid, content_digest, file_id, parsed_text_path, parsed_text_generation, parsed_text_bytes):
+    """Records a successfully parsed upload in the user's content index."""
+    content_index_ref(uid, content_digest).set({
+        'fileId': file_id,
+        'parsedTextPath': parsed_text_path,
+        'parsedTextGeneration': parsed_text_generation,
+        'parsedTextBytes': parsed_text_bytes,
+        'indexedAt': get_firestore().SERVER_TIMESTAMP
+    })
+
+def seed_from_duplicate(uid, content_digest, log_prefix):
+    """
+    Looks up an earlier report the user parsed from the same bytes. On a hit,
+    returns the fields to seed the new report with: the earlier parse plus every
+    completed result that does not depend on per-upload inputs. Returns None on
+    a miss.
+    """
+    entry = content_index_ref(uid, content_digest).get()
+    if not entry.exists:
+        return None
+    index = entry.to_dict()
+
+    upload_specific = dependent_stages(REPORT_INPUT_FIELDS)
+    reusable = [stage for stage in ANALYSIS_STAGES if stage not in upload_specific]
+    source = get_db().collection('reports').document(index['fileId']).get(
+        field_paths=['stages', 'sectionIndex'] + PARSED_FIELDS + reusable
+    )
+    if not source.exists:
+        return None
+    source_stages = snapshot_field(source, 'stages', {})
+
+    seeded = {
+        'parsedTextPath': index['parsedTextPath'],
+        'parsedTextGeneration': index.get('parsedTextGeneration'),
+        'parsedTextBytes': index.get('parsedTextBytes'),
+        'sectionIndex': snapshot_field(source, 'sectionIndex', []),
+        'executionMode': 'distributed',
+        'dedupedFrom': index['fileId'],
+        'stages': {PARSING_STAGE: 'complete'}
+    }
+    for field in PARSED_FIELDS:
+        if snapshot_field(source, field) is not None:
+            seeded[field] = snapshot_field(source, field)
+    for stage in reusable:
+        if source_stages.get(stage) == 'complete':
+            seeded[stage] = snapshot_field(source, stage)
+            seeded['stages'][stage] = 'complete'
+    logging.info(f"{log_prefix} Duplicate of report '{index['fileId']}'; reusing stages {sorted(seeded['stages'])}.")
+    return seeded
+
+def record_upload(duplicate, log_prefix):
+    """
+    Records a new report as a `pipeline_runs` metric, marked as a rerun when its
+    PDF was already processed, so the rate of reports run again by hand is tracked.
+    """
+    record_metric('pipeline_runs', log_prefix, rerun=duplicate)
@@ -0,0 +1,202 @@
+"""
+Shared core for every function: lazily loaded SDKs and clients, Pub/Sub
+publishing, the parsed text cache and small Firestore helpers. Importing this
+module loads nothing beyond the standard library.
+"""
+import os
+import json
+import logging
+import threading
+from functools import lru_cache
+
+_firebase_admin = None
+_firestore = None
+_storage = None
+_auth = None
+_pubsub_v1 = None
+_genai = None
+_pymupdf4llm = None
+
+# --- Lazy Initialization Helpers ---
+# Nothing below runs at import time: SDK modules, clients, the Firebase app and
+# topic paths are all created on first use, so cold starts only pay for what the
+# invoked function actually touches.
+def get_firebase_admin():
+    global _firebase_admin
+    if _firebase_admin is None:
+        import firebase_admin
+        _firebase_admin = firebase_admin
+        _firebase_admin.initialize_app()
+    return _firebase_admin
+
+def get_firestore():
+    global _firestore
+    if _firestore is None:
+        get_firebase_admin()
+        from firebase_admin import firestore
+        _firestore = firestore
+    return _firestore
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        get_firebase_admin()
+        from firebase_admin import storage
+        _storage = storage
+    return _storage
+
+def get_pubsub():
+    global _pubsub_v1
+    if _pubsub_v1 is None:
+        from google.cloud import pubsub_v1
+        _pubsub_v1 = pubsub_v1
+    return _pubsub_v1
+
+def get_genai():
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        _genai = genai
+        _genai.configure(api_key=os.getenv("LLM_API_KEY"))
+    return _genai
+
+def get_pymupdf():
+    global _pymupdf4llm
+    if _pymupdf4llm is None:
+        import pymupdf4llm
+        _pymupdf4llm = pymupdf4llm
+    return _pymupdf4llm
+
+def open_pdf(pdf_bytes):
+    """Opens PDF bytes as a pymupdf Document."""
+    import pymupdf
+    return pymupdf.open(stream=pdf_bytes, filetype="pdf")
+
+# --- Clients ---
+@lru_cache(maxsize=None)
+def get_db():
+    return get_firestore().client()
+
+# Messages are published in bursts (a whole dispatch at once), so a short batch
+# window lets a burst share one publish request without delaying it noticeably.
+PUBLISH_MAX_LATENCY_SEC = 0.005
+PUBLISH_TIMEOUT_SEC = 30
+
+@lru_cache(maxsize=None)
+def get_publisher():
+    pubsub_v1 = get_pubsub()
+    batch_settings = pubsub_v1.types.BatchSettings(max_messages=100, max_latency=PUBLISH_MAX_LATENCY_SEC)
+    return pubsub_v1.PublisherClient(batch_settings=batch_settings)
+
+@lru_cache(maxsize=None)
+def get_project_id():
+    # Get project ID from environment or Firebase
+    return os.getenv('GCP_PROJECT') or get_firebase_admin().get_app().project_id
+
+@lru_cache(maxsize=None)
+def get_storage_client():
+    return get_storage().bucket(f"{get_project_id()}.appspot.com")
+
+logging.basicConfig(level=logging.INFO)
+
+# --- Topic Paths ---
+@lru_cache(maxsize=None)
+def get_topic_path(topic):
+    # Same format as PublisherClient.topic_path, without constructing a client.
+    return f"projects/{get_project_id()}/topics/{topic}"
+
+# --- Publishing ---
+def publish_messages(messages, log_prefix):
+    """
+    Publishes a list of (topic_path, message_data) pairs. All messages are
+    submitted before any is awaited, so they are batched and sent together.
+    Returns the (message_data, error) pairs that failed to publish.
+    """
+    pending = []
+    failures = []
+    for topic_path, message_data in messages:
+        message_bytes = json.dumps(message_data).encode('utf-8')
+        try:
+            pending.append((message_data, get_publisher().publish(topic_path, data=message_bytes)))
+        except Exception as e:
+            failures.append((message_data, e))
+
+    for message_data, future in pending:
+        try:
+            future.result(timeout=PUBLISH_TIMEOUT_SEC)
+        except Exception as e:
+            failures.append((message_data, e))
+
+    for message_data, error in failures:
+        logging.error(f"{log_prefix} Failed to publish message {message_data}: {error}")
+    logging.info(f"{log_prefix} Published {len(messages) - len(failures)}/{len(messages)} messages.")
+    return failures
+
+# --- Parsed Text Cache ---
+# Agents that read the parsed Markdown often land on the same warm instance, so
+# downloads are cached per instance, keyed by object path and generation.
+PARSED_TEXT_CACHE_MAX_BYTES = int(os.getenv('PARSED_TEXT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Parses up to this size travel inside the run-agent message instead.
+PARSED_TEXT_INLINE_MAX_BYTES = int(os.getenv('PARSED_TEXT_INLINE_MAX_BYTES', str(150 * 1024)))
+
+_parsed_text_cache = None
+_parsed_text_cache_lock = threading.Lock()
+parsed_text_cache_stats = {"hits": 0, "misses": 0}
+
+def get_parsed_text_cache():
+    global _parsed_text_cache
+    if _parsed_text_cache is None:
+        import cachetools
+        _parsed_text_cache = cachetools.LRUCache(maxsize=PARSED_TEXT_CACHE_MAX_BYTES, getsizeof=len)
+    return _parsed_text_cache
+
+def load_parsed_text(parsed_text_path, generation=None, log_prefix=""):
+    """
+    Returns the parsed Markdown stored at `parsed_text_path`, served from the
+    instance cache when this generation of the object was downloaded before.
+    Without a known generation the current one is looked up first, so a
+    re-parsed document is never served stale.
+    """
+    bucket = get_storage_client()
+    if generation is None:
+        blob = bucket.get_blob(parsed_text_path)
+        if blob is None:
+            raise FileNotFoundError(f"Parsed text '{parsed_text_path}' not found.")
+        generation = blob.generation
+    key = (parsed_text_path, int(generation))
+
+    cache = get_parsed_text_cache()
+    with _parsed_text_cache_lock:
+        data = cache.get(key)
+        parsed_text_cache_stats["hits" if data is not None else "misses"] += 1
+
+    if data is None:
+        logging.info(f"{log_prefix} Downloading parsed text from '{parsed_text_path}' (generation {generation})...")
+        data = bucket.blob(parsed_text_path, generation=generation).download_as_bytes()
+        with _parsed_text_cache_lock:
+            try:
+                cache[key] = data
+            except ValueError:
+                pass  # Larger than the whole cache; never cached.
+
+    logging.info(f"{log_prefix} Parsed text loaded. Cache stats: {parsed_text_cache_stats}")
+    return data.decode('utf-8')
+
+def snapshot_field(snapshot, field, default=None):
+    """Reads a single top-level field from a document snapshot."""
+    try:
+        value = snapshot.get(field)
+    except KeyError:
+        return default
+    return default if value is None else value
+
+# --- Metrics ---
+# Counters are emitted as structured log entries rather than Firestore
+# increments: one JSON line on stdout, which Cloud Logging stores as the
+# entry's jsonPayload. Log-based metrics count them, filtered on
+# jsonPayload.metric and labelled by the other fields, so recording one costs
+# no request and no write to a shared document on the caller's path.
+def record_metric(metric, log_prefix="", **fields):
+    """Emits one `metric` event, with `fields` as its labels and values."""
+    entry = {'severity': 'INFO', 'message': f"{log_prefix} {metric}".strip(), 'metric': metric, **fields}
+    print(json.dumps(entry, default=str), flush=True)
@@ -0,0 +1,92 @@
+"""
+Deterministic dollar impact of a report's sales grid, computed from the same
+comparable columns as the red flag rules (see red_flags.py):
+
+- low: how far the opinion of value sits from the median adjusted sale price,
+  or outside the range of adjusted sale prices, whichever is larger;
+- high: low plus the share of net adjustments beyond the net adjustment rule's
+  threshold (averaged over the comparables) plus half the adjusted price spread.
+
+Amounts are rounded to IMPACT_ROUNDING dollars.
+"""
+from .red_flags import RULES, build_tables
+
+IMPACT_ROUNDING = 100
+
+def _threshold(column):
+    return next(threshold for _, rule_column, _, threshold, _ in RULES if rule_column == column)
+
+def _round(amount):
+    return int(round(amount / IMPACT_ROUNDING) * IMPACT_ROUNDING)
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+def estimate_impacts(reports, as_of=None):
+    """
+    Estimates the dollar impact of every report in `reports` (structured_data
+    dicts) in one pass over their comparable columns. Returns one dict per
+    report with estimated_impact_range, summary_of_impact and
+    key_contributing_factors.
+    """
+    comparables, _ = build_tables(reports, as_of)
+    net_threshold = _threshold("net_adjustment_pct")
+    rows = [[] for _ in reports]
+    for row, index in enumerate(comparables["report"]):
+        rows[index].append(row)
+
+    impacts = []
+    for structured_data, report_rows in zip(reports, rows):
+        value = (structured_data or {}).get('sales_comparison_value') if isinstance(structured_data, dict) else None
+        adjusted = [comparables["adjusted_price"][row] for row in report_rows
+                    if comparables["adjusted_price"][row] is not None]
+        if not isinstance(value, (int, float)) or not value or not adjusted:
+            impacts.append({
+                "estimated_impact_range": [0, 0],
+                "summary_of_impact": "The sales grid does not give an opinion of value and adjusted sale prices to measure against.",
+                "key_contributing_factors": [],
+            })
+            continue
+
+        factors = []
+        median = _median(adjusted)
+        low_price, high_price = min(adjusted), max(adjusted)
+        reconciliation_gap = abs(value - median)
+        if reconciliation_gap:
+            direction = "above" if value > median else "below"
+            factors.append(f"Opinion of value ${value:,.0f} is ${reconciliation_gap:,.0f} {direction} "
+                           f"the median adjusted sale price (${median:,.0f}).")
+        bracket_gap = max(low_price - value, value - high_price, 0)
+        if bracket_gap:
+            factors.append(f"Opinion of value falls ${bracket_gap:,.0f} outside the adjusted sale prices "
+                           f"(${low_price:,.0f} to ${high_price:,.0f}).")
+
+        excess = {}
+        for row in report_rows:
+            sale_price, net = comparables["sale_price"][row], comparables["net_adjustment"][row]
+            if sale_price and net is not None and abs(net) > net_threshold * sale_price:
+                excess[comparables["comp"][row]] = abs(net) - net_threshold * sale_price
+        flagged_excess = sum(excess.values()) / len(report_rows)
+        if excess:
+            comps = ", ".join(f"Comp {comp}" for comp in excess)
+            factors.append(f"Net adjustments exceed {net_threshold:.0%} of sale price by "
+                           f"${sum(excess.values()):,.0f} in total ({comps}).")
+        half_spread = (high_price - low_price) / 2
+        if half_spread:
+            factors.append(f"Adjusted sale prices span ${high_price - low_price:,.0f}.")
+
+        low = _round(max(reconciliation_gap, bracket_gap))
+        high = max(low, _round(max(reconciliation_gap, bracket_gap) + flagged_excess + half_spread))
+        impacts.append({
+            "estimated_impact_range": [low, high],
+            "summary_of_impact": f"Based on the sales grid, the opinion of value may be misstated by "
+                                 f"${low:,} to ${high:,}.",
+            "key_contributing_factors": factors,
+        })
+    return impacts
+
+def estimate_impact(structured_data, as_of=None):
+    """Estimates one report's dollar impact; see estimate_impacts."""
+    return estimate_impacts([structured_data], as_of)[0]
@@ -0,0 +1,278 @@
+"""
+Running agents against a report: stage leases, 'running'/'complete'/'failed'
+transitions, and the in-process agent graph used by the fast lane.
+"""
+import os
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from .agents import AGENT_MAP
+from .core import get_db, get_firestore, record_metric, snapshot_field
+from .sections import parsed_text_for_agent
+from .streaming import STREAM_AGENT_OUTPUT, OutputStream
+
+# A stage is only marked 'running' once its agent has been busy for this long, so
+# fast agents go straight from 'pending' to 'complete' in a single write. Set to 0
+# to always write 'running' before the agent starts.
+RUNNING_WRITE_DELAY_SEC = float(os.getenv('RUNNING_WRITE_DELAY_SEC', '2'))
+
+@contextmanager
+def stage_running(report_ref, firestore_field, log_prefix, delay=RUNNING_WRITE_DELAY_SEC):
+    """
+    Marks a stage 'running' while the block executes. The write is deferred by
+    `delay` seconds and skipped if the block finishes first; it never lands after
+    the block has exited, so it cannot overwrite a later 'complete'.
+    """
+    lock = threading.Lock()
+    state = {"done": False}
+
+    def write_running():
+        with lock:
+            if state["done"]:
+                return
+            try:
+                logging.info(f"{log_prefix} Updating stage to 'running'.")
+                report_ref.set({'stages': {firestore_field: 'running'}}, merge=True)
+            except Exception as e:
+                logging.warning(f"{log_prefix} Failed to mark stage as running: {e}")
+
+    if delay <= 0:
+        write_running()
+        yield
+        return
+
+    timer = threading.Timer(delay, write_running)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    finally:
+        with lock:
+            state["done"] = True
+        timer.cancel()
+
+def run_agent_function(report_ref, agent_function, firestore_field, analysis_context, log_prefix):
+    """
+    Runs an agent function, marking its stage 'running' if it is not fast. Agents
+    that stream their response write partial output through the OutputStream
+    attached to the context.
+    """
+    stream = None
+    if STREAM_AGENT_OUTPUT:
+        stream = OutputStream(report_ref, firestore_field, log_prefix)
+        analysis_context = {**analysis_context, "output_stream": stream}
+    with stage_running(report_ref, firestore_field, log_prefix):
+        logging.info(f"{log_prefix} Executing agent function...")
+        result = agent_function(analysis_context)
+    if stream is not None and stream.chunks:
+        logging.info(f"{log_prefix} Streamed {stream.chunks} chunks in {stream.writes} partial output writes.")
+    logging.info(f"{log_prefix} Agent execution complete.")
+    return result
+
+# How long a claimed stage stays reserved for the worker that claimed it. Longer
+# than the agent executor's timeout, so a lease only expires once its worker is
+# gone; the fast lane's leases end at its own deadline instead.
+STAGE_LEASE_SEC = int(os.getenv('STAGE_LEASE_SEC', '600'))
+
+def claim_stage(report_ref, firestore_field, lease_sec=STAGE_LEASE_SEC):
+    """
+    Transactionally claims a stage for this worker by writing a lease under
+    `leases.<stage>` that expires after `lease_sec`. Returns (token, stage_status);
+    the token is None when the stage is already complete or held by another
+    worker's unexpired lease.
+    """
+    firestore = get_firestore()
+    stage_path = f"stages.{firestore_field}"
+    lease_path = f"leases.{firestore_field}"
+
+    @firestore.transactional
+    def claim(transaction):
+        snapshot = report_ref.get(field_paths=[stage_path, lease_path], transaction=transaction)
+        if not snapshot.exists:
+            raise FileNotFoundError(f"Report document {report_ref.id} not found.")
+        status = snapshot_field(snapshot, stage_path, 'pending')
+        if status == 'complete':
+            return None, status
+
+        now = datetime.now(timezone.utc)
+        lease = snapshot_field(snapshot, lease_path, {})
+        if lease.get('expiresAt') and lease['expiresAt'] > now:
+            return None, status
+
+        token = uuid.uuid4().hex
+        transaction.update(report_ref, {
+            lease_path: {'token': token, 'expiresAt': now + timedelta(seconds=lease_sec)}
+        })
+        return token, status
+
+    return claim(get_db().transaction())
+
+def release_stage(report_ref, firestore_field, token):
+    """Deletes this worker's lease on a stage, unless another worker holds it by now."""
+    firestore = get_firestore()
+    lease_path = f"leases.{firestore_field}"
+
+    @firestore.transactional
+    def release(transaction):
+        snapshot = report_ref.get(field_paths=[lease_path], transaction=transaction)
+        if snapshot_field(snapshot, lease_path, {}).get('token') == token:
+            transaction.update(report_ref, {lease_path: firestore.DELETE_FIELD})
+
+    release(get_db().transaction())
+
+# How often wait_for_stage re-reads a stage held by another worker.
+STAGE_POLL_SEC = float(os.getenv('STAGE_POLL_SEC', '2'))
+
+def wait_for_stage(report_ref, firestore_field, timeout=STAGE_LEASE_SEC, interval=STAGE_POLL_SEC):
+    """
+    Waits for another worker's claimed stage to finish, e.g. an agent the parser
+    started early. Returns the stage status: 'complete' or 'failed' once the
+    worker is done, otherwise the last status seen when `timeout` expires.
+    """
+    stage_path = f"stages.{firestore_field}"
+    deadline = time.monotonic() + timeout
+    while True:
+        snapshot = report_ref.get(field_paths=[stage_path])
+        status = snapshot_field(snapshot, stage_path, 'pending')
+        if status in ('complete', 'failed') or time.monotonic() >= deadline:
+            return status
+        time.sleep(interval)
+
+def record_suppressed_duplicate(agent_name, stage_status, log_prefix):
+    """Logs a skipped duplicate run and records it as a `suppressed_duplicates` metric."""
+    logging.info(f"{log_prefix} Skipping duplicate run; stage is '{stage_status}' or claimed by another worker.")
+    record_metric('suppressed_duplicates', log_prefix, agent=agent_name, stage_status=stage_status)
+
+def save_agent_result(report_ref, firestore_field, result, log_prefix):
+    """
+    Stores an agent's result, marks its stage 'complete', releases its lease and
+    clears its partial output in a single write, so the report triggers fire once
+    per finished agent.
+    """
+    logging.info(f"{log_prefix} Saving result to '{firestore_field}' and marking stage 'complete'...")
+    delete_field = get_firestore().DELETE_FIELD
+    report_ref.set({
+        firestore_field: result,
+        'stages': {firestore_field: 'complete'},
+        'leases': {firestore_field: delete_field},
+        'output': {firestore_field: delete_field}
+    }, merge=True)
+
+def mark_agent_failed(report_ref, agent_name, firestore_field, error):
+    """
+    Marks an agent's stage 'failed', records the error, releases its lease and
+    clears any partial output.
+    """
+    delete_field = get_firestore().DELETE_FIELD
+    report_ref.set({
+        'stages': {firestore_field: 'failed'},
+        'leases': {firestore_field: delete_field},
+        'output': {firestore_field: delete_field},
+        'error_message': f"Agent '{agent_name}' failed: {str(error)}"
+    }, merge=True)
+
+async def run_agent_graph(report_ref, file_id, parsed_text, report_inputs=None, section_index=None,
+                          deadline=None):
+    """
+    Runs every agent in AGENT_MAP in this process as an asyncio task graph. Each
+    agent starts as soon as the agents producing its dependencies have finished and
+    records the same stage transitions on the report as agent_executor_v2.
+    Agents that declare sections get only those parts of `parsed_text`.
+
+    With a `deadline` (a time.monotonic() value), no lease or wait outlasts it:
+    agents still running then are abandoned and their leases released, so
+    another worker can take them over. Returns a map of agent name to whether
+    it completed, or None for agents left unfinished at the deadline.
+    """
+    import asyncio
+
+    producers = {firestore_field: name for name, (_, firestore_field, _) in AGENT_MAP.items()}
+    results = {"parsed_text": parsed_text, **(report_inputs or {})}
+    tasks = {}
+
+    def time_left():
+        return STAGE_LEASE_SEC if deadline is None else min(STAGE_LEASE_SEC, deadline - time.monotonic())
+
+    async def run(agent_name):
+        agent_function, firestore_field, dependencies = AGENT_MAP[agent_name]
+        log_prefix = f"[{file_id}][{agent_name}]"
+
+        try:
+            upstream = await asyncio.gather(
+                *[asyncio.shield(tasks[producers[dep]]) for dep in dependencies if dep in producers]
+            )
+        except asyncio.CancelledError:
+            return None
+        if None in upstream:
+            return None
+        if not all(upstream):
+            logging.warning(f"{log_prefix} Skipping agent because a dependency did not complete.")
+            return False
+        if time_left() <= 0:
+            logging.warning(f"{log_prefix} Out of time; leaving the agent unstarted.")
+            return None
+
+        token = None
+        try:
+            token, stage_status = await asyncio.to_thread(
+                claim_stage, report_ref, firestore_field, lease_sec=time_left()
+            )
+            if token is None and stage_status != 'complete':
+                # Another worker holds the stage; its result is still needed downstream.
+                logging.info(f"{log_prefix} Stage claimed by another worker; waiting for it.")
+                stage_status = await asyncio.to_thread(
+                    wait_for_stage, report_ref, firestore_field, timeout=time_left()
+                )
+                if stage_status not in ('complete', 'failed') and time_left() <= 0:
+                    logging.warning(f"{log_prefix} Out of time waiting for the stage.")
+                    return None
+            if token is None:
+                if stage_status != 'complete':
+                    await asyncio.to_thread(record_suppressed_duplicate, agent_name, stage_status, log_prefix)
+                    return False
+                # A previous delivery or the parser already produced this stage; reuse its result.
+                logging.info(f"{log_prefix} Stage already complete; reusing its result.")
+                snapshot = await asyncio.to_thread(report_ref.get, field_paths=[firestore_field])
+                results[firestore_field] = snapshot_field(snapshot, firestore_field)
+                return True
+
+            analysis_context = {"file_id": file_id}
+            analysis_context.update({dep: results.get(dep) for dep in dependencies})
+            if "parsed_text" in dependencies:
+                analysis_context["parsed_text"] = parsed_text_for_agent(
+                    agent_name, parsed_text, section_index, log_prefix
+                )
+
+            result = await asyncio.to_thread(
+                run_agent_function, report_ref, agent_function, firestore_field, analysis_context, log_prefix
+            )
+            results[firestore_field] = result
+
+            await asyncio.to_thread(save_agent_result, report_ref, firestore_field, result, log_prefix)
+            return True
+        except asyncio.CancelledError:
+            # Abandoned at the deadline; the agent's thread may still be running,
+            # but its result is discarded and the stage is free for another worker.
+            if token is not None:
+                logging.warning(f"{log_prefix} Out of time; releasing the stage.")
+                await asyncio.to_thread(release_stage, report_ref, firestore_field, token)
+            return None
+        except Exception as e:
+            logging.error(f"{log_prefix} An error occurred: {e}", exc_info=True)
+            await asyncio.to_thread(mark_agent_failed, report_ref, agent_name, firestore_field, e)
+            return False
+
+    # Every task is registered before the first one runs, so dependents can
+    # always look up their producers.
+    for agent_name in AGENT_MAP:
+        tasks[agent_name] = asyncio.create_task(run(agent_name))
+    timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+    _, unfinished = await asyncio.wait(tasks.values(), timeout=timeout)
+    for task in unfinished:
+        task.cancel()
+    outcomes = await asyncio.gather(*tasks.values())
+    return dict(zip(tasks, outcomes))
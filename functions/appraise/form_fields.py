@@ -0,0 +1,132 @@
+"""
+Rule-based extraction of the subject property from Fannie Mae 1004/URAR forms.
+Fillable PDFs are read from their widget values; flattened ones from the text
+that follows each printed label on the form's first page. The parser uses the
+result as `property_info` when it covers every required field, so the LLM agent
+only runs for reports the rules cannot read.
+"""
+import os
+import re
+
+from .core import record_metric
+
+# property_info keys the extractor must find for its result to be used.
+REQUIRED_FIELDS = ["PropertyAddress", "City", "County", "NeighborhoodName"]
+OPTIONAL_FIELDS = ["State", "ZipCode"]
+# Fraction of REQUIRED_FIELDS that must be found to skip the LLM agent.
+FORM_EXTRACTION_MIN_COVERAGE = float(os.getenv('FORM_EXTRACTION_MIN_COVERAGE', '1'))
+
+# Normalized widget names (lowercase letters and digits, without array indices)
+# each field is read from; a widget matches when its name ends with one of them.
+WIDGET_NAMES = {
+    "PropertyAddress": ["propertyaddress", "subjectaddress", "subjectpropertyaddress"],
+    "City": ["propertycity", "subjectcity", "city"],
+    "State": ["propertystate", "subjectstate", "state"],
+    "ZipCode": ["propertyzip", "subjectzip", "zipcode", "zip"],
+    "County": ["propertycounty", "subjectcounty", "county"],
+    "NeighborhoodName": ["neighborhoodname", "neighborhood"],
+}
+# Widgets for other parties' addresses share the subject's field names.
+OTHER_PARTIES = ["lender", "client", "appraiser", "supervisor", "borrower", "owner", "company", "signature"]
+
+# Labels printed on the URAR subject section, in the order they are tried, and
+# the labels that end a value on the same row.
+FORM_LABELS = {
+    "PropertyAddress": "Property Address",
+    "City": "City",
+    "State": "State",
+    "ZipCode": "Zip Code",
+    "County": "County",
+    "NeighborhoodName": "Neighborhood Name",
+}
+STOP_LABELS = [
+    "Borrower", "Owner of Public Record", "Legal Description", "Assessor's Parcel #", "Tax Year",
+    "R.E. Taxes $", "Map Reference", "Census Tract", "Occupant", "Special Assessments $",
+    "Lender/Client", "Address", "Property Rights Appraised", "Assignment Type",
+]
+_LABEL_PATTERN = re.compile(
+    r"(?<!\w)(?:" + "|".join(re.escape(label) for label in sorted(
+        list(FORM_LABELS.values()) + STOP_LABELS, key=len, reverse=True
+    )) + r")(?!\w)"
+)
+# Words whose bottom edges are this close (in points) are on the same row.
+ROW_TOLERANCE = 3
+
+def _normalize(name):
+    # Array indices in fully qualified names ("form1[0].Subject[0].City[0]") go first.
+    return re.sub(r'[^a-z0-9]', '', re.sub(r'\[\d+\]', '', name.lower()))
+
+def _clean(value):
+    value = re.sub(r'\s+', ' ', value or '').strip(' :;,')
+    return value or None
+
+def fields_from_widgets(doc):
+    """Reads property_info fields from the form widgets of the first page."""
+    if not doc.is_form_pdf or doc.page_count == 0:
+        return {}
+    found = {}
+    for widget in doc[0].widgets():
+        name = _normalize(widget.field_name or "")
+        value = _clean(str(widget.field_value)) if widget.field_value not in (None, "", False) else None
+        if not name or not value or any(party in name for party in OTHER_PARTIES):
+            continue
+        for field, names in WIDGET_NAMES.items():
+            if field not in found and any(name.endswith(candidate) for candidate in names):
+                found[field] = value
+                break
+    return found
+
+def page_rows(page):
+    """Returns the page's words joined into visual rows, top to bottom."""
+    rows = []
+    for x0, y0, x1, y1, word, *_ in sorted(page.get_text("words"), key=lambda w: (w[3], w[0])):
+        if rows and abs(rows[-1][0] - y1) <= ROW_TOLERANCE:
+            rows[-1][1].append((x0, word))
+        else:
+            rows.append([y1, [(x0, word)]])
+    return [" ".join(word for _, word in sorted(words)) for _, words in rows]
+
+def fields_from_text(doc):
+    """Reads property_info fields from the text after each label on the first page."""
+    if doc.page_count == 0:
+        return {}
+    labels = {label: field for field, label in FORM_LABELS.items()}
+    found = {}
+    for row in page_rows(doc[0]):
+        matches = list(_LABEL_PATTERN.finditer(row))
+        for i, match in enumerate(matches):
+            field = labels.get(match.group(0))
+            if field is None or field in found:
+                continue
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(row)
+            value = _clean(row[match.end():end])
+            if value:
+                found[field] = value
+    return found
+
+def extract_property_info(doc):
+    """
+    Extracts property_info from an opened URAR document. Widget values win over
+    label text. Returns (property_info, coverage, source), where coverage is the
+    fraction of REQUIRED_FIELDS found.
+    """
+    widget_fields = fields_from_widgets(doc)
+    text_fields = fields_from_text(doc)
+    property_info = {}
+    for field in REQUIRED_FIELDS + OPTIONAL_FIELDS:
+        value = widget_fields.get(field) or text_fields.get(field)
+        if value:
+            property_info[field] = value
+    coverage = sum(field in property_info for field in REQUIRED_FIELDS) / len(REQUIRED_FIELDS)
+    source = "widgets" if widget_fields else "text"
+    return property_info, coverage, source
+
+def record_form_extraction(property_info, coverage, source, log_prefix):
+    """
+    Records an extraction as a `form_extraction` metric: whether its result was
+    used, its source, the fields it found and its coverage (a distribution).
+    """
+    record_metric(
+        'form_extraction', log_prefix, used=coverage >= FORM_EXTRACTION_MIN_COVERAGE, source=source,
+        fields_found=sorted(property_info), coverage=coverage
+    )
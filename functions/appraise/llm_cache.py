@@ -0,0 +1,168 @@
+"""
+LLM calls made by the agents, with a persistent response cache. Responses are
+keyed by model, prompt-template version and a digest of the rendered prompt, and
+kept both per instance and in the `llm_cache` collection, so retries, stage
+re-runs and duplicate reports do not pay for the same generation twice.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from .core import get_db, get_firestore, get_genai, record_metric
+from .streaming import stream_text
+
+# 'on' reads and writes the cache, 'refresh' skips reads but stores fresh
+# responses, 'off' bypasses it entirely.
+LLM_CACHE_MODE = os.getenv('LLM_CACHE_MODE', 'on')
+# Stored responses expire after this long; the collection's TTL policy on
+# `expiresAt` deletes them, and expired entries are never served meanwhile.
+# This bounds the collection: it holds at most one TTL's worth of distinct
+# generations, each under LLM_CACHE_MAX_ENTRY_BYTES.
+LLM_CACHE_TTL_SEC = int(os.getenv('LLM_CACHE_TTL_SEC', str(7 * 24 * 3600)))
+# Per-instance tier, evicted least-recently-used once it holds this many bytes.
+LLM_CACHE_LOCAL_MAX_BYTES = int(os.getenv('LLM_CACHE_LOCAL_MAX_BYTES', str(16 * 1024 * 1024)))
+# Larger responses are not stored; Firestore documents are capped at 1 MiB.
+LLM_CACHE_MAX_ENTRY_BYTES = int(os.getenv('LLM_CACHE_MAX_ENTRY_BYTES', str(512 * 1024)))
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+llm_cache_stats = {"hits": 0, "local_hits": 0, "misses": 0, "stores": 0}
+
+def count(stat, amount=1):
+    with _local_cache_lock:
+        llm_cache_stats[stat] += amount
+
+def get_local_cache():
+    global _local_cache
+    if _local_cache is None:
+        import cachetools
+        _local_cache = cachetools.TTLCache(
+            maxsize=LLM_CACHE_LOCAL_MAX_BYTES, ttl=LLM_CACHE_TTL_SEC, getsizeof=lambda entry: len(entry.encode('utf-8'))
+        )
+    return _local_cache
+
+@lru_cache(maxsize=None)
+def get_model(model_name):
+    return get_genai().GenerativeModel(model_name)
+
+@lru_cache(maxsize=None)
+def prompt_template_version(template):
+    """
+    Version of the prompt rendered by the function `template`: a hash of the
+    string constants in its code, which change whenever its prompt text does.
+    """
+    constants = [c for c in template.__code__.co_consts if isinstance(c, str)]
+    return hashlib.sha256("\0".join(constants).encode('utf-8')).hexdigest()[:16]
+
+def schema_json(schema):
+    """The JSON schema of a response schema (a pydantic model or alias), for cache keys."""
+    import pydantic
+    return pydantic.TypeAdapter(schema).json_schema()
+
+def llm_cache_key(model_name, template, prompt, generation_config=None):
+    if generation_config:
+        # A response schema is keyed by its fields, not its name, so editing
+        # the schema invalidates responses generated against the old one.
+        prompt += "\0" + json.dumps(generation_config, sort_keys=True, default=schema_json)
+    input_digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{model_name}\0{prompt_template_version(template)}\0{input_digest}".encode('utf-8')).hexdigest()
+
+def llm_cache_ref(key):
+    return get_db().collection('llm_cache').document(key)
+
+def lookup_response(key):
+    """Returns a cached, unexpired response and the tier it came from, or (None, None)."""
+    with _local_cache_lock:
+        response = get_local_cache().get(key)
+    if response is not None:
+        return response, 'local'
+
+    snapshot = llm_cache_ref(key).get()
+    if not snapshot.exists:
+        return None, None
+    entry = snapshot.to_dict()
+    expires_at = entry.get('expiresAt')
+    if expires_at is None or expires_at <= datetime.now(timezone.utc):
+        return None, None
+    response = entry.get('response')
+    if response is not None:
+        remember_locally(key, response)
+    return response, 'firestore'
+
+def remember_locally(key, response):
+    with _local_cache_lock:
+        try:
+            get_local_cache()[key] = response
+        except ValueError:
+            pass  # Larger than the whole cache; never cached.
+
+def store_response(key, model_name, template, response):
+    remember_locally(key, response)
+    if len(response.encode('utf-8')) > LLM_CACHE_MAX_ENTRY_BYTES:
+        return
+    llm_cache_ref(key).set({
+        'model': model_name,
+        'template': template.__name__,
+        'templateVersion': prompt_template_version(template),
+        'response': response,
+        'createdAt': get_firestore().SERVER_TIMESTAMP,
+        'expiresAt': datetime.now(timezone.utc) + timedelta(seconds=LLM_CACHE_TTL_SEC)
+    })
+    count("stores")
+
+def record_cache_lookup(template, hit, log_prefix):
+    """Records a lookup as an `llm_cache` metric, labelled by hit or miss and prompt template."""
+    record_metric('llm_cache', log_prefix, outcome='hit' if hit else 'miss', template=template.__name__)
+
+def generate(model_name, prompt, analysis_context, template, parse=None, stream=False, format_line=None,
+             generation_config=None):
+    """
+    Returns the model's response to `prompt`, passed through `parse` if given.
+    `template` is the agent function that rendered the prompt. A response is only
+    cached once `parse` accepts it, so a malformed generation is retried next time
+    rather than replayed. With `stream`, a fresh generation is streamed to the
+    report as it arrives (see stream_text).
+    """
+    log_prefix = f"[{analysis_context.get('file_id')}][{template.__name__}]"
+    parse = parse or (lambda text: text)
+    key = None
+    if LLM_CACHE_MODE in ('on', 'refresh'):
+        key = llm_cache_key(model_name, template, prompt, generation_config)
+
+    if key is not None and LLM_CACHE_MODE == 'on':
+        try:
+            response, tier = lookup_response(key)
+        except Exception as e:
+            logging.warning(f"{log_prefix} LLM cache lookup failed: {e}")
+            response, tier = None, None
+        if response is not None:
+            count("hits")
+            count("local_hits", tier == 'local')
+            record_cache_lookup(template, True, log_prefix)
+            logging.info(f"{log_prefix} LLM cache hit ({tier}). Cache stats: {llm_cache_stats}")
+            try:
+                return parse(response)
+            except Exception:
+                logging.warning(f"{log_prefix} Cached response no longer parses; regenerating.")
+        else:
+            count("misses")
+            record_cache_lookup(template, False, log_prefix)
+
+    model = get_model(model_name)
+    if stream:
+        response = stream_text(model, prompt, analysis_context, format_line=format_line,
+                               generation_config=generation_config)
+    else:
+        response = model.generate_content(prompt, generation_config=generation_config).text
+    result = parse(response)
+
+    if key is not None:
+        try:
+            store_response(key, model_name, template, response)
+        except Exception as e:
+            logging.warning(f"{log_prefix} Failed to store LLM response in cache: {e}")
+    return result
@@ -0,0 +1,203 @@
+"""Function 2: converts the uploaded PDF to Markdown."""
+import os
+import json
+import base64
+import logging
+from datetime import datetime, timezone
+
+from firebase_functions.pubsub_fn import on_message_published
+
+from .content_index import index_parsed_content
+from .core import get_db, get_pymupdf, get_storage_client, get_topic_path, open_pdf, publish_messages
+from .form_fields import FORM_EXTRACTION_MIN_COVERAGE, extract_property_info, record_form_extraction
+from .sales_grid import effective_date, extract_sales_grid
+from .sections import build_section_index
+from .streaming import OUTPUT_WRITES_PER_SEC, acquire_write_slot
+
+# Reports whose parsed Markdown is at most this long run through the in-process
+# fast lane (Function 5); larger ones fan out over 'run-agent'.
+FAST_LANE_MAX_CHARS = int(os.getenv('FAST_LANE_MAX_CHARS', '200000'))
+
+# Worker processes the Markdown conversion spreads pages over; 1 converts in
+# this process. Match it to the parser's vCPUs (see scripts/benchmark_to_markdown.py).
+PDF_PARSE_CONCURRENCY = int(os.getenv('PDF_PARSE_CONCURRENCY', '1'))
+
+# The Markdown is uploaded in chunks of this size (a multiple of 256 KiB) while
+# later pages are still being converted.
+MARKDOWN_UPLOAD_CHUNK_BYTES = 256 * 1024
+
+# Agents that can start once this many pages are converted, with just those
+# pages as their text: the URAR subject section is on the first page. They are
+# published before the rest of the document is parsed.
+EARLY_AGENTS = os.getenv('EARLY_AGENTS', '1') == '1'
+EARLY_AGENT_PAGES = {"run_property_info_agent": 1}
+
+def write_parsing_progress(report_ref, pages_done, page_count, log_prefix):
+    """Writes `progress.parsing` to the report, at most OUTPUT_WRITES_PER_SEC times a second."""
+    if not acquire_write_slot(report_ref.path, 1.0 / OUTPUT_WRITES_PER_SEC if OUTPUT_WRITES_PER_SEC > 0 else 0.0):
+        return
+    try:
+        report_ref.set({'progress': {'parsing': {'pagesDone': pages_done, 'pageCount': page_count}}}, merge=True)
+    except Exception as e:
+        logging.warning(f"{log_prefix} Failed to write parsing progress: {e}")
+
+def start_early_agents(agents, file_id, uid, md_file_path, parsed_text, log_prefix):
+    """
+    Publishes 'run-agent' messages carrying the text parsed so far. An agent
+    that fails to publish here is dispatched as usual once parsing completes.
+    """
+    logging.info(f"{log_prefix} Starting agents early on the first pages: {agents}")
+    messages = [
+        (get_topic_path('run-agent'), {
+            "fileId": file_id, "uid": uid, "parsedTextPath": md_file_path,
+            "agentName": agent_name, "parsedText": parsed_text
+        })
+        for agent_name in agents
+    ]
+    publish_messages(messages, log_prefix)
+
+# --- Function 2: PDF Parser ---
+@on_message_published(topic="pdf-uploaded")
+def pdf_parser_v2(event):
+    """
+    Triggered by a Pub/Sub message on the 'pdf-uploaded' topic.
+    Parses the PDF to Markdown and triggers the next step.
+    """
+    try:
+        message_data = json.loads(base64.b64decode(event.data.message["data"]).decode('utf-8'))
+        file_id = message_data['fileId']
+        uid = message_data['uid']
+        file_path = message_data['filePath']
+        content_digest = message_data.get('contentDigest')
+        uploaded_at = message_data.get('uploadedAt')
+    except (json.JSONDecodeError, KeyError) as e:
+        logging.error(f"Failed to decode Pub/Sub message: {e}", exc_info=True)
+        return
+
+    log_prefix = f"[{file_id}]"
+    logging.info(f"{log_prefix} Starting PDF parsing for user '{uid}'.")
+    report_ref = get_db().collection('reports').document(file_id)
+
+    try:
+        logging.info(f"{log_prefix} Updating Firestore stage: parsing -> running.")
+        report_ref.set({'stages': {'parsing': 'running'}}, merge=True)
+
+        logging.info(f"{log_prefix} Downloading '{file_path}' from Cloud Storage...")
+        blob = get_storage_client().blob(file_path)
+        pdf_bytes = blob.download_as_bytes()
+        logging.info(f"{log_prefix} Download complete.")
+
+        logging.info(f"{log_prefix} Converting PDF to Markdown...")
+        pymupdf4llm = get_pymupdf()
+        doc = open_pdf(pdf_bytes)
+        # Form widgets are flattened by the conversion, so they are read first.
+        try:
+            property_info, coverage, source = extract_property_info(doc)
+            logging.info(f"{log_prefix} Form extraction from {source} covered {coverage:.0%}: {sorted(property_info)}")
+        except Exception as e:
+            logging.warning(f"{log_prefix} Form extraction failed: {e}")
+            property_info, coverage, source = {}, 0.0, "error"
+        early_agents = {}
+        if EARLY_AGENTS:
+            early_agents = {
+                agent_name: pages for agent_name, pages in EARLY_AGENT_PAGES.items()
+                # Complete form fields replace the property info agent.
+                if not (agent_name == "run_property_info_agent" and coverage >= FORM_EXTRACTION_MIN_COVERAGE)
+            }
+
+        # A document with a table of contents gets its heading levels from the
+        # TOC; others from the font sizes of their first pages, counted while
+        # they are converted (see to_markdown_pages).
+        hdr_info = pymupdf4llm.TocHeaders(doc) if doc.get_toc() else None
+        md_file_path = f"parsed-text/{file_id}.md"
+        md_blob = get_storage_client().blob(md_file_path, chunk_size=MARKDOWN_UPLOAD_CHUNK_BYTES)
+        page_count = doc.page_count
+        page_texts = []
+        md_bytes_count = 0
+        # Each page is uploaded as soon as it is converted.
+        logging.info(f"{log_prefix} Streaming Markdown to '{md_file_path}'...")
+        with md_blob.open('wb', content_type='text/markdown') as md_file:
+            for page in pymupdf4llm.to_markdown_pages(doc, hdr_info=hdr_info, concurrency=PDF_PARSE_CONCURRENCY):
+                page_bytes = page['text'].encode('utf-8')
+                md_file.write(page_bytes)
+                md_bytes_count += len(page_bytes)
+                page_texts.append(page['text'])
+
+                ready = [name for name, pages in early_agents.items() if pages == len(page_texts)]
+                if ready:
+                    start_early_agents(ready, file_id, uid, md_file_path, "".join(page_texts), log_prefix)
+                write_parsing_progress(report_ref, len(page_texts), page_count, log_prefix)
+        md_blob.reload()
+        logging.info(f"{log_prefix} Markdown upload complete.")
+        md_text = "".join(page_texts)
+        del page_texts
+        # Read after the conversion, which flattens form values into the page text.
+        try:
+            structured_data, ambiguous_cells = extract_sales_grid(doc, md_text)
+        except Exception as e:
+            logging.warning(f"{log_prefix} Sales grid extraction failed: {e}")
+            structured_data, ambiguous_cells = None, []
+        doc.close()
+        # Sale ages are measured from this date, so it is fixed once, here: the
+        # report's own effective date, else the day it was uploaded.
+        report_date = effective_date(md_text) or (uploaded_at or datetime.now(timezone.utc).isoformat())[:10]
+        if structured_data:
+            structured_data['effective_date'] = report_date
+        section_index = build_section_index(md_text)
+        logging.info(f"{log_prefix} Conversion to Markdown successful; indexed {len(section_index)} sections.")
+
+        execution_mode = 'inline' if len(md_text) <= FAST_LANE_MAX_CHARS else 'distributed'
+        logging.info(f"{log_prefix} Updating Firestore stage: parsing -> complete ({execution_mode} execution).")
+        parsed_fields = {
+            'stages': {'parsing': 'complete'},
+            'parsedTextPath': md_file_path,
+            'parsedTextGeneration': md_blob.generation,
+            'parsedTextBytes': md_bytes_count,
+            'progress': {'parsing': {'pagesDone': page_count, 'pageCount': page_count}},
+            'sectionIndex': section_index,
+            'effectiveDate': report_date,
+            'executionMode': execution_mode
+        }
+        if coverage >= FORM_EXTRACTION_MIN_COVERAGE:
+            # The form fields are complete, so the property info agent never runs.
+            logging.info(f"{log_prefix} Using form fields as property_info.")
+            parsed_fields['property_info'] = property_info
+            parsed_fields['stages']['property_info'] = 'complete'
+        if structured_data and not ambiguous_cells:
+            logging.info(f"{log_prefix} Read the sales grid from its tables ({len(structured_data['comparables'])} comparables).")
+            parsed_fields['structured_data'] = structured_data
+            parsed_fields['stages']['structured_data'] = 'complete'
+        elif structured_data:
+            # The sales comparison agent resolves only the cells the rules could not read.
+            logging.info(f"{log_prefix} Sales grid has {len(ambiguous_cells)} ambiguous cells.")
+            parsed_fields['salesGrid'] = {'structured_data': structured_data, 'ambiguous': ambiguous_cells}
+        report_ref.set(parsed_fields, merge=True)
+        record_form_extraction(property_info, coverage, source, log_prefix)
+
+        if content_digest:
+            try:
+                index_parsed_content(uid, content_digest, file_id, md_file_path, md_blob.generation, md_bytes_count)
+            except Exception as e:
+                logging.warning(f"{log_prefix} Failed to index parsed content: {e}")
+
+        next_message_data = {
+            "fileId": file_id, "uid": uid, "parsedTextPath": md_file_path,
+            "parsedTextGeneration": md_blob.generation
+        }
+        messages = [(get_topic_path('text-extracted'), next_message_data)]
+        if execution_mode == 'inline':
+            messages.append((get_topic_path('run-pipeline'), next_message_data))
+        logging.info(f"{log_prefix} Publishing {len(messages)} message(s)...")
+        failures = publish_messages(messages, log_prefix)
+        if failures:
+            raise RuntimeError(f"Failed to publish {len(failures)} message(s): {failures[0][1]}")
+
+    except Exception as e:
+        logging.error(f"{log_prefix} An error occurred during PDF parsing: {e}", exc_info=True)
+        report_ref.set({
+            'status': 'error', 'error_message': f"PDF parsing failed: {str(e)}",
+            'stages': {'parsing': 'failed'}
+        }, merge=True)
+
+    logging.info(f"{log_prefix} PDF parsing processing complete.")
+    return
@@ -0,0 +1,179 @@
+"""
+The agent dependency graph and the transitions it implies: which agents are
+ready to run, when the pipeline has settled, and dispatching over 'run-agent'.
+"""
+import logging
+from datetime import timedelta
+
+from .agents import AGENT_MAP, ANALYSIS_STAGES
+from .core import (
+    PARSED_TEXT_INLINE_MAX_BYTES, get_db, get_firestore, get_topic_path, load_parsed_text,
+    publish_messages, snapshot_field,
+)
+
+# The graph is derived from AGENT_MAP: each agent names the fields it reads, and
+# every field is produced by exactly one stage.
+PARSING_STAGE = "parsing"
+
+# Per-upload fields written by upload_trigger_v2 that agents read. They are
+# available from the start and are not produced by any stage.
+REPORT_INPUT_FIELDS = ["fullName"]
+
+# Report fields the parsing stage writes alongside the parsed text.
+PARSED_FIELDS = ["salesGrid", "effectiveDate"]
+
+# How long a pipeline_executor_v2 invocation may run. An inline run that started
+# longer ago than this has ended, whether or not it handed its agents off.
+PIPELINE_TIMEOUT_SEC = 540
+
+def stage_for_dependency(dependency):
+    """Returns the stage whose completion makes a dependency field available."""
+    return PARSING_STAGE if dependency == "parsed_text" or dependency in PARSED_FIELDS else dependency
+
+def agent_stage_dependencies(agent_name):
+    """Returns the stages that must be complete before an agent can run."""
+    _, _, dependencies = AGENT_MAP[agent_name]
+    return [stage_for_dependency(dep) for dep in dependencies if dep not in REPORT_INPUT_FIELDS]
+
+def dependent_stages(fields):
+    """
+    Returns `fields` plus every analysis stage that reads any of them, directly
+    or through another stage.
+    """
+    affected = set(fields)
+    changed = True
+    while changed:
+        changed = False
+        for agent_name, (_, firestore_field, dependencies) in AGENT_MAP.items():
+            if firestore_field not in affected and any(
+                stage_for_dependency(dep) in affected for dep in dependencies
+            ):
+                affected.add(firestore_field)
+                changed = True
+    return affected
+
+def all_stages_complete(stages, stage_list):
+    """Checks if all stages in a given list are marked 'complete'."""
+    return all(stages.get(s) == 'complete' for s in stage_list)
+
+def ready_agents(stages):
+    """
+    Returns the agents that can run given a stages map: their own stage has not
+    started yet and every stage they depend on is complete.
+    """
+    return [
+        agent_name for agent_name, (_, firestore_field, _) in AGENT_MAP.items()
+        if stages.get(firestore_field, 'pending') == 'pending'
+        and all_stages_complete(stages, agent_stage_dependencies(agent_name))
+    ]
+
+def unfinished_agents(stages, agents=AGENT_MAP):
+    """
+    Returns those of `agents` that an ended inline run leaves to dispatch: their
+    stage is neither complete nor failed, and every stage they depend on is
+    complete. Unlike ready_agents, this includes stages the run left 'running'.
+    """
+    return [
+        agent_name for agent_name in agents
+        if stages.get(AGENT_MAP[agent_name][1]) not in ('complete', 'failed')
+        and all_stages_complete(stages, agent_stage_dependencies(agent_name))
+    ]
+
+def inline_run_lost(execution_mode, inline_started_at, now):
+    """
+    Checks if a report is still 'inline' although its pipeline_executor_v2 run
+    has ended, e.g. because its instance crashed before handing agents off.
+    """
+    return (
+        execution_mode == 'inline' and inline_started_at is not None
+        and now - inline_started_at > timedelta(seconds=PIPELINE_TIMEOUT_SEC)
+    )
+
+def dispatch_agents(agents, file_id, uid, parsed_text_path, parsed_text_generation=None, parsed_text_bytes=None):
+    """
+    Publishes a message to the 'run-agent' topic for each agent in a list. Small
+    parses are attached to the messages of agents that read them.
+    """
+    log_prefix = f"[{file_id}]"
+    logging.info(f"{log_prefix} Dispatching agents for user '{uid}': {agents}")
+
+    parsed_text = None
+    needs_text = any("parsed_text" in AGENT_MAP[agent_name][2] for agent_name in agents)
+    if needs_text and parsed_text_bytes is not None and parsed_text_bytes <= PARSED_TEXT_INLINE_MAX_BYTES:
+        try:
+            parsed_text = load_parsed_text(parsed_text_path, parsed_text_generation, log_prefix)
+        except Exception as e:
+            logging.warning(f"{log_prefix} Could not inline parsed text; agents will download it: {e}")
+
+    messages = []
+    for agent_name in agents:
+        message_to_publish = {
+            "fileId": file_id,
+            "uid": uid,
+            "parsedTextPath": parsed_text_path,
+            "parsedTextGeneration": parsed_text_generation,
+            "agentName": agent_name
+        }
+        if parsed_text is not None and "parsed_text" in AGENT_MAP[agent_name][2]:
+            message_to_publish["parsedText"] = parsed_text
+        messages.append((get_topic_path('run-agent'), message_to_publish))
+    failures = publish_messages(messages, log_prefix)
+    for message_data, _ in failures:
+        logging.error(f"{log_prefix} Failed to dispatch '{message_data['agentName']}'.")
+
+def failed_or_blocked_stages(stages):
+    """
+    Returns the analysis stages that can no longer complete: stages that failed,
+    plus every stage that depends (directly or transitively) on one of them.
+    """
+    return dependent_stages([stage for stage, status in stages.items() if status == 'failed'])
+
+def pipeline_outcome(stages):
+    """
+    Returns the final report status implied by a stages map: 'complete' when every
+    analysis stage completed, 'error' when the remaining stages can no longer
+    complete because something upstream failed, and None while work is pending.
+    """
+    if all_stages_complete(stages, ANALYSIS_STAGES):
+        return 'complete'
+    blocked = failed_or_blocked_stages(stages)
+    if blocked and all(stages.get(s) == 'complete' or s in blocked for s in ANALYSIS_STAGES):
+        return 'error'
+    return None
+
+def next_transitions(before_stages, after_stages):
+    """
+    Computes what a stages change requires: the agents that became ready with it
+    (agents that were already ready were dispatched by an earlier update) and
+    the final status if the pipeline just settled. Pure and deterministic, so a
+    redelivered event yields the same transitions.
+    """
+    already_ready = set(ready_agents(before_stages))
+    to_dispatch = [a for a in ready_agents(after_stages) if a not in already_ready]
+    outcome = pipeline_outcome(after_stages)
+    if outcome == pipeline_outcome(before_stages):
+        outcome = None
+    return to_dispatch, outcome
+
+def finalize_report(report_ref, outcome, log_prefix):
+    """
+    Moves a report from 'processing' to its final status in a transaction, so
+    redelivered events and racing triggers finalize it at most once.
+    """
+    firestore = get_firestore()
+
+    @firestore.transactional
+    def apply(transaction):
+        snapshot = report_ref.get(field_paths=['status'], transaction=transaction)
+        if snapshot_field(snapshot, 'status') != 'processing':
+            return False
+        update = {'status': outcome, 'finalized_timestamp': firestore.SERVER_TIMESTAMP}
+        if outcome == 'error':
+            update['error_message'] = "One or more analysis stages failed."
+        transaction.update(report_ref, update)
+        return True
+
+    if apply(get_db().transaction()):
+        logging.info(f"{log_prefix} Report has been marked as '{outcome}'.")
+    else:
+        logging.info(f"{log_prefix} Report was already finalized. Ignoring update.")
@@ -0,0 +1,111 @@
+"""Function 5: runs the whole agent graph for a report in one invocation."""
+import os
+import json
+import time
+import base64
+import logging
+
+from firebase_functions import options
+from firebase_functions.pubsub_fn import on_message_published
+
+from .agents import AGENT_MAP
+from .core import get_db, get_firestore, load_parsed_text, snapshot_field
+from .execution import run_agent_graph
+from .pipeline import PARSED_FIELDS, PIPELINE_TIMEOUT_SEC, REPORT_INPUT_FIELDS, dispatch_agents, unfinished_agents
+
+# Time kept back at the end of an invocation to hand agents that have not
+# finished to the distributed path; no stage lease or wait runs into it.
+FAST_LANE_HANDOFF_SEC = int(os.getenv('FAST_LANE_HANDOFF_SEC', '60'))
+
+def hand_off_to_distributed(report_ref, file_id, agents, log_prefix):
+    """
+    Switches an inline report to distributed execution and dispatches those of
+    `agents` that can run now. The state machine dispatches the rest as their
+    dependencies complete.
+    """
+    # Switch first: stages that complete after the read below are then picked
+    # up by the state machine, those that completed before it are seen here.
+    report_ref.set({'executionMode': 'distributed'}, merge=True)
+    snapshot = report_ref.get(
+        field_paths=['stages', 'uid', 'parsedTextPath', 'parsedTextGeneration', 'parsedTextBytes']
+    )
+    to_dispatch = unfinished_agents(snapshot_field(snapshot, 'stages', {}), agents)
+    logging.warning(f"{log_prefix} Handing {agents} to the distributed path; dispatching {to_dispatch}.")
+    if to_dispatch:
+        dispatch_agents(
+            to_dispatch, file_id, snapshot_field(snapshot, 'uid'), snapshot_field(snapshot, 'parsedTextPath'),
+            snapshot_field(snapshot, 'parsedTextGeneration'), snapshot_field(snapshot, 'parsedTextBytes')
+        )
+
+async def run_pipeline(report_ref, file_id, parsed_text, report_inputs, section_index, deadline, log_prefix):
+    """Runs the agent graph until `deadline`, then hands whatever is unfinished off."""
+    import asyncio
+
+    try:
+        outcomes = await run_agent_graph(report_ref, file_id, parsed_text, report_inputs, section_index, deadline)
+    except Exception as e:
+        logging.error(f"{log_prefix} Agent graph failed: {e}", exc_info=True)
+        outcomes = {}
+    # Hand off before returning: asyncio.run waits for abandoned agent threads.
+    unfinished = [agent_name for agent_name in AGENT_MAP if outcomes.get(agent_name) is None]
+    if unfinished:
+        await asyncio.to_thread(hand_off_to_distributed, report_ref, file_id, unfinished, log_prefix)
+    return outcomes
+
+@on_message_published(
+    topic="run-pipeline", timeout_sec=PIPELINE_TIMEOUT_SEC, memory=options.MemoryOption.GB_1, retry=True
+)
+def pipeline_executor_v2(event):
+    """
+    Triggered by a message on 'run-pipeline'. Runs the whole agent graph for a
+    report in one invocation, avoiding the per-agent Pub/Sub hops and cold starts
+    of the distributed path. Used for reports under FAST_LANE_MAX_CHARS. Agents
+    not finished FAST_LANE_HANDOFF_SEC before the timeout, or after a failure,
+    are handed to the distributed path. The message is redelivered if the
+    invocation crashes, and the redelivery hands every agent off instead.
+    """
+    deadline = time.monotonic() + PIPELINE_TIMEOUT_SEC - FAST_LANE_HANDOFF_SEC
+    try:
+        message_data = json.loads(base64.b64decode(event.data.message["data"]).decode('utf-8'))
+        file_id = message_data['fileId']
+        parsed_text_path = message_data['parsedTextPath']
+    except (json.JSONDecodeError, KeyError) as e:
+        logging.error(f"Failed to parse Pub/Sub message: {e}", exc_info=True)
+        return
+
+    report_ref = get_db().collection('reports').document(file_id)
+    log_prefix = f"[{file_id}]"
+
+    try:
+        parsed_text = load_parsed_text(parsed_text_path, message_data.get("parsedTextGeneration"), log_prefix)
+        inputs_doc = report_ref.get(
+            field_paths=REPORT_INPUT_FIELDS + PARSED_FIELDS + ['sectionIndex', 'executionMode', 'inlineStartedAt']
+        )
+        report_inputs = inputs_doc.to_dict() if inputs_doc.exists else {}
+        section_index = report_inputs.pop('sectionIndex', None)
+        execution_mode = report_inputs.pop('executionMode', None)
+        if report_inputs.pop('inlineStartedAt', None) is not None:
+            # An earlier delivery started the run and crashed before it was done.
+            if execution_mode == 'inline':
+                hand_off_to_distributed(report_ref, file_id, list(AGENT_MAP), log_prefix)
+            return
+        report_ref.set({'inlineStartedAt': get_firestore().SERVER_TIMESTAMP}, merge=True)
+    except Exception as e:
+        logging.error(f"{log_prefix} Failed to load pipeline inputs: {e}", exc_info=True)
+        try:
+            hand_off_to_distributed(report_ref, file_id, list(AGENT_MAP), log_prefix)
+        except Exception as e:
+            logging.error(f"{log_prefix} Failed to hand off the pipeline: {e}", exc_info=True)
+            report_ref.set({
+                'status': 'error', 'error_message': f"Fast-lane pipeline failed: {str(e)}"
+            }, merge=True)
+        return
+
+    import asyncio
+
+    logging.info(f"{log_prefix} Running agent graph in-process...")
+    outcomes = asyncio.run(
+        run_pipeline(report_ref, file_id, parsed_text, report_inputs, section_index, deadline, log_prefix)
+    )
+    logging.info(f"{log_prefix} Fast-lane pipeline finished: {outcomes}")
+    return
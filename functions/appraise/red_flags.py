@@ -0,0 +1,181 @@
+"""
+Declarative red-flag rules over the comparables in `structured_data`. The
+comparables of one or many reports are laid out as columns (one list per
+measure), every rule in RULES is evaluated over its whole column at once, and
+each report gets the `red_flags` list the red flag agent stores:
+[{rule_name, status: 'Flagged' | 'Not Matched', details}].
+
+Sale ages are measured from the report's `effective_date`, so a stored report
+always scores the same, whenever it is (re-)evaluated.
+"""
+import re
+import operator
+from datetime import date, datetime
+
+# (rule name, column, operator, threshold, unit). Comparable columns hold one
+# value per comparable and flag the comparables that match; report columns hold
+# one value per report. Missing values never match.
+RULES = [
+    ("Excessive Net Adjustments", "net_adjustment_pct", ">", 0.05, "pct"),
+    ("Excessive Gross Adjustments", "gross_adjustment_pct", ">", 0.25, "pct"),
+    ("Dated Comparable Sales", "sale_age_months", ">", 12, "months"),
+    ("Distant Comparables", "distance_miles", ">", 1.0, "miles"),
+    ("Dissimilar Living Area", "gla_variance_pct", ">", 0.25, "pct"),
+    ("Subject Living Area Not Bracketed", "gla_bracket_gap_pct", ">", 0, "pct"),
+    ("Opinion of Value Not Bracketed", "value_bracket_gap_pct", ">", 0, "pct"),
+    ("Wide Adjusted Price Spread", "adjusted_price_spread_pct", ">", 0.10, "pct"),
+]
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq}
+
+COMPARABLE_COLUMNS = [
+    "sale_price", "net_adjustment", "adjusted_price", "net_adjustment_pct", "gross_adjustment_pct", "sale_age_months", "distance_miles", "gla_variance_pct",
+]
+REPORT_COLUMNS = ["gla_bracket_gap_pct", "value_bracket_gap_pct", "adjusted_price_spread_pct"]
+
+# URAR sale dates read like 's03/24;c02/24' (settled, contract) or '03/2024'.
+SALE_DATE = re.compile(r'(?:\bs)?(\d{1,2})/(?:\d{1,2}/)?(\d{4}|\d{2})\b')
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+def sale_month(text):
+    """Returns the sale's (year, month) from a URAR sale date, preferring the settled date."""
+    matches = list(SALE_DATE.finditer(text or ''))
+    if not matches:
+        return None
+    match = next((m for m in matches if m.group(0).startswith('s')), matches[0])
+    month, year = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return (year + 2000 if year < 100 else year), month
+
+def _gap(value, low, high):
+    """How far `value` falls outside [low, high], relative to the value; 0 inside."""
+    if value is None or low is None or not value:
+        return None
+    if value < low:
+        return (low - value) / value
+    if value > high:
+        return (value - high) / value
+    return 0.0
+
+def _as_date(value):
+    """A date from a date, datetime or ISO date string; None if there is none."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value[:10]) if isinstance(value, str) else None
+    except ValueError:
+        return None
+
+def build_tables(reports, as_of=None):
+    """
+    Lays out the comparables of `reports` (structured_data dicts) as columns.
+    Returns (comparables, per_report): `comparables` has a 'report' and 'comp'
+    column plus COMPARABLE_COLUMNS, one row per comparable; `per_report` has
+    REPORT_COLUMNS, one row per report. Sale ages are measured from each
+    report's `effective_date`; `as_of` (one date per report or one for all) is
+    used for reports without one. Without either, sale ages are missing.
+    """
+    as_of_dates = as_of if isinstance(as_of, (list, tuple)) else [as_of] * len(reports)
+    comparables = {column: [] for column in ["report", "comp"] + COMPARABLE_COLUMNS}
+    per_report = {column: [] for column in REPORT_COLUMNS}
+
+    for index, structured_data in enumerate(reports):
+        structured_data = structured_data if isinstance(structured_data, dict) else {}
+        subject_gla = _number((structured_data.get('subject_property') or {}).get('gla_sqft'))
+        as_of_date = _as_date(structured_data.get('effective_date')) or _as_date(as_of_dates[index])
+        glas, adjusted_prices = [], []
+
+        for number, comp in enumerate(structured_data.get('comparables') or [], 1):
+            sale_price = _number(comp.get('sale_price'))
+            adjustments = [_number(value) for value in (comp.get('adjustments') or {}).values()]
+            net = _number(comp.get('net_adjustment_total'))
+            if net is None and sale_price and any(value is not None for value in adjustments):
+                net = sum(value for value in adjustments if value is not None)
+            gla = _number(comp.get('gla_sqft'))
+            sold = sale_month(comp.get('sale_date'))
+            adjusted_price = _number(comp.get('adjusted_sale_price'))
+            if adjusted_price is None and sale_price and net is not None:
+                adjusted_price = sale_price + net
+
+            comparables["report"].append(index)
+            comparables["comp"].append(comp.get('id') or number)
+            comparables["sale_price"].append(sale_price)
+            comparables["net_adjustment"].append(net)
+            comparables["adjusted_price"].append(adjusted_price)
+            comparables["net_adjustment_pct"].append(abs(net) / sale_price if sale_price and net is not None else None)
+            comparables["gross_adjustment_pct"].append(
+                sum(abs(value) for value in adjustments if value is not None) / sale_price
+                if sale_price and any(value is not None for value in adjustments) else None
+            )
+            comparables["sale_age_months"].append(
+                (as_of_date.year - sold[0]) * 12 + as_of_date.month - sold[1] if sold and as_of_date else None
+            )
+            comparables["distance_miles"].append(_number(comp.get('distance_to_subject_miles')))
+            comparables["gla_variance_pct"].append(
+                abs(gla - subject_gla) / subject_gla if gla is not None and subject_gla else None
+            )
+            if gla is not None:
+                glas.append(gla)
+            if adjusted_price is not None:
+                adjusted_prices.append(adjusted_price)
+
+        per_report["gla_bracket_gap_pct"].append(
+            _gap(subject_gla, min(glas), max(glas)) if glas else None
+        )
+        value = _number(structured_data.get('sales_comparison_value'))
+        per_report["value_bracket_gap_pct"].append(
+            _gap(value, min(adjusted_prices), max(adjusted_prices)) if adjusted_prices else None
+        )
+        per_report["adjusted_price_spread_pct"].append(
+            (max(adjusted_prices) - min(adjusted_prices)) / (value or sorted(adjusted_prices)[len(adjusted_prices) // 2])
+            if len(adjusted_prices) >= 2 else None
+        )
+    return comparables, per_report
+
+def _format(value, unit):
+    if unit == "pct":
+        return f"{value:.1%}"
+    if unit == "miles":
+        return f"{value:g} mi"
+    return f"{value:g} {unit}"
+
+def evaluate(reports, rules=RULES, as_of=None):
+    """
+    Evaluates `rules` over every report in `reports` (structured_data dicts)
+    together and returns one red_flags list per report, in order.
+    """
+    comparables, per_report = build_tables(reports, as_of)
+    results = [[] for _ in reports]
+    for rule_name, column, op, threshold, unit in rules:
+        compare = OPERATORS[op]
+        if column in per_report:
+            values = per_report[column]
+            for index, value in enumerate(values):
+                matched = value is not None and compare(value, threshold)
+                results[index].append({
+                    "rule_name": rule_name,
+                    "status": "Flagged" if matched else "Not Matched",
+                    "details": _format(value, unit) if matched else "",
+                })
+            continue
+
+        values = comparables[column]
+        matches = [[] for _ in reports]
+        for row, value in enumerate(values):
+            if value is not None and compare(value, threshold):
+                matches[comparables["report"][row]].append(f"Comp {comparables['comp'][row]} ({_format(value, unit)})")
+        for index, matched in enumerate(matches):
+            results[index].append({
+                "rule_name": rule_name,
+                "status": "Flagged" if matched else "Not Matched",
+                "details": ", ".join(matched),
+            })
+    return results
+
+def score_red_flags(structured_data, as_of=None):
+    """Evaluates RULES over one report's structured_data; returns its red_flags."""
+    return evaluate([structured_data], as_of=as_of)[0]
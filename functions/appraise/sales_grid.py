@@ -0,0 +1,246 @@
+"""
+Reads the URAR sales comparison grid straight from the tables PyMuPDF detects,
+into the `structured_data` schema the sales comparison agent produces. Cells
+the rules cannot read are listed as ambiguous for the agent to resolve.
+"""
+import re
+
+COMPARABLE_HEADER = re.compile(r'comparable\s+sale\s*(?:no\.?|#)?\s*(\d+)', re.I)
+SALES_COMPARISON_VALUE = re.compile(
+    r'Indicated\s+Value\s+by\s+Sales\s+Comparison\s+Approach[^\d]{0,40}(\d[\d,]*)', re.I
+)
+# The appraisal's effective date, from the certification ('Effective Date of
+# Appraisal 03/15/2024') or the reconciliation ('as of 03/15/2024, which is the
+# date of inspection and the effective date of this appraisal').
+EFFECTIVE_DATE = re.compile(
+    r'effective\s+date\s+of\s+(?:the\s+)?appraisal\W{0,20}(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})\b'
+    r'|as\s+of\s+(\d{1,2})/(\d{1,2})/(\d{4}|\d{2}),?\s+which\s+is\s+the\s+date\s+of\s+inspection',
+    re.I
+)
+NUMBER = re.compile(r'(\()?\s*([+-])?\s*\$?\s*([+-])?\s*(\d{1,3}(?:,\d{3})+|\d+)(\.\d+)?\s*(\))?')
+SQFT_PER_ACRE = 43560
+
+ADJUSTMENT_FIELDS = [
+    "location", "site", "view", "design_appeal", "quality", "age", "condition", "gla",
+    "basement", "garage_carport", "porch_patio_deck",
+]
+
+# Grid rows by the start of their label: (label pattern, description field,
+# adjustment field). The description field is read from each comparable's
+# description column, the adjustment field from its adjustment column.
+GRID_ROWS = [
+    (r'address', "address", None),
+    (r'proximity', "distance_to_subject_miles", None),
+    (r'sale price\s*/', None, None),
+    (r'sale price', "sale_price", None),
+    (r'date of sale', "sale_date", None),
+    (r'location', None, "location"),
+    (r'site', "lot_size_sqft", "site"),
+    (r'view', None, "view"),
+    (r'design', None, "design_appeal"),
+    (r'quality', None, "quality"),
+    (r'actual age', None, "age"),
+    (r'condition', None, "condition"),
+    (r'gross liv', "gla_sqft", "gla"),
+    (r'basement', None, "basement"),
+    (r'garage', None, "garage_carport"),
+    (r'porch', None, "porch_patio_deck"),
+    (r'net adj', None, "net_adjustment_total"),
+    (r'adjusted sale price', None, "adjusted_sale_price"),
+]
+TEXT_FIELDS = {"address", "sale_date"}
+SUBJECT_FIELDS = {"sale_price", "gla_sqft", "lot_size_sqft"}
+
+def _cell_text(cell):
+    return re.sub(r'\s+', ' ', cell or '').strip()
+
+def parse_number(text):
+    """
+    Parses the first amount in a cell, e.g. '$ 355,000', '-5,000', '(2,500)' or
+    '1,850 sf'. Returns (value, signed) where `signed` says whether the cell
+    gave an explicit sign, or None when there is no number.
+    """
+    match = NUMBER.search(text or '')
+    if match is None:
+        return None
+    paren_open, sign_before, sign_after, digits, fraction, paren_close = match.groups()
+    value = float(digits.replace(',', '') + (fraction or ''))
+    negative = (sign_before or sign_after) == '-' or bool(paren_open and paren_close)
+    if value.is_integer():
+        value = int(value)
+    return (-value if negative else value), bool(sign_before or sign_after or (paren_open and paren_close))
+
+def effective_date(md_text):
+    """Returns the appraisal's effective date from the report text as 'YYYY-MM-DD', or None."""
+    for match in EFFECTIVE_DATE.finditer(md_text or ''):
+        month, day, year = (int(group) for group in (match.group(1, 2, 3) if match.group(1) else match.group(4, 5, 6)))
+        if 1 <= month <= 12 and 1 <= day <= 31:
+            return f"{year + 2000 if year < 100 else year:04d}-{month:02d}-{day:02d}"
+    return None
+
+def _area_sqft(text):
+    parsed = parse_number(text)
+    if parsed is None:
+        return None
+    value = parsed[0]
+    if re.search(r'\bac(?:res?)?\b', text, re.I) and value < 1000:
+        value = round(value * SQFT_PER_ACRE)
+    return value
+
+def _row_field(label):
+    label = label.lower()
+    for pattern, description_field, adjustment_field in GRID_ROWS:
+        if re.match(pattern, label):
+            return description_field, adjustment_field
+    return None, None
+
+def _grid_columns(header):
+    """
+    Maps a grid's header row to its subject column and, per comparable number,
+    its (description column, adjustment column). A comparable spans the columns
+    up to the next one; its adjustment column is the last of them.
+    """
+    subject_column = None
+    starts = []
+    for column, cell in enumerate(header):
+        text = _cell_text(cell)
+        match = COMPARABLE_HEADER.search(text)
+        if match:
+            starts.append((int(match.group(1)), column))
+        elif subject_column is None and text.lower().startswith('subject'):
+            subject_column = column
+    comparables = {}
+    for i, (number, column) in enumerate(starts):
+        end = starts[i + 1][1] if i + 1 < len(starts) else len(header)
+        comparables[number] = (column, end - 1 if end - column >= 2 else None)
+    return subject_column, comparables
+
+def _grid_rows(tab):
+    rows = tab.extract()
+    if getattr(tab.header, "external", False):
+        rows = [tab.header.names] + rows
+    return rows
+
+def find_grid_tables(doc):
+    """Yields the rows of every detected table that looks like a sales comparison grid."""
+    for page in doc:
+        if 'comparable sale' not in page.get_text().lower():
+            continue
+        for tab in page.find_tables(strategy="lines_strict").tables:
+            rows = _grid_rows(tab)
+            for i, row in enumerate(rows):
+                if any(COMPARABLE_HEADER.search(_cell_text(cell)) for cell in row):
+                    yield rows[i:]
+                    break
+
+def read_grid(rows, subject, comparables, ambiguous):
+    """Reads one grid table into the `subject` and `comparables` dicts."""
+    subject_column, columns = _grid_columns(rows[0])
+    adjustment_sums = {number: 0 for number in columns}
+    net_cells = {}
+    # Every row between the sale price and the net adjustment holds adjustments,
+    # mapped to a schema field or not; their sum checks the net adjustment.
+    in_adjustments = False
+
+    for row in rows[1:]:
+        label = _cell_text(row[0]) if row else ''
+        description_field, adjustment_field = _row_field(label)
+
+        if description_field in SUBJECT_FIELDS and subject_column is not None and subject_column < len(row):
+            text = _cell_text(row[subject_column])
+            parsed = parse_number(text)
+            value = _area_sqft(text) if description_field == "lot_size_sqft" else (parsed[0] if parsed else None)
+            if value is not None:
+                subject.setdefault(description_field, value)
+
+        for number, (description_column, adjustment_column) in columns.items():
+            comparable = comparables.setdefault(number, {"id": number, "adjustments": {}})
+            description = _cell_text(row[description_column]) if description_column < len(row) else ''
+            adjustment = ''
+            if adjustment_column is not None and adjustment_column < len(row):
+                adjustment = _cell_text(row[adjustment_column])
+            parsed = parse_number(adjustment)
+
+            if description_field and description_field not in comparable:
+                if description_field in TEXT_FIELDS:
+                    value = description or None
+                elif description_field == "lot_size_sqft":
+                    value = _area_sqft(description)
+                else:
+                    # Sale prices sit in either half of the comparable's columns.
+                    value_parsed = parse_number(description) or parsed
+                    value = value_parsed[0] if value_parsed else None
+                text = description or (adjustment if description_field == "sale_price" else '')
+                if value is None and text:
+                    ambiguous.append({"comparable": number, "field": description_field, "text": text})
+                comparable[description_field] = value
+
+            if adjustment_field == "net_adjustment_total":
+                net_cells.setdefault(number, (parsed, adjustment))
+            elif adjustment_field == "adjusted_sale_price":
+                comparable.setdefault(adjustment_field, parsed[0] if parsed else None)
+            elif in_adjustments and parsed:
+                adjustment_sums[number] += parsed[0]
+
+            if adjustment_field and adjustment and parsed is None:
+                ambiguous.append({"comparable": number, "field": adjustment_field, "text": adjustment})
+            if adjustment_field in ADJUSTMENT_FIELDS and adjustment_field not in comparable["adjustments"]:
+                # A blank adjustment cell means no adjustment.
+                comparable["adjustments"][adjustment_field] = parsed[0] if parsed else (None if adjustment else 0)
+
+        if description_field == "sale_price":
+            in_adjustments = True
+        elif adjustment_field == "net_adjustment_total":
+            in_adjustments = False
+
+    # The net adjustment's sign is often a checkbox beside it; trust the sum of
+    # the adjustments when the magnitudes agree.
+    for number, (parsed, text) in net_cells.items():
+        comparable = comparables[number]
+        total = adjustment_sums[number]
+        if parsed is None:
+            comparable["net_adjustment_total"] = None if text else total
+        elif abs(parsed[0]) == abs(total):
+            comparable["net_adjustment_total"] = total
+        else:
+            comparable["net_adjustment_total"] = parsed[0]
+            ambiguous.append({"comparable": number, "field": "net_adjustment_total", "text": text})
+
+def extract_sales_grid(doc, md_text):
+    """
+    Extracts `structured_data` from the sales comparison grid of an opened URAR
+    document. Returns (structured_data, ambiguous) where `ambiguous` lists the
+    cells left unread as {comparable, field, text}, or (None, []) when the
+    document has no recognizable grid.
+    """
+    subject, comparables, ambiguous = {}, {}, []
+    for rows in find_grid_tables(doc):
+        read_grid(rows, subject, comparables, ambiguous)
+    comparables = [
+        comparables[number] for number in sorted(comparables)
+        if comparables[number].get("address") or comparables[number].get("sale_price") is not None
+    ]
+    if not comparables:
+        return None, []
+
+    for comparable in comparables:
+        for field in ["address", "distance_to_subject_miles", "sale_price", "sale_date", "gla_sqft",
+                      "lot_size_sqft", "net_adjustment_total", "adjusted_sale_price"]:
+            comparable.setdefault(field, None)
+        for field in ADJUSTMENT_FIELDS:
+            comparable["adjustments"].setdefault(field, None)
+
+    match = SALES_COMPARISON_VALUE.search(md_text or '')
+    sales_comparison_value = int(match.group(1).replace(',', '')) if match else None
+    if sales_comparison_value is None:
+        ambiguous.append({"comparable": None, "field": "sales_comparison_value", "text": ""})
+
+    structured_data = {
+        "subject_property": {field: subject.get(field) for field in ["gla_sqft", "lot_size_sqft", "sale_price"]},
+        "comparables": comparables,
+        "sales_comparison_value": sales_comparison_value,
+    }
+    return structured_data, [
+        cell for cell in ambiguous
+        if cell["comparable"] is None or any(c["id"] == cell["comparable"] for c in comparables)
+    ]
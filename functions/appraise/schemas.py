@@ -0,0 +1,88 @@
+"""
+Output schemas of the JSON agents. Each is sent to the model as its response
+schema and used to validate what comes back. Gemini's schemas only allow
+`Optional` unions, so every amount is an optional float, and have no field
+defaults, so the defaults are left out of the JSON schema (see Schema). List
+schemas must be builtin `list[...]` aliases; the SDK rejects `typing.List`.
+"""
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+def drop_defaults(schema):
+    """Removes field defaults from a model's JSON schema; Gemini's Schema has no `default`."""
+    for field_schema in schema.get('properties', {}).values():
+        field_schema.pop('default', None)
+
+class Schema(BaseModel):
+    """Base of the agent schemas: missing optional fields validate as None, but
+    the defaults are not sent to the model."""
+    model_config = ConfigDict(json_schema_extra=drop_defaults)
+
+class PropertyInfo(Schema):
+    PropertyAddress: Optional[str] = None
+    City: Optional[str] = None
+    State: Optional[str] = None
+    ZipCode: Optional[str] = None
+    County: Optional[str] = None
+    NeighborhoodName: Optional[str] = None
+
+class SubjectProperty(Schema):
+    gla_sqft: Optional[float] = None
+    lot_size_sqft: Optional[float] = None
+    sale_price: Optional[float] = None
+
+class Adjustments(Schema):
+    location: Optional[float] = None
+    site: Optional[float] = None
+    view: Optional[float] = None
+    design_appeal: Optional[float] = None
+    quality: Optional[float] = None
+    age: Optional[float] = None
+    condition: Optional[float] = None
+    gla: Optional[float] = None
+    basement: Optional[float] = None
+    garage_carport: Optional[float] = None
+    porch_patio_deck: Optional[float] = None
+
+class Comparable(Schema):
+    id: int
+    address: Optional[str] = None
+    distance_to_subject_miles: Optional[float] = None
+    sale_price: Optional[float] = None
+    sale_date: Optional[str] = None
+    gla_sqft: Optional[float] = None
+    lot_size_sqft: Optional[float] = None
+    adjustments: Adjustments
+    net_adjustment_total: Optional[float] = None
+    adjusted_sale_price: Optional[float] = None
+
+class SalesComparison(Schema):
+    subject_property: SubjectProperty
+    comparables: list[Comparable]
+    sales_comparison_value: Optional[float] = None
+
+class GridCell(Schema):
+    """A resolved sales grid cell: `number` for amounts, `text` for addresses and dates."""
+    cell: int
+    number: Optional[float] = None
+    text: Optional[str] = None
+
+class ImpactSummary(Schema):
+    summary_of_impact: str
+
+class Compilation(Schema):
+    executive_summary: str
+    strategic_recommendations: list[str]
+
+class Citation(Schema):
+    citation: str
+    explanation: str
+
+class ComplianceReview(Schema):
+    dispute_strength_score: float
+    strengths: list[str]
+    weaknesses: list[str]
+
+QualitativeFindings = list[str]
+GridCells = list[GridCell]
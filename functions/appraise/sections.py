@@ -0,0 +1,73 @@
+"""
+Section index over the parsed Markdown. The parser records where each heading's
+section starts and ends, and agents that declare the sections they need in
+AGENT_SECTIONS are sent only those slices of the report instead of all of it.
+"""
+import logging
+import re
+
+from .agents import AGENT_SECTIONS
+
+HEADING_PATTERN = re.compile(r'^(#{1,6}) +(.+?)\s*$', re.M)
+# Keeps the index well inside the report document's size limit.
+MAX_INDEXED_SECTIONS = 500
+# A selection shorter than this most likely matched a heading without its body;
+# the agent gets the whole report instead.
+MIN_SELECTED_CHARS = 500
+
+def build_section_index(md_text):
+    """
+    Returns the Markdown's headings as a list of {title, level, start, end}
+    entries, where [start, end) is the heading's section in `md_text`: from the
+    heading up to the next heading of the same or a higher level.
+    """
+    headings = []
+    for match in HEADING_PATTERN.finditer(md_text):
+        title = re.sub(r'[*_`~]', '', match.group(2)).strip()
+        if title:
+            headings.append({"title": title, "level": len(match.group(1)), "start": match.start()})
+    headings = headings[:MAX_INDEXED_SECTIONS]
+
+    for i, heading in enumerate(headings):
+        heading["end"] = next(
+            (later["start"] for later in headings[i + 1:] if later["level"] <= heading["level"]),
+            len(md_text)
+        )
+    return headings
+
+def select_sections(parsed_text, section_index, wanted):
+    """
+    Returns the slices of `parsed_text` whose heading contains any of the
+    `wanted` titles (case-insensitively), in document order, or None if none
+    match. Nested matches are only included once.
+    """
+    wanted = [title.lower() for title in wanted]
+    ranges = sorted(
+        (entry["start"], entry["end"]) for entry in section_index
+        if any(title in entry["title"].lower() for title in wanted)
+    )
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    if not merged:
+        return None
+    return "\n".join(parsed_text[start:end].strip() for start, end in merged)
+
+def parsed_text_for_agent(agent_name, parsed_text, section_index, log_prefix=""):
+    """
+    Narrows the parsed text to the sections an agent declared in AGENT_SECTIONS.
+    Falls back to the full text when the agent declares none, the report has no
+    index, or nothing usable matches.
+    """
+    wanted = AGENT_SECTIONS.get(agent_name)
+    if not wanted or not section_index or parsed_text is None:
+        return parsed_text
+    selected = select_sections(parsed_text, section_index, wanted)
+    if selected is None or len(selected) < MIN_SELECTED_CHARS:
+        logging.info(f"{log_prefix} No usable sections matching {wanted}; sending the full text.")
+        return parsed_text
+    logging.info(f"{log_prefix} Sending sections {wanted}: {len(selected)} of {len(parsed_text)} characters.")
+    return selected
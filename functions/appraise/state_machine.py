@@ -0,0 +1,59 @@
+"""Function 3: advances a report through its stages as they change."""
+import logging
+from datetime import datetime, timezone
+
+from firebase_functions.firestore_fn import on_document_updated, Change
+
+from .core import get_db, snapshot_field
+from .pipeline import dispatch_agents, finalize_report, inline_run_lost, next_transitions, unfinished_agents
+
+@on_document_updated(document="reports/{fileId}")
+def report_state_machine_v2(event: Change):
+    """
+    Triggered by updates to a report document. Diffs only the `stages` map and
+    applies the resulting transitions: dispatching agents whose dependencies are
+    now complete, and finalizing the report once the pipeline has settled.
+    """
+    before_stages = snapshot_field(event.data.before, "stages", {})
+    after_stages = snapshot_field(event.data.after, "stages", {})
+
+    # Result payloads, status and timestamp writes leave the stages untouched.
+    if before_stages == after_stages:
+        return
+
+    to_dispatch, outcome = next_transitions(before_stages, after_stages)
+    after = event.data.after
+    # Inline reports run their whole agent graph in pipeline_executor_v2, which
+    # switches them to 'distributed' if it has to hand agents off. A run that
+    # ended without doing so leaves them to be handed off here.
+    execution_mode = snapshot_field(after, "executionMode")
+    run_lost = inline_run_lost(execution_mode, snapshot_field(after, "inlineStartedAt"), datetime.now(timezone.utc))
+    if not to_dispatch and not outcome and not run_lost:
+        return
+
+    file_id = event.params['fileId']
+    log_prefix = f"[{file_id}]"
+    report_ref = get_db().collection('reports').document(file_id)
+
+    if snapshot_field(after, "status") in ('complete', 'error'):
+        return
+
+    if run_lost:
+        logging.warning(f"{log_prefix} Inline run ended without handing off; switching to distributed.")
+        report_ref.set({'executionMode': 'distributed'}, merge=True)
+        execution_mode = 'distributed'
+        to_dispatch = unfinished_agents(after_stages)
+
+    if to_dispatch and execution_mode != "inline":
+        logging.info(f"{log_prefix} Dependencies satisfied. Dispatching agents: {to_dispatch}")
+        dispatch_agents(
+            to_dispatch, file_id, snapshot_field(after, "uid"), snapshot_field(after, "parsedTextPath"),
+            snapshot_field(after, "parsedTextGeneration"), snapshot_field(after, "parsedTextBytes")
+        )
+
+    if outcome:
+        logging.info(f"{log_prefix} Analysis pipeline settled. Finalizing report as '{outcome}'.")
+        try:
+            finalize_report(report_ref, outcome, log_prefix)
+        except Exception as e:
+            logging.error(f"{log_prefix} Failed to finalize report: {e}", exc_info=True)
@@ -0,0 +1,100 @@
+"""
+Live agent output: partial LLM text mirrored into `output.<stage>` on the report
+as a list of lines, so the dashboard can render it while the agent is running.
+"""
+import os
+import time
+import logging
+import threading
+
+# Partial output is only streamed when enabled; the final result is written
+# either way.
+STREAM_AGENT_OUTPUT = os.getenv('STREAM_AGENT_OUTPUT', '1') == '1'
+
+# Cap on partial-output writes per report document per second, shared by every
+# agent streaming into the same report from this process. Lines that arrive
+# between writes are coalesced into the next one.
+OUTPUT_WRITES_PER_SEC = float(os.getenv('OUTPUT_WRITES_PER_SEC', '1'))
+
+_last_output_write = {}
+_last_output_write_lock = threading.Lock()
+
+def acquire_write_slot(document_path, min_interval):
+    """Reserves the next write to a document if `min_interval` has passed since the last."""
+    now = time.monotonic()
+    with _last_output_write_lock:
+        last = _last_output_write.get(document_path)
+        if last is not None and now - last < min_interval:
+            return False
+        if len(_last_output_write) >= 1024:
+            # Forget reports nobody has written to recently.
+            for path, written_at in list(_last_output_write.items()):
+                if now - written_at >= min_interval:
+                    del _last_output_write[path]
+        _last_output_write[document_path] = now
+        return True
+
+class OutputStream:
+    """
+    Collects an agent's streamed text and writes its completed lines to
+    `output.<firestore_field>`. Each write replaces the whole list, so a skipped
+    (throttled) write loses nothing. The final result write clears the field.
+    """
+
+    def __init__(self, report_ref, firestore_field, log_prefix, writes_per_sec=OUTPUT_WRITES_PER_SEC):
+        self.report_ref = report_ref
+        self.firestore_field = firestore_field
+        self.log_prefix = log_prefix
+        self.min_interval = 1.0 / writes_per_sec if writes_per_sec > 0 else 0.0
+        self.format_line = None
+        self.lines = []
+        self.chunks = 0
+        self.writes = 0
+        self._pending = ""
+        self._written = 0
+
+    def append(self, text):
+        """Adds a chunk of model output and writes any new lines if the throttle allows."""
+        self.chunks += 1
+        self._pending += text
+        *complete, self._pending = self._pending.split("\n")
+        for line in complete:
+            if self.format_line:
+                line = self.format_line(line)
+            if line and line.strip():
+                self.lines.append(line.rstrip())
+        self.flush()
+
+    def flush(self):
+        if len(self.lines) == self._written:
+            return
+        if not acquire_write_slot(self.report_ref.path, self.min_interval):
+            return
+        try:
+            self.report_ref.set({'output': {self.firestore_field: list(self.lines)}}, merge=True)
+            self._written = len(self.lines)
+            self.writes += 1
+        except Exception as e:
+            logging.warning(f"{self.log_prefix} Failed to write partial output: {e}")
+
+def stream_text(model, prompt, analysis_context, format_line=None, generation_config=None):
+    """
+    Generates text for `prompt`. When the executor attached an OutputStream to
+    the context, the response is consumed as a stream and its lines are mirrored
+    to the report as they arrive; `format_line` can rewrite or drop (by returning
+    None) each line before it is shown. Returns the full response text.
+    """
+    stream = analysis_context.get('output_stream')
+    if stream is None:
+        return model.generate_content(prompt, generation_config=generation_config).text
+
+    stream.format_line = format_line
+    response = model.generate_content(prompt, generation_config=generation_config, stream=True)
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. safety metadata) have nothing to show.
+            continue
+        stream.append(text)
+    return response.text
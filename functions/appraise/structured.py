@@ -0,0 +1,71 @@
+"""
+Schema-constrained JSON output for the agents. The model is asked for JSON
+matching a declared schema (see schemas.py), the response is validated against
+it, and an invalid response gets exactly one repair attempt that sends only the
+bad JSON and its errors back. Output that still does not validate fails the
+stage instead of being stored as an error value for later agents to consume.
+"""
+import json
+import logging
+
+from .core import record_metric
+from .llm_cache import generate
+
+class StructuredOutputError(ValueError):
+    """Raised when a model's output does not match its schema after a repair attempt."""
+
+def repair_prompt(schema_json, errors, output):
+    return f"""
+    The JSON below does not match its required schema. Correct it, changing as little as possible.
+    **Schema:** {schema_json}
+    **Validation Errors:** {errors}
+    **JSON:** {output}
+    **Output:**
+    Return only the corrected JSON.
+    """
+
+def record_structured_outcome(template, outcome, log_prefix):
+    """
+    Records a structured generation as a `structured_output` metric: 'valid',
+    'repaired' or 'failed', labelled by prompt template.
+    """
+    record_metric('structured_output', log_prefix, outcome=outcome, template=template.__name__)
+
+def generate_structured(model_name, prompt, schema, analysis_context, template, stream=False, format_line=None):
+    """
+    Generates JSON for `prompt` constrained to `schema` (a pydantic model or a
+    builtin alias such as list[str]) and returns it validated, as plain JSON data.
+    Raises StructuredOutputError if neither the response nor its repair validates.
+    """
+    import pydantic
+
+    log_prefix = f"[{analysis_context.get('file_id')}][{template.__name__}]"
+    adapter = pydantic.TypeAdapter(schema)
+    generation_config = {"response_mime_type": "application/json", "response_schema": schema}
+    last_output = {}
+
+    def validate(text):
+        last_output["text"] = text
+        return adapter.dump_python(adapter.validate_json(text), mode='json')
+
+    try:
+        result = generate(
+            model_name, prompt, analysis_context, template, parse=validate, stream=stream,
+            format_line=format_line, generation_config=generation_config
+        )
+        record_structured_outcome(template, 'valid', log_prefix)
+        return result
+    except pydantic.ValidationError as e:
+        logging.warning(f"{log_prefix} Output failed validation; attempting one repair: {e.error_count()} errors.")
+        errors = e
+
+    prompt = repair_prompt(json.dumps(adapter.json_schema()), str(errors), last_output.get("text", ""))
+    try:
+        result = generate(
+            model_name, prompt, analysis_context, repair_prompt, parse=validate, generation_config=generation_config
+        )
+    except pydantic.ValidationError as e:
+        record_structured_outcome(template, 'failed', log_prefix)
+        raise StructuredOutputError(f"{template.__name__} output does not match its schema: {e}") from e
+    record_structured_outcome(template, 'repaired', log_prefix)
+    return result
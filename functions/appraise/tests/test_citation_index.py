@@ -0,0 +1,57 @@
+"""Looking up red flag citations in the bundled citation index."""
+import json
+
+import pytest
+
+from appraise.citation_index import BUNDLED_CITATIONS_PATH, CitationIndex, rule_key, terms
+
+@pytest.fixture
+def index():
+    with open(BUNDLED_CITATIONS_PATH) as f:
+        return CitationIndex(json.load(f))
+
+def lookup(index, rule_name, details=""):
+    entry = index.lookup({"rule_name": rule_name, "details": details})
+    return entry and entry["rule_name"]
+
+def test_terms_and_rule_key():
+    assert terms("Excessive Net Adjustments (Comp 1: 16.2%)") == ["excessive", "net", "adjustment"]
+    assert rule_key("Net Adjustments, Excessive") == "net-adjustment-excessive"
+    assert rule_key("") == "unnamed"
+
+def test_every_bundled_rule_is_found_by_name(index):
+    for entry in index.entries:
+        assert index.lookup({"rule_name": entry["rule_name"].upper(), "details": ""}) is entry
+
+@pytest.mark.parametrize("rule_name, details, expected", [
+    ("Excessive Net Adjustment", "Comp 1 (17.0%)", "Excessive Net Adjustments"),
+    ("Excessive Gross Adjustments Percentage", "", "Excessive Gross Adjustments"),
+    ("Dated Sales", "Comp 2 (15 months)", "Dated Comparable Sales"),
+    ("Comparables Too Distant", "", "Distant Comparables"),
+    ("Living Area Not Bracketed", "", "Subject Living Area Not Bracketed"),
+    ("Wide Spread of Adjusted Prices", "", "Wide Adjusted Price Spread"),
+    ("Inconsistent Quality Rating", "", "Inconsistent Condition or Quality Ratings"),
+])
+def test_variants_of_a_bundled_rule_name_are_found(index, rule_name, details, expected):
+    assert lookup(index, rule_name, details) == expected
+
+@pytest.mark.parametrize("rule_name, details", [
+    ("Excessive Site Adjustment", "Comp 2: site adjustment of $40,000"),
+    ("Excessive Location Adjustment", "Comp 1 (12.0% of sale price)"),
+    ("Excessive Time Adjustment", "Comp 3 adjusted for market conditions"),
+    ("Unsupported Site Value", ""),
+    ("Dated Listing", ""),
+    ("Flood Zone Not Reported", ""),
+    ("", "Comp 1 (17.0%)"),
+])
+def test_rules_that_only_share_generic_terms_are_not_matched(index, rule_name, details):
+    assert lookup(index, rule_name, details) is None
+
+def test_a_learned_rule_is_found_once_added(index):
+    assert lookup(index, "Excessive Site Adjustment") is None
+    index.add({
+        "rule_name": "Excessive Site Adjustment", "keywords": ["site", "lot"],
+        "citation": "Fannie Mae Selling Guide B4-1.3-09", "explanation": "Site adjustments need support.",
+    })
+    assert lookup(index, "Excessive Site Adjustments") == "Excessive Site Adjustment"
+    assert lookup(index, "Excessive Net Adjustment") == "Excessive Net Adjustments"
@@ -0,0 +1,66 @@
+"""Seeding a re-uploaded report from the user's earlier report of the same PDF."""
+import types
+
+import pytest
+
+from appraise import content_index
+from appraise.content_index import seed_from_duplicate
+
+class FakeDb:
+    """Stands in for the Firestore client, over a dict of document paths to fields."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def collection(self, collection):
+        return types.SimpleNamespace(document=lambda document_id: FakeDocument(self, f"{collection}/{document_id}"))
+
+class FakeDocument:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def get(self, field_paths=None):
+        data = self.db.documents.get(self.path)
+        return types.SimpleNamespace(
+            exists=data is not None, to_dict=lambda: dict(data), get=lambda field: data[field]
+        )
+
+SOURCE_STAGES = {
+    'parsing': 'complete', 'property_info': 'complete', 'structured_data': 'complete', 'red_flags': 'failed',
+    'dispute_letter': 'complete',
+}
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDb({
+        'content_index/user-1_abc123': {
+            'fileId': 'report-1', 'parsedTextPath': 'parsed-text/report-1.md',
+            'parsedTextGeneration': 7, 'parsedTextBytes': 100,
+        },
+        'reports/report-1': {
+            'stages': SOURCE_STAGES, 'sectionIndex': [{'title': 'Subject'}], 'effectiveDate': '2024-05-01',
+            'property_info': {'address': '1 Main St'}, 'structured_data': {'comparables': []},
+            'red_flags': None, 'dispute_letter': 'Dear Sir or Madam',
+        },
+    })
+    monkeypatch.setattr(content_index, 'get_db', lambda: db)
+    return db
+
+def test_a_duplicate_reuses_the_parse_and_upload_independent_results(db):
+    seeded = seed_from_duplicate('user-1', 'abc123', '[report-2]')
+    assert seeded == {
+        'parsedTextPath': 'parsed-text/report-1.md', 'parsedTextGeneration': 7, 'parsedTextBytes': 100,
+        'sectionIndex': [{'title': 'Subject'}], 'executionMode': 'distributed', 'dedupedFrom': 'report-1',
+        'effectiveDate': '2024-05-01',
+        'property_info': {'address': '1 Main St'}, 'structured_data': {'comparables': []},
+        # Failed stages run again; the dispute letter names the uploader, so it is rewritten.
+        'stages': {'parsing': 'complete', 'property_info': 'complete', 'structured_data': 'complete'},
+    }
+
+def test_another_users_upload_of_the_same_pdf_is_not_a_duplicate(db):
+    assert seed_from_duplicate('user-2', 'abc123', '[report-2]') is None
+
+def test_a_deleted_source_report_is_not_reused(db):
+    del db.documents['reports/report-1']
+    assert seed_from_duplicate('user-1', 'abc123', '[report-2]') is None
@@ -0,0 +1,113 @@
+"""Small shared helpers of the core module."""
+import json
+import types
+
+import pytest
+
+from appraise import core
+from appraise.core import load_parsed_text, publish_messages, record_metric
+
+def test_record_metric_writes_one_structured_log_line(capsys):
+    record_metric('llm_cache', '[report-1]', outcome='hit', template=str)
+    entry = json.loads(capsys.readouterr().out)
+    assert entry == {
+        'severity': 'INFO', 'message': '[report-1] llm_cache', 'metric': 'llm_cache',
+        'outcome': 'hit', 'template': "<class 'str'>",
+    }
+
+class FakeFuture:
+    def __init__(self, error=None):
+        self.error = error
+
+    def result(self, timeout=None):
+        if self.error is not None:
+            raise self.error
+        return "message-id"
+
+class FakePublisher:
+    """Stands in for a PublisherClient; messages with an 'error' fail when awaited, or at submit if 'raise'."""
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic_path, data):
+        message_data = json.loads(data)
+        if message_data.get('raise'):
+            raise RuntimeError("publisher closed")
+        self.published.append((topic_path, message_data))
+        return FakeFuture(RuntimeError(message_data['error']) if 'error' in message_data else None)
+
+def test_one_failed_publish_does_not_lose_the_other_sends(monkeypatch):
+    publisher = FakePublisher()
+    monkeypatch.setattr(core, 'get_publisher', lambda: publisher)
+    messages = [
+        ('topics/run-agent', {'agent': 'red_flag', 'error': 'deadline exceeded'}),
+        ('topics/run-agent', {'agent': 'dollar_impact', 'raise': True}),
+        ('topics/run-agent', {'agent': 'citation'}),
+    ]
+    failures = publish_messages(messages, '[report-1]')
+    assert [message_data['agent'] for _, message_data in publisher.published] == ['red_flag', 'citation']
+    assert [(message_data['agent'], str(error)) for message_data, error in failures] == [
+        ('dollar_impact', 'publisher closed'), ('red_flag', 'deadline exceeded'),
+    ]
+
+class FakeBucket:
+    """Stands in for the Storage bucket over {path: (generation, data)}, recording downloads."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.downloads = []
+
+    def get_blob(self, path):
+        if path not in self.objects:
+            return None
+        return types.SimpleNamespace(generation=self.objects[path][0])
+
+    def blob(self, path, generation=None):
+        def download_as_bytes():
+            self.downloads.append((path, generation))
+            current_generation, data = self.objects[path]
+            assert generation == current_generation
+            return data
+        return types.SimpleNamespace(download_as_bytes=download_as_bytes)
+
+@pytest.fixture
+def bucket(monkeypatch):
+    """Two parsed texts of 6 bytes each, behind an empty 10-byte cache."""
+    bucket = FakeBucket({'parsed-text/report-1.md': (1, b'report'), 'parsed-text/report-2.md': (1, b'second')})
+    monkeypatch.setattr(core, 'get_storage_client', lambda: bucket)
+    monkeypatch.setattr(core, 'PARSED_TEXT_CACHE_MAX_BYTES', 10)
+    monkeypatch.setattr(core, '_parsed_text_cache', None)
+    monkeypatch.setattr(core, 'parsed_text_cache_stats', {"hits": 0, "misses": 0})
+    return bucket
+
+def test_the_same_generation_is_downloaded_once(bucket):
+    assert load_parsed_text('parsed-text/report-1.md', generation=1) == "report"
+    assert load_parsed_text('parsed-text/report-1.md') == "report"
+    assert bucket.downloads == [('parsed-text/report-1.md', 1)]
+    assert core.parsed_text_cache_stats == {"hits": 1, "misses": 1}
+
+def test_a_new_generation_is_downloaded_again(bucket):
+    load_parsed_text('parsed-text/report-1.md')
+    bucket.objects['parsed-text/report-1.md'] = (2, b'parsed')
+    assert load_parsed_text('parsed-text/report-1.md') == "parsed"
+    assert bucket.downloads == [('parsed-text/report-1.md', 1), ('parsed-text/report-1.md', 2)]
+
+def test_the_least_recently_used_text_is_evicted(bucket):
+    load_parsed_text('parsed-text/report-1.md', generation=1)
+    load_parsed_text('parsed-text/report-2.md', generation=1)
+    load_parsed_text('parsed-text/report-2.md', generation=1)
+    load_parsed_text('parsed-text/report-1.md', generation=1)
+    assert bucket.downloads == [
+        ('parsed-text/report-1.md', 1), ('parsed-text/report-2.md', 1), ('parsed-text/report-1.md', 1),
+    ]
+
+def test_a_text_larger_than_the_cache_is_not_cached(bucket):
+    bucket.objects['parsed-text/report-1.md'] = (1, b'a long parsed report')
+    load_parsed_text('parsed-text/report-1.md', generation=1)
+    assert load_parsed_text('parsed-text/report-1.md', generation=1) == "a long parsed report"
+    assert len(bucket.downloads) == 2
+
+def test_a_missing_parsed_text_is_not_found(bucket):
+    with pytest.raises(FileNotFoundError):
+        load_parsed_text('parsed-text/report-3.md')
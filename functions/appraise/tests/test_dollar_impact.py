@@ -0,0 +1,68 @@
+"""The deterministic dollar impact of a report's sales grid."""
+import pytest
+
+from appraise.dollar_impact import estimate_impact, estimate_impacts
+
+def comparable(id, sale_price, net=0):
+    return {"id": id, "sale_price": sale_price, "net_adjustment_total": net, "adjusted_sale_price": None}
+
+def report(value, *comparables):
+    return {"sales_comparison_value": value, "comparables": list(comparables), "effective_date": "2024-06-01"}
+
+@pytest.mark.parametrize("structured_data, expected_range, expected_factors", [
+    # At the median of identical adjusted prices: nothing to measure.
+    (report(300000, comparable(1, 300000), comparable(2, 300000)), [0, 0], []),
+    # Inside the range but off the median, plus half the spread.
+    (
+        report(305000, comparable(1, 290000), comparable(2, 300000), comparable(3, 310000)),
+        [5000, 15000],
+        [
+            "Opinion of value $305,000 is $5,000 above the median adjusted sale price ($300,000).",
+            "Adjusted sale prices span $20,000.",
+        ],
+    ),
+    # Outside the range: the median gap is the larger one, then half the spread.
+    (
+        report(330000, comparable(1, 300000), comparable(2, 310000)),
+        [25000, 30000],
+        [
+            "Opinion of value $330,000 is $25,000 above the median adjusted sale price ($305,000).",
+            "Opinion of value falls $20,000 outside the adjusted sale prices ($300,000 to $310,000).",
+            "Adjusted sale prices span $10,000.",
+        ],
+    ),
+    # Net adjustments beyond the 5% rule, in either direction, averaged over the comparables.
+    (
+        report(330000, comparable(1, 300000, net=30000), comparable(2, 330000), comparable(3, 360000, net=-30000)),
+        [0, 9000],
+        ["Net adjustments exceed 5% of sale price by $27,000 in total (Comp 1, Comp 3)."],
+    ),
+])
+def test_estimate_impact(structured_data, expected_range, expected_factors):
+    impact = estimate_impact(structured_data)
+    assert impact["estimated_impact_range"] == expected_range
+    assert impact["key_contributing_factors"] == expected_factors
+
+@pytest.mark.parametrize("structured_data", [
+    None,
+    {},
+    report(300000),
+    report(None, comparable(1, 300000)),
+    report(0, comparable(1, 300000)),
+    report(300000, comparable(1, None, net=None)),
+])
+def test_nothing_to_measure_has_no_impact(structured_data):
+    assert estimate_impact(structured_data) == {
+        "estimated_impact_range": [0, 0],
+        "summary_of_impact": "The sales grid does not give an opinion of value and adjusted sale prices to measure against.",
+        "key_contributing_factors": [],
+    }
+
+def test_reports_are_estimated_independently_in_one_pass():
+    inside = report(305000, comparable(1, 290000), comparable(2, 300000), comparable(3, 310000))
+    outside = report(330000, comparable(1, 300000), comparable(2, 310000))
+    impacts = estimate_impacts([inside, None, outside])
+    assert [impact["estimated_impact_range"] for impact in impacts] == [[5000, 15000], [0, 0], [25000, 30000]]
+    assert impacts[2]["summary_of_impact"] == (
+        "Based on the sales grid, the opinion of value may be misstated by $25,000 to $30,000."
+    )
@@ -0,0 +1,162 @@
+"""Coalesced stage writes while an agent runs, stage leases, and the in-process agent graph."""
+import asyncio
+import threading
+import time
+import types
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from appraise import execution
+from appraise.execution import claim_stage, release_stage, run_agent_graph, stage_running, wait_for_stage
+
+class RecordingRef:
+    """Stands in for a report DocumentReference, recording merge writes."""
+
+    def __init__(self, block=None):
+        self.writes = []
+        self.block = block
+
+    def set(self, data, merge=False):
+        if self.block is not None:
+            self.block.wait()
+        self.writes.append((data, merge))
+
+RUNNING = ({'stages': {'red_flags': 'running'}}, True)
+
+def test_fast_agents_skip_the_running_write():
+    ref = RecordingRef()
+    with stage_running(ref, 'red_flags', '', delay=0.2):
+        pass
+    time.sleep(0.3)
+    assert ref.writes == []
+
+def test_slow_agents_are_marked_running_once():
+    ref = RecordingRef()
+    with stage_running(ref, 'red_flags', '', delay=0.05):
+        time.sleep(0.2)
+    time.sleep(0.1)
+    assert ref.writes == [RUNNING]
+
+def test_a_zero_delay_writes_running_before_the_block():
+    ref = RecordingRef()
+    with stage_running(ref, 'red_flags', '', delay=0):
+        assert ref.writes == [RUNNING]
+
+def test_the_running_write_never_lands_after_the_block():
+    # The timer fires during the block but its write is still in flight when
+    # the block ends: leaving waits for it, so a later 'complete' wins.
+    release = threading.Event()
+    ref = RecordingRef(block=release)
+    exited = threading.Event()
+
+    def run():
+        with stage_running(ref, 'red_flags', '', delay=0.01):
+            time.sleep(0.1)
+        exited.set()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    time.sleep(0.2)
+    assert not exited.is_set()
+    release.set()
+    thread.join(1)
+    assert exited.is_set() and ref.writes == [RUNNING]
+
+def test_the_agent_graph_abandons_agents_at_its_deadline(monkeypatch):
+    # 'slow' outlasts the deadline; 'after_slow' depends on it and never starts.
+    slow_done = threading.Event()
+    monkeypatch.setattr(execution, 'AGENT_MAP', {
+        'fast': (lambda context: 'fast result', 'fast', ['parsed_text']),
+        'slow': (lambda context: slow_done.wait(1) and 'late', 'slow', ['fast']),
+        'after_slow': (lambda context: 'never', 'after_slow', ['slow']),
+    })
+    claimed, released, saved = [], [], []
+    monkeypatch.setattr(execution, 'claim_stage', lambda ref, field, lease_sec: claimed.append(field) or (field, 'pending'))
+    monkeypatch.setattr(execution, 'release_stage', lambda ref, field, token: released.append(field))
+    monkeypatch.setattr(execution, 'save_agent_result', lambda ref, field, result, log_prefix: saved.append(result))
+    monkeypatch.setattr(execution, 'STREAM_AGENT_OUTPUT', False)
+
+    outcomes = asyncio.run(run_agent_graph(RecordingRef(), 'report-1', "text", deadline=time.monotonic() + 0.2))
+    assert outcomes == {'fast': True, 'slow': None, 'after_slow': None}
+    assert claimed == ['fast', 'slow'] and released == ['slow'] and saved == ['fast result']
+
+class LeaseRef:
+    """Stands in for a report DocumentReference over a nested dict, read and updated by dotted paths."""
+
+    id = 'report-1'
+
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, field_paths=None, transaction=None):
+        def get(path):
+            value = self.data
+            for key in path.split('.'):
+                value = value[key]
+            return value
+        return types.SimpleNamespace(exists=self.data is not None, get=get)
+
+    def update(self, updates):
+        for path, value in updates.items():
+            *parents, key = path.split('.')
+            document = self.data
+            for parent in parents:
+                document = document.setdefault(parent, {})
+            if value == '<delete>':
+                document.pop(key, None)
+            else:
+                document[key] = value
+
+@pytest.fixture
+def transactions(monkeypatch):
+    transaction = types.SimpleNamespace(update=lambda ref, updates: ref.update(updates))
+    monkeypatch.setattr(execution, 'get_firestore', lambda: types.SimpleNamespace(
+        transactional=lambda function: lambda transaction: function(transaction), DELETE_FIELD='<delete>'
+    ))
+    monkeypatch.setattr(execution, 'get_db', lambda: types.SimpleNamespace(transaction=lambda: transaction))
+
+def lease(token, expires_in):
+    return {'token': token, 'expiresAt': datetime.now(timezone.utc) + timedelta(seconds=expires_in)}
+
+def test_an_unclaimed_stage_is_leased_to_this_worker(transactions):
+    ref = LeaseRef({'stages': {'red_flags': 'pending'}})
+    token, status = claim_stage(ref, 'red_flags', lease_sec=60)
+    assert token is not None and status == 'pending'
+    assert ref.data['leases']['red_flags']['token'] == token
+    assert ref.data['leases']['red_flags']['expiresAt'] > datetime.now(timezone.utc) + timedelta(seconds=50)
+
+def test_a_live_lease_is_not_claimed(transactions):
+    ref = LeaseRef({'stages': {'red_flags': 'running'}, 'leases': {'red_flags': lease('other', 60)}})
+    assert claim_stage(ref, 'red_flags') == (None, 'running')
+    assert ref.data['leases']['red_flags']['token'] == 'other'
+
+def test_an_expired_lease_is_taken_over(transactions):
+    ref = LeaseRef({'stages': {'red_flags': 'running'}, 'leases': {'red_flags': lease('other', -1)}})
+    token, status = claim_stage(ref, 'red_flags')
+    assert token not in (None, 'other') and status == 'running'
+    assert ref.data['leases']['red_flags']['token'] == token
+
+def test_a_complete_stage_is_not_claimed(transactions):
+    ref = LeaseRef({'stages': {'red_flags': 'complete'}})
+    assert claim_stage(ref, 'red_flags') == (None, 'complete')
+    assert 'leases' not in ref.data
+
+def test_claiming_a_deleted_report_fails(transactions):
+    with pytest.raises(FileNotFoundError):
+        claim_stage(LeaseRef(None), 'red_flags')
+
+def test_only_the_lease_holder_releases_it(transactions):
+    ref = LeaseRef({'leases': {'red_flags': lease('mine', 60), 'citations': lease('other', 60)}})
+    release_stage(ref, 'red_flags', 'mine')
+    release_stage(ref, 'citations', 'mine')
+    assert list(ref.data['leases']) == ['citations']
+
+def test_waiting_returns_once_the_other_worker_finishes():
+    ref = LeaseRef({'stages': {'red_flags': 'running'}})
+    threading.Timer(0.05, lambda: ref.update({'stages.red_flags': 'complete'})).start()
+    assert wait_for_stage(ref, 'red_flags', timeout=1, interval=0.01) == 'complete'
+
+def test_waiting_gives_up_with_the_last_status_seen():
+    ref = LeaseRef({'stages': {}})
+    assert wait_for_stage(ref, 'red_flags', timeout=0.05, interval=0.01) == 'pending'
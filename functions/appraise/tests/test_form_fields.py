@@ -0,0 +1,80 @@
+"""Reading the subject property from URAR form widgets and printed labels."""
+import pytest
+
+from appraise.form_fields import _clean, _normalize, extract_property_info, fields_from_text, fields_from_widgets
+
+def make_form(widgets=(), rows=()):
+    """A one-page PDF with text widgets {field name: value} and printed text rows."""
+    pymupdf = pytest.importorskip("pymupdf", exc_type=ImportError)
+    doc = pymupdf.open()
+    page = doc.new_page()
+    for i, (field_name, field_value) in enumerate(dict(widgets).items()):
+        widget = pymupdf.Widget()
+        widget.field_type = pymupdf.PDF_WIDGET_TYPE_TEXT
+        widget.field_name = field_name
+        widget.field_value = field_value
+        widget.rect = pymupdf.Rect(300, 400 + 25 * i, 550, 420 + 25 * i)
+        page.add_widget(widget)
+    for i, row in enumerate(rows):
+        page.insert_text((40, 60 + 20 * i), row, fontsize=9)
+    return pymupdf.open("pdf", doc.tobytes())
+
+@pytest.mark.parametrize("name, expected", [
+    ("Property Address", "propertyaddress"),
+    ("Subject.Zip-Code", "subjectzipcode"),
+    ("form1[0].Subject[0].City[0]", "form1subjectcity"),
+])
+def test_normalize(name, expected):
+    assert _normalize(name) == expected
+
+@pytest.mark.parametrize("value, expected", [
+    ("  12  Oak\nLane ;", "12 Oak Lane"),
+    (": Springfield,", "Springfield"),
+    (" : ", None),
+    (None, None),
+])
+def test_clean(value, expected):
+    assert _clean(value) == expected
+
+def test_fields_from_widgets():
+    doc = make_form({
+        "form1[0].Subject[0].PropertyAddress[0]": "12 Oak Lane",
+        "Subject City": "Springfield",
+        "Borrower City": "Chicago",
+        "LenderZip": "60601",
+        "ZIP": "62701",
+        "County": "",
+        "Neighborhood Name": " Oak  Hills ",
+    })
+    assert fields_from_widgets(doc) == {
+        "PropertyAddress": "12 Oak Lane", "City": "Springfield", "ZipCode": "62701", "NeighborhoodName": "Oak Hills",
+    }
+
+def test_a_flattened_form_has_no_widget_fields():
+    assert fields_from_widgets(make_form(rows=["Property Address 12 Oak Lane"])) == {}
+
+def test_fields_from_text_stop_at_the_next_label():
+    doc = make_form(rows=[
+        "Property Address 12 Oak Lane City Springfield State IL Zip Code 62701",
+        "Borrower Jane Doe Owner of Public Record John Doe County Sangamon",
+        "Neighborhood Name Oak Hills Map Reference 12-34 Census Tract 0021.00",
+    ])
+    assert fields_from_text(doc) == {
+        "PropertyAddress": "12 Oak Lane", "City": "Springfield", "State": "IL", "ZipCode": "62701",
+        "County": "Sangamon", "NeighborhoodName": "Oak Hills",
+    }
+
+def test_widget_values_win_over_label_text():
+    doc = make_form(
+        widgets={"Property Address": "14 Oak Lane", "County": "Sangamon"},
+        rows=["Property Address 12 Oak Lane City Springfield County Cook", "Neighborhood Name Oak Hills"],
+    )
+    property_info, coverage, source = extract_property_info(doc)
+    assert property_info == {
+        "PropertyAddress": "14 Oak Lane", "City": "Springfield", "County": "Sangamon", "NeighborhoodName": "Oak Hills",
+    }
+    assert (coverage, source) == (1.0, "widgets")
+
+def test_coverage_counts_required_fields_only():
+    doc = make_form(rows=["City Springfield State IL Zip Code 62701"])
+    assert extract_property_info(doc) == ({"City": "Springfield", "State": "IL", "ZipCode": "62701"}, 0.25, "text")
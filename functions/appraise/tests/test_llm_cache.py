@@ -0,0 +1,111 @@
+"""The LLM response cache: its keys, its modes and expiry of stored responses."""
+import types
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from appraise import llm_cache
+from appraise.llm_cache import generate, llm_cache_key
+
+CONTEXT = {'file_id': 'report-1'}
+
+def property_prompt():
+    return "Describe the property."
+
+def neighborhood_prompt():
+    return "Describe the neighborhood."
+
+class FakeModel:
+    """Stands in for a GenerativeModel, numbering its responses."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        return types.SimpleNamespace(text=f"response {self.calls}")
+
+class FakeDocument:
+    """Stands in for an `llm_cache` DocumentReference backed by a dict."""
+
+    def __init__(self, store, key):
+        self.store = store
+        self.key = key
+
+    def get(self):
+        data = self.store.get(self.key)
+        return types.SimpleNamespace(exists=data is not None, to_dict=lambda: dict(data))
+
+    def set(self, data):
+        self.store[self.key] = data
+
+@pytest.fixture
+def cache(monkeypatch):
+    """An empty cache in both tiers, in front of a FakeModel."""
+    cache = types.SimpleNamespace(store={}, model=FakeModel())
+    monkeypatch.setattr(llm_cache, '_local_cache', None)
+    monkeypatch.setattr(llm_cache, 'llm_cache_ref', lambda key: FakeDocument(cache.store, key))
+    monkeypatch.setattr(llm_cache, 'get_firestore', lambda: types.SimpleNamespace(SERVER_TIMESTAMP='now'))
+    monkeypatch.setattr(llm_cache, 'get_model', lambda model_name: cache.model)
+    return cache
+
+def ask(prompt="Subject: 1 Main St"):
+    return generate('gemini', prompt, CONTEXT, property_prompt)
+
+def test_keys_cover_model_template_and_prompt():
+    key = llm_cache_key('gemini', property_prompt, "Subject: 1 Main St")
+    assert key == llm_cache_key('gemini', property_prompt, "Subject: 1 Main St")
+    assert key != llm_cache_key('gemini-pro', property_prompt, "Subject: 1 Main St")
+    assert key != llm_cache_key('gemini', neighborhood_prompt, "Subject: 1 Main St")
+    assert key != llm_cache_key('gemini', property_prompt, "Subject: 2 Main St")
+
+def test_keys_cover_the_response_schema_fields():
+    pydantic = pytest.importorskip("pydantic")
+
+    def key(schema):
+        config = {"response_mime_type": "application/json", "response_schema": schema}
+        return llm_cache_key('gemini', property_prompt, "Subject: 1 Main St", config)
+
+    Result = pydantic.create_model('Result', value=(int, ...))
+    Renamed = pydantic.create_model('Result', appraised_value=(int, ...))
+    assert key(Result) == key(pydantic.create_model('Result', value=(int, ...)))
+    assert key(Result) != key(Renamed)
+    assert key(list[str]) != key(list[int])
+
+def test_on_serves_stored_responses_from_either_tier(monkeypatch, cache):
+    monkeypatch.setattr(llm_cache, 'LLM_CACHE_MODE', 'on')
+    assert ask() == "response 1"
+    assert ask() == "response 1"
+    monkeypatch.setattr(llm_cache, '_local_cache', None)  # a new instance
+    assert ask() == "response 1"
+    assert ask("Subject: 2 Main St") == "response 2"
+    assert cache.model.calls == 2
+
+def test_refresh_regenerates_and_stores_the_fresh_response(monkeypatch, cache):
+    monkeypatch.setattr(llm_cache, 'LLM_CACHE_MODE', 'on')
+    ask()
+    monkeypatch.setattr(llm_cache, 'LLM_CACHE_MODE', 'refresh')
+    assert ask() == "response 2"
+    monkeypatch.setattr(llm_cache, 'LLM_CACHE_MODE', 'on')
+    assert ask() == "response 2"
+
+def test_off_neither_reads_nor_stores(monkeypatch, cache):
+    monkeypatch.setattr(llm_cache, 'LLM_CACHE_MODE', 'off')
+    assert ask() == "response 1"
+    assert ask() == "response 2"
+    assert cache.store == {}
+
+def test_expired_responses_are_regenerated(monkeypatch, cache):
+    monkeypatch.setattr(llm_cache, 'LLM_CACHE_MODE', 'on')
+    ask()
+    [entry] = cache.store.values()
+    assert entry['expiresAt'] > datetime.now(timezone.utc) + timedelta(seconds=llm_cache.LLM_CACHE_TTL_SEC - 60)
+    entry['expiresAt'] = datetime.now(timezone.utc) - timedelta(seconds=1)
+    monkeypatch.setattr(llm_cache, '_local_cache', None)
+    assert ask() == "response 2"
+
+def test_responses_over_the_entry_limit_are_not_stored(monkeypatch, cache):
+    monkeypatch.setattr(llm_cache, 'LLM_CACHE_MODE', 'on')
+    monkeypatch.setattr(llm_cache, 'LLM_CACHE_MAX_ENTRY_BYTES', 4)
+    ask()
+    assert cache.store == {}
@@ -0,0 +1,52 @@
+"""Each deployed function imports only its own module, and no heavy library, at cold start."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import appraise
+
+pytest.importorskip("firebase_functions.options", exc_type=ImportError)
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(appraise.__file__)), "main.py")
+
+# Loaded on first use by the functions that need them, never at import.
+HEAVY_MODULES = ["pymupdf", "pymupdf4llm", "google.generativeai", "google.genai", "pydantic"]
+
+def import_main(function_target, tmp_path):
+    """Imports main in a fresh interpreter; returns its loaded modules and FUNCTION_MODULES."""
+    # Loaded by path: the repository root, which may be on sys.path, has a main.py of its own.
+    script = (
+        "import importlib.util, json, sys\n"
+        f"spec = importlib.util.spec_from_file_location('main', {MAIN_PATH!r})\n"
+        "main = importlib.util.module_from_spec(spec)\n"
+        "spec.loader.exec_module(main)\n"
+        "print(json.dumps([sorted(sys.modules), main.FUNCTION_MODULES]))"
+    )
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(path for path in sys.path if path),
+        "FUNCTION_TARGET": function_target,
+        "FIREBASE_CONFIG": json.dumps({"projectId": "test-project", "storageBucket": "test-bucket"}),
+    }
+    completed = subprocess.run(
+        [sys.executable, "-c", script], cwd=tmp_path, env=env, capture_output=True, text=True, check=True
+    )
+    modules, function_modules = json.loads(completed.stdout.splitlines()[-1])
+    return set(modules), function_modules
+
+@pytest.mark.parametrize("function_target", [
+    "upload_trigger_v2", "pdf_parser_v2", "report_state_machine_v2", "agent_executor_v2", "pipeline_executor_v2",
+])
+def test_a_function_imports_only_its_own_module(function_target, tmp_path):
+    modules, function_modules = import_main(function_target, tmp_path)
+    assert modules.isdisjoint(HEAVY_MODULES)
+    for name, module in function_modules.items():
+        assert (module in modules) == (name == function_target)
+
+def test_deployment_discovery_sees_every_function(tmp_path):
+    modules, function_modules = import_main("", tmp_path)
+    assert modules.isdisjoint(HEAVY_MODULES)
+    assert set(function_modules.values()) <= modules
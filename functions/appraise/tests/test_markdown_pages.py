@@ -0,0 +1,53 @@
+"""
+Header levels counted during the Markdown conversion must be the ones
+IdentifyHeaders counts, and pages yielded one by one must match to_markdown.
+"""
+import pytest
+
+pymupdf4llm = pytest.importorskip("pymupdf4llm", exc_type=ImportError)
+
+import pymupdf  # noqa: E402
+
+BODY = "Body text of the report, repeated to make this the body font size. " * 3
+
+def make_doc(pages=1, margin_size=20):
+    """Pages with a heading and body text, and a large running header in the top margin."""
+    doc = pymupdf.open()
+    for pno in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 30), "Running Header", fontsize=margin_size)
+        page.insert_text((72, 100), f"Heading {pno + 1}", fontsize=16)
+        page.insert_textbox(pymupdf.Rect(72, 120, 540, 700), BODY * 4, fontsize=11)
+    return pymupdf.open("pdf", doc.tobytes())
+
+@pytest.mark.parametrize("margins", [0, (0, 50, 0, 50)])
+def test_counted_header_levels_are_identify_headers(margins):
+    doc = make_doc()
+    counted = pymupdf4llm.to_markdown(doc, margins=margins)
+    doc = make_doc()
+    identified = pymupdf4llm.to_markdown(doc, margins=margins, hdr_info=pymupdf4llm.IdentifyHeaders(doc))
+    assert counted == identified
+    # The running header's size is a level even where the margins omit its text.
+    assert "## Heading 1" in counted
+
+@pytest.mark.parametrize("concurrency", [None, 2])
+def test_pages_are_yielded_in_order_as_to_markdown_converts_them(concurrency):
+    expected = pymupdf4llm.to_markdown(make_doc(pages=5), page_chunks=True)
+    pages = list(pymupdf4llm.to_markdown_pages(make_doc(pages=5), concurrency=concurrency))
+    assert [page["metadata"]["page"] for page in pages] == [1, 2, 3, 4, 5]
+    assert [page["text"] for page in pages] == [page["text"] for page in expected]
+
+def test_header_levels_come_from_the_first_pages():
+    doc = make_doc(pages=3)
+    doc[2].insert_text((72, 60), "Appendix", fontsize=24)
+    pages = list(pymupdf4llm.to_markdown_pages(doc, header_pages=2))
+    # The Appendix size is not a level there, so Heading 3 stays one level up.
+    assert "## Heading 3" in pages[2]["text"] and "### Heading 3" not in pages[2]["text"]
+    assert "### Heading 3" in "".join(
+        page["text"] for page in pymupdf4llm.to_markdown_pages(doc, header_pages=None)
+    )
+
+def test_abandoned_concurrent_conversion_stops_its_workers():
+    pages = pymupdf4llm.to_markdown_pages(make_doc(pages=6), concurrency=3)
+    assert next(pages)["metadata"]["page"] == 1
+    pages.close()
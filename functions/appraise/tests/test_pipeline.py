@@ -0,0 +1,86 @@
+"""The agent dependency graph and the state machine's transitions over it."""
+from datetime import datetime, timedelta, timezone
+
+from appraise.agents import AGENT_MAP, ANALYSIS_STAGES
+from appraise.pipeline import (
+    PARSING_STAGE, PIPELINE_TIMEOUT_SEC, agent_stage_dependencies, dependent_stages, failed_or_blocked_stages,
+    inline_run_lost, next_transitions, pipeline_outcome, ready_agents, unfinished_agents,
+)
+
+def stages(**statuses):
+    result = {stage: 'pending' for stage in [PARSING_STAGE] + ANALYSIS_STAGES}
+    result.update(statuses)
+    return result
+
+def complete(*stage_names, **statuses):
+    return stages(**{**{stage: 'complete' for stage in stage_names}, **statuses})
+
+def test_every_dependency_is_a_stage():
+    for agent_name in AGENT_MAP:
+        for stage in agent_stage_dependencies(agent_name):
+            assert stage == PARSING_STAGE or stage in ANALYSIS_STAGES
+
+def test_report_inputs_are_not_stage_dependencies():
+    assert agent_stage_dependencies("run_dispute_letter_agent") == ["citations", "property_info", "structured_data"]
+    assert agent_stage_dependencies("run_sales_comp_agent") == [PARSING_STAGE] * 3
+
+def test_dependent_stages_are_transitive():
+    assert dependent_stages(["red_flags"]) == {"red_flags", "citations", "dispute_letter", "compliance"}
+    assert dependent_stages(["fullName"]) == {"fullName", "dispute_letter", "compliance"}
+
+def test_failures_block_their_dependents_transitively():
+    assert failed_or_blocked_stages(stages(red_flags='failed')) == {
+        "red_flags", "citations", "dispute_letter", "compliance",
+    }
+
+def test_ready_agents():
+    assert ready_agents(stages()) == []
+    assert ready_agents(complete(PARSING_STAGE)) == [
+        "run_property_info_agent", "run_sales_comp_agent", "run_qualitative_analysis",
+    ]
+    # Agents whose stage is running, complete or failed are not ready again.
+    assert ready_agents(complete(PARSING_STAGE, property_info='running', structured_data='failed')) == [
+        "run_qualitative_analysis",
+    ]
+
+def test_next_transitions_dispatches_only_newly_ready_agents():
+    before = complete(PARSING_STAGE, "property_info", "qualitative_analysis_findings")
+    after = complete(PARSING_STAGE, "property_info", "qualitative_analysis_findings", "structured_data")
+    assert next_transitions(before, after) == (["run_red_flag_agent", "run_dollar_impact_agent"], None)
+    # A redelivered event sees no change and dispatches nothing.
+    assert next_transitions(after, after) == ([], None)
+
+def test_next_transitions_finalizes_once():
+    done = complete(PARSING_STAGE, *ANALYSIS_STAGES)
+    almost = complete(PARSING_STAGE, *ANALYSIS_STAGES, compliance='running')
+    assert next_transitions(almost, done) == ([], 'complete')
+    assert next_transitions(done, done) == ([], None)
+
+def test_pipeline_outcome():
+    assert pipeline_outcome(complete(PARSING_STAGE, *ANALYSIS_STAGES)) == 'complete'
+    assert pipeline_outcome(complete(PARSING_STAGE)) is None
+    # A failure only settles the pipeline once every stage it does not block is done.
+    failed = complete(PARSING_STAGE, "property_info", "structured_data", red_flags='failed')
+    assert pipeline_outcome(failed) is None
+    settled = complete(
+        PARSING_STAGE, "property_info", "structured_data", "qualitative_analysis_findings", "dollar_impact",
+        "dollar_impact_summary", "compilation", red_flags='failed'
+    )
+    assert pipeline_outcome(settled) == 'error'
+    assert next_transitions(failed, settled) == ([], 'error')
+
+def test_unfinished_agents_include_stages_left_running():
+    stages_left = complete(PARSING_STAGE, property_info='running', structured_data='failed')
+    assert unfinished_agents(stages_left) == ["run_property_info_agent", "run_qualitative_analysis"]
+    assert unfinished_agents(stages_left, ["run_qualitative_analysis", "run_red_flag_agent"]) == [
+        "run_qualitative_analysis",
+    ]
+
+def test_an_inline_run_is_lost_once_it_has_outlived_an_invocation():
+    now = datetime.now(timezone.utc)
+    started = now - timedelta(seconds=PIPELINE_TIMEOUT_SEC)
+    assert not inline_run_lost('inline', started, now)
+    assert inline_run_lost('inline', started, now + timedelta(seconds=1))
+    assert not inline_run_lost('distributed', started, now + timedelta(seconds=1))
+    # A run that has not started yet is still to come.
+    assert not inline_run_lost('inline', None, now)
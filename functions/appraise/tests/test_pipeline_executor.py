@@ -0,0 +1,43 @@
+"""Handing an inline report's agents off to the distributed path."""
+import types
+
+import pytest
+
+pytest.importorskip("firebase_functions.options", exc_type=ImportError)
+
+from appraise import pipeline_executor  # noqa: E402
+from appraise.agents import AGENT_MAP  # noqa: E402
+
+class ReportRef:
+    """Stands in for a report DocumentReference with the given fields."""
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.writes = []
+
+    def set(self, data, merge=False):
+        self.writes.append(data)
+
+    def get(self, field_paths=None):
+        return types.SimpleNamespace(exists=True, get=self.fields.get, to_dict=lambda: dict(self.fields))
+
+def test_the_handoff_dispatches_only_agents_that_can_run_now(monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(pipeline_executor, 'dispatch_agents', lambda agents, *args: dispatched.append((agents, args)))
+    ref = ReportRef(
+        stages={'parsing': 'complete', 'property_info': 'running', 'structured_data': 'complete'},
+        uid='user-1', parsedTextPath='parsed-text/report-1.md', parsedTextGeneration=7, parsedTextBytes=100,
+    )
+    pipeline_executor.hand_off_to_distributed(ref, 'report-1', list(AGENT_MAP), '[report-1]')
+    assert ref.writes == [{'executionMode': 'distributed'}]
+    assert dispatched == [(
+        ["run_property_info_agent", "run_qualitative_analysis", "run_red_flag_agent", "run_dollar_impact_agent"],
+        ('report-1', 'user-1', 'parsed-text/report-1.md', 7, 100),
+    )]
+
+def test_a_handoff_with_nothing_ready_dispatches_nothing(monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(pipeline_executor, 'dispatch_agents', lambda agents, *args: dispatched.append(agents))
+    ref = ReportRef(stages={'parsing': 'complete', 'property_info': 'running'})
+    pipeline_executor.hand_off_to_distributed(ref, 'report-1', ["run_red_flag_agent"], '[report-1]')
+    assert ref.writes == [{'executionMode': 'distributed'}] and dispatched == []
@@ -0,0 +1,87 @@
+"""The declarative red flag rules over the comparables of structured_data."""
+from datetime import date, datetime, timezone
+
+from appraise.red_flags import RULES, build_tables, evaluate, sale_month, score_red_flags
+
+def comparable(id, sale_price, sale_date="s03/24;c02/24", gla=1800, net=None, adjustments=None):
+    return {
+        "id": id, "sale_price": sale_price, "sale_date": sale_date, "gla_sqft": gla,
+        "distance_to_subject_miles": 0.5, "net_adjustment_total": net,
+        "adjusted_sale_price": None, "adjustments": adjustments or {},
+    }
+
+def report(*comparables, effective_date="2024-06-01", value=350000, subject_gla=1800):
+    return {
+        "subject_property": {"gla_sqft": subject_gla, "lot_size_sqft": None, "sale_price": None},
+        "comparables": list(comparables),
+        "sales_comparison_value": value,
+        "effective_date": effective_date,
+    }
+
+def flags(red_flags):
+    return {flag["rule_name"]: flag for flag in red_flags}
+
+def test_every_rule_is_reported():
+    red_flags = score_red_flags(report(comparable(1, 350000)))
+    assert [flag["rule_name"] for flag in red_flags] == [rule[0] for rule in RULES]
+
+def test_sale_month_prefers_the_settled_date():
+    assert sale_month("s03/24;c02/24") == (2024, 3)
+    assert sale_month("c02/24;s03/24") == (2024, 3)
+    assert sale_month("03/2024") == (2024, 3)
+    assert sale_month("13/24") is None
+    assert sale_month("") is None
+
+def test_sale_age_is_measured_from_the_effective_date():
+    comparables, _ = build_tables([report(comparable(1, 350000), effective_date="2025-06-15")])
+    assert comparables["sale_age_months"] == [15]
+    red_flags = flags(score_red_flags(report(comparable(1, 350000), effective_date="2025-06-15")))
+    assert red_flags["Dated Comparable Sales"]["status"] == "Flagged"
+    assert red_flags["Dated Comparable Sales"]["details"] == "Comp 1 (15 months)"
+
+def test_effective_date_wins_over_as_of():
+    data = report(comparable(1, 350000), effective_date="2024-06-01")
+    comparables, _ = build_tables([data], as_of=datetime(2030, 1, 1, tzinfo=timezone.utc))
+    assert comparables["sale_age_months"] == [3]
+
+def test_as_of_is_used_per_report_without_an_effective_date():
+    reports = [report(comparable(1, 350000), effective_date=None), report(comparable(1, 350000), effective_date=None)]
+    comparables, _ = build_tables(reports, as_of=[date(2024, 4, 1), datetime(2025, 4, 1, tzinfo=timezone.utc)])
+    assert comparables["sale_age_months"] == [1, 13]
+
+def test_without_any_date_sale_ages_are_missing_and_never_flag():
+    comparables, _ = build_tables([report(comparable(1, 350000, sale_date="s01/10"), effective_date=None)])
+    assert comparables["sale_age_months"] == [None]
+    red_flags = flags(score_red_flags(report(comparable(1, 350000, sale_date="s01/10"), effective_date=None)))
+    assert red_flags["Dated Comparable Sales"]["status"] == "Not Matched"
+
+def test_net_and_gross_adjustments():
+    data = report(comparable(1, 300000, adjustments={"location": -10000, "gla": 25000, "condition": -70000}))
+    comparables, _ = build_tables([data])
+    assert comparables["net_adjustment"] == [-55000]
+    assert abs(comparables["net_adjustment_pct"][0] - 55000 / 300000) < 1e-9
+    assert abs(comparables["gross_adjustment_pct"][0] - 105000 / 300000) < 1e-9
+    red_flags = flags(score_red_flags(data))
+    assert red_flags["Excessive Net Adjustments"]["status"] == "Flagged"
+    assert red_flags["Excessive Gross Adjustments"]["status"] == "Flagged"
+
+def test_bracketing_and_spread_are_per_report():
+    bracketed = report(comparable(1, 340000, gla=1700, net=0), comparable(2, 360000, gla=1900, net=0))
+    unbracketed = report(
+        comparable(1, 300000, gla=1500, net=0), comparable(2, 310000, gla=1600, net=0), subject_gla=2000
+    )
+    _, per_report = build_tables([bracketed, unbracketed])
+    assert per_report["gla_bracket_gap_pct"][0] == 0.0
+    assert per_report["gla_bracket_gap_pct"][1] == (2000 - 1600) / 2000
+    assert per_report["value_bracket_gap_pct"][0] == 0.0
+    assert per_report["value_bracket_gap_pct"][1] == (350000 - 310000) / 350000
+    assert per_report["adjusted_price_spread_pct"] == [20000 / 350000, 10000 / 350000]
+
+def test_batch_evaluation_matches_single_reports():
+    reports = [
+        report(comparable(1, 300000, sale_date="s01/23", adjustments={"location": -20000})),
+        report(comparable(1, 350000), comparable(2, 420000, gla=2400), effective_date="2024-12-31"),
+        {"comparables": []},
+        "error",
+    ]
+    assert evaluate(reports) == [score_red_flags(data) for data in reports]
@@ -0,0 +1,78 @@
+"""Reading the URAR sales comparison grid and its related fields from the parsed text."""
+import pytest
+
+from appraise.sales_grid import effective_date, parse_number, read_grid
+
+@pytest.mark.parametrize("text, expected", [
+    ("$ 355,000", (355000, False)),
+    ("-5,000", (-5000, True)),
+    ("+ $2,500", (2500, True)),
+    ("$-2,500", (-2500, True)),
+    ("(2,500)", (-2500, True)),
+    ("1,850 sf", (1850, False)),
+    ("0.25 ac", (0.25, False)),
+    ("0", (0, False)),
+])
+def test_parse_number(text, expected):
+    assert parse_number(text) == expected
+
+@pytest.mark.parametrize("text", ["", None, "N/A", "Average"])
+def test_parse_number_without_a_number(text):
+    assert parse_number(text) is None
+
+HEADER = ["FEATURE", "SUBJECT", "COMPARABLE SALE # 1", "", "COMPARABLE SALE # 2", ""]
+
+def test_read_grid():
+    rows = [
+        HEADER,
+        ["Address", "1 Main St", "2 Oak Ave", "", "3 Elm Rd", ""],
+        ["Sale Price", "$ 350,000", "", "$ 340,000", "", "$ 365,000"],
+        ["Date of Sale/Time", "", "s03/24;c02/24", "", "s01/24", ""],
+        ["Site", "0.25 ac", "10,890 sf", "0", "0.5 ac", "-10,000"],
+        ["Condition", "C3", "C3", "", "C2", "(15,000)"],
+        ["Gross Living Area", "1,800 sf", "1,750 sf", "+2,500", "1,900", "-5,000"],
+        ["Net Adj. (total)", "", "", "2,500", "", "30,000"],
+        ["Adjusted Sale Price", "", "", "$ 342,500", "", "$ 335,000"],
+    ]
+    subject, comparables, ambiguous = {}, {}, []
+    read_grid(rows, subject, comparables, ambiguous)
+    assert subject == {"sale_price": 350000, "lot_size_sqft": 10890, "gla_sqft": 1800}
+    first, second = comparables[1], comparables[2]
+    assert first["address"] == "2 Oak Ave" and first["sale_price"] == 340000
+    assert first["lot_size_sqft"] == 10890 and first["gla_sqft"] == 1750
+    assert first["adjustments"] == {"site": 0, "condition": 0, "gla": 2500}
+    assert first["net_adjustment_total"] == 2500 and first["adjusted_sale_price"] == 342500
+    assert second["lot_size_sqft"] == 21780
+    assert second["adjustments"] == {"site": -10000, "condition": -15000, "gla": -5000}
+    # An unsigned net adjustment takes its sign from the adjustments' sum.
+    assert second["net_adjustment_total"] == -30000
+    assert ambiguous == []
+
+def test_read_grid_lists_unreadable_cells():
+    rows = [
+        HEADER,
+        ["Sale Price", "", "", "$ 340,000", "", "$ 365,000"],
+        ["Condition", "C3", "C3", "see comments", "C2", "-15,000"],
+        ["Net Adj. (total)", "", "", "", "", "20,000"],
+    ]
+    subject, comparables, ambiguous = {}, {}, []
+    read_grid(rows, subject, comparables, ambiguous)
+    assert comparables[1]["adjustments"]["condition"] is None
+    assert comparables[2]["net_adjustment_total"] == 20000
+    assert ambiguous == [
+        {"comparable": 1, "field": "condition", "text": "see comments"},
+        {"comparable": 2, "field": "net_adjustment_total", "text": "20,000"},
+    ]
+
+def test_effective_date_from_the_certification():
+    assert effective_date("Effective Date of Appraisal 03/15/2024\nName") == "2024-03-15"
+    assert effective_date("| Effective Date of Appraisal: | 3/5/24 |") == "2024-03-05"
+
+def test_effective_date_from_the_reconciliation():
+    text = "my (our) opinion of the market value ... as of 06/01/2024, which is the date of inspection and"
+    assert effective_date(text) == "2024-06-01"
+
+def test_effective_date_missing_or_invalid():
+    assert effective_date("Date of Sale/Time s03/24;c02/24") is None
+    assert effective_date("Effective Date of Appraisal 15/03/2024") is None
+    assert effective_date(None) is None
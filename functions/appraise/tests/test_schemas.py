@@ -0,0 +1,53 @@
+"""
+The agent schemas must convert to Gemini response schemas the way
+generate_structured sends them, and validate the model's JSON.
+"""
+import types
+
+import pytest
+
+pydantic = pytest.importorskip("pydantic")
+
+from appraise import schemas  # noqa: E402
+
+def agent_schemas():
+    """Every schema in schemas.py: the Schema models and the list aliases."""
+    return [
+        value for name, value in vars(schemas).items()
+        if (isinstance(value, type) and issubclass(value, schemas.Schema) and value is not schemas.Schema)
+        or isinstance(value, types.GenericAlias)
+    ]
+
+@pytest.mark.parametrize("schema", agent_schemas(), ids=str)
+def test_schema_converts_to_generation_config(schema):
+    generation_types = pytest.importorskip("google.generativeai.types.generation_types")
+    from google.generativeai import protos
+
+    config = generation_types.to_generation_config_dict(
+        {"response_mime_type": "application/json", "response_schema": schema}
+    )
+    protos.GenerationConfig(config)
+
+@pytest.mark.parametrize("schema", agent_schemas(), ids=str)
+def test_schema_has_no_defaults(schema):
+    def defaults(node):
+        if isinstance(node, dict):
+            return ("default" in node) + sum(defaults(value) for value in node.values())
+        if isinstance(node, list):
+            return sum(defaults(value) for value in node)
+        return 0
+
+    assert defaults(pydantic.TypeAdapter(schema).json_schema()) == 0
+
+def test_missing_optional_fields_validate_as_none():
+    data = pydantic.TypeAdapter(schemas.SalesComparison).validate_json(
+        '{"subject_property": {}, "comparables": [{"id": 1, "adjustments": {"gla": -5000}}]}'
+    )
+    assert data.subject_property.sale_price is None
+    assert data.comparables[0].adjustments.gla == -5000
+    assert data.comparables[0].adjustments.site is None
+    assert data.sales_comparison_value is None
+
+def test_list_schemas_are_builtin_aliases():
+    assert isinstance(schemas.QualitativeFindings, types.GenericAlias)
+    assert isinstance(schemas.GridCells, types.GenericAlias)
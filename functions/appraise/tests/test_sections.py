@@ -0,0 +1,53 @@
+"""The section index over the parsed Markdown and the slices agents are sent."""
+from appraise.sections import MIN_SELECTED_CHARS, build_section_index, parsed_text_for_agent, select_sections
+
+TEXT = (
+    "# Uniform Residential Appraisal Report\n"
+    "## **Subject**\n"
+    "Property Address 1 Main St\n"
+    "## Neighborhood\n"
+    "Suburban\n"
+    "### Neighborhood Description\n"
+    "Stable values\n"
+    "## Sales Comparison Approach\n"
+    "| Feature | Subject | Comparable Sale # 1 |\n"
+)
+
+def titles(index):
+    return [(entry["title"], entry["level"]) for entry in index]
+
+def test_build_section_index():
+    index = build_section_index(TEXT)
+    assert titles(index) == [
+        ("Uniform Residential Appraisal Report", 1), ("Subject", 2), ("Neighborhood", 2),
+        ("Neighborhood Description", 3), ("Sales Comparison Approach", 2),
+    ]
+    assert index[0]["start"] == 0 and index[0]["end"] == len(TEXT)
+    assert TEXT[index[1]["start"]:index[1]["end"]] == "## **Subject**\nProperty Address 1 Main St\n"
+    # A section runs to the next heading of the same or a higher level.
+    assert index[2]["end"] == index[4]["start"] and index[3]["end"] == index[4]["start"]
+
+def test_build_section_index_skips_empty_headings():
+    assert titles(build_section_index("# **\ntext\n#not a heading\n## Site\n")) == [("Site", 2)]
+
+def test_select_sections_merges_nested_matches_in_document_order():
+    index = build_section_index(TEXT)
+    assert select_sections(TEXT, index, ["sales comparison", "SUBJECT"]) == (
+        "## **Subject**\nProperty Address 1 Main St\n"
+        "## Sales Comparison Approach\n| Feature | Subject | Comparable Sale # 1 |"
+    )
+    assert select_sections(TEXT, index, ["neighborhood"]) == (
+        "## Neighborhood\nSuburban\n### Neighborhood Description\nStable values"
+    )
+    assert select_sections(TEXT, index, ["cost approach"]) is None
+
+def test_parsed_text_for_agent():
+    body = "Property Address 1 Main St\n" * (MIN_SELECTED_CHARS // 20)
+    text = f"# Report\n## Subject\n{body}## Contract\nnot for the agent\n"
+    index = build_section_index(text)
+    assert parsed_text_for_agent("run_property_info_agent", text, index) == f"## Subject\n{body}".strip()
+    # Agents without declared sections, reports without an index and selections
+    # too short to hold the section's body all get the full text.
+    assert parsed_text_for_agent("run_qualitative_analysis", text, index) == text
+    assert parsed_text_for_agent("run_property_info_agent", text, None) == text
+    assert parsed_text_for_agent("run_property_info_agent", TEXT, build_section_index(TEXT)) == TEXT
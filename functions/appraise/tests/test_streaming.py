@@ -0,0 +1,112 @@
+"""Throttled partial output writes while an agent streams its response."""
+import types
+
+import pytest
+
+from appraise import execution, streaming
+from appraise.execution import mark_agent_failed, save_agent_result
+from appraise.streaming import OutputStream, stream_text
+
+class FakeRef:
+    """Stands in for a report DocumentReference, recording merge writes."""
+
+    def __init__(self, path='reports/report-1', fail=False):
+        self.path = path
+        self.fail = fail
+        self.writes = []
+
+    def set(self, data, merge=False):
+        if self.fail:
+            raise RuntimeError("unavailable")
+        self.writes.append(data)
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock that only moves when the test sets `clock.now`."""
+    clock = types.SimpleNamespace(now=100.0)
+    monkeypatch.setattr(streaming, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    monkeypatch.setattr(streaming, '_last_output_write', {})
+    return clock
+
+def output(*lines):
+    return {'output': {'red_flags': list(lines)}}
+
+def test_writes_are_throttled_and_coalesced(clock):
+    ref = FakeRef()
+    stream = OutputStream(ref, 'red_flags', '', writes_per_sec=2)
+    stream.append("first\n")
+    clock.now += 0.2
+    stream.append("second\nthi")
+    stream.append("rd\n")
+    clock.now += 0.3
+    stream.append("fourth")
+    assert ref.writes == [output("first"), output("first", "second", "third")]
+    assert (stream.chunks, stream.writes) == (4, 2)
+
+def test_streams_into_one_report_share_its_write_rate(clock):
+    ref = FakeRef()
+    OutputStream(ref, 'red_flags', '').append("flag\n")
+    OutputStream(ref, 'citations', '').append("citation\n")
+    OutputStream(FakeRef('reports/report-2'), 'citations', '').append("citation\n")
+    assert ref.writes == [output("flag")]
+
+def test_a_final_flush_writes_the_lines_held_back_by_the_throttle(clock):
+    ref = FakeRef()
+    stream = OutputStream(ref, 'red_flags', '')
+    stream.append("first\n")
+    stream.append("second\n")
+    stream.flush()
+    clock.now += 1
+    stream.flush()
+    stream.flush()
+    assert ref.writes == [output("first"), output("first", "second")]
+
+def test_a_failed_write_is_retried_with_the_next_lines(clock):
+    ref = FakeRef(fail=True)
+    stream = OutputStream(ref, 'red_flags', '')
+    stream.append("first\n")
+    ref.fail = False
+    clock.now += 1
+    stream.append("second\n")
+    assert ref.writes == [output("first", "second")]
+
+class FakeChunk:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError("The chunk has no text parts.")
+        return self._text
+
+class FakeResponse:
+    """Stands in for a streamed GenerateContentResponse over chunk texts (None: no text parts)."""
+
+    def __init__(self, *texts):
+        self.chunks = [FakeChunk(text) for text in texts]
+        self.text = "".join(text for text in texts if text)
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+def test_stream_text_shows_formatted_lines_and_returns_the_full_text(clock):
+    response = FakeResponse("keep: 1\ndrop: 2\n", None, "keep: 3\n")
+    model = types.SimpleNamespace(generate_content=lambda prompt, generation_config=None, stream=False: response)
+    ref = FakeRef()
+    stream = OutputStream(ref, 'red_flags', '', writes_per_sec=0)
+    format_line = lambda line: line.upper() if line.startswith("keep") else None
+    assert stream_text(model, "prompt", {'output_stream': stream}, format_line) == "keep: 1\ndrop: 2\nkeep: 3\n"
+    assert ref.writes == [output("KEEP: 1"), output("KEEP: 1", "KEEP: 3")]
+
+@pytest.mark.parametrize("finish", [
+    lambda ref: save_agent_result(ref, 'red_flags', ["flag"], ''),
+    lambda ref: mark_agent_failed(ref, 'red_flag', 'red_flags', RuntimeError("boom")),
+])
+def test_finishing_an_agent_clears_its_partial_output(monkeypatch, finish):
+    monkeypatch.setattr(execution, 'get_firestore', lambda: types.SimpleNamespace(DELETE_FIELD='<delete>'))
+    ref = FakeRef()
+    finish(ref)
+    [write] = ref.writes
+    assert write['output'] == {'red_flags': '<delete>'}
+    assert write['leases'] == {'red_flags': '<delete>'}
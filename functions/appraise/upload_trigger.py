@@ -0,0 +1,98 @@
+"""Function 1: creates the report document for a new upload and starts parsing."""
+import os
+import re
+import base64
+import logging
+
+from firebase_functions import storage_fn
+
+from .agents import ANALYSIS_STAGES
+from .content_index import record_upload, seed_from_duplicate
+from .core import get_db, get_firestore, get_topic_path, publish_messages
+from .pipeline import PARSING_STAGE, dispatch_agents, ready_agents
+
+@storage_fn.on_object_finalized()
+def upload_trigger_v2(event):
+    """
+    Triggered by a new file upload to Cloud Storage.
+    Validates the upload, creates a Firestore document, and publishes a Pub/Sub message.
+    """
+    bucket_name = event.data.bucket
+    file_path = event.data.name
+
+    if not file_path.lower().endswith('.pdf') or len(file_path.split('/')) != 2:
+        logging.info(f"Ignoring non-PDF file upload: {file_path}")
+        return
+
+    try:
+        uid, file_name = os.path.split(file_path)
+        file_id = os.path.splitext(file_name)[0]
+    except ValueError:
+        logging.error(f"Invalid file path format, cannot extract uid/file_id: {file_path}")
+        return
+
+    log_prefix = f"[{file_id}]"
+    logging.info(f"{log_prefix} Starting upload trigger processing for user '{uid}'.")
+
+    if not event.data.metadata or not event.data.metadata.get('firebaseStorageDownloadTokens'):
+        logging.warning(f"{log_prefix} Upload is missing authentication token. Aborting.")
+        return
+
+    metadata = event.data.metadata
+    expected_value = re.sub(r'[^0-9]', '', metadata.get('expectedValue') or '')
+
+    # Storage computes the MD5 of every non-composite upload and sends it with
+    # the event, so deduplication needs no download of the PDF.
+    content_digest = base64.b64decode(event.data.md5_hash).hex() if event.data.md5_hash else None
+    seeded = None
+    if content_digest:
+        try:
+            seeded = seed_from_duplicate(uid, content_digest, log_prefix)
+        except Exception as e:
+            logging.warning(f"{log_prefix} Content dedup unavailable, processing upload in full: {e}")
+    else:
+        logging.info(f"{log_prefix} Upload has no MD5 hash (composite object); skipping content dedup.")
+
+    logging.info(f"{log_prefix} Creating initial Firestore document...")
+    report_ref = get_db().collection('reports').document(file_id)
+
+    initial_stages = {stage: "pending" for stage in [PARSING_STAGE] + ANALYSIS_STAGES}
+
+    report_data = {
+        "uid": uid, "name": file_name, "status": "processing",
+        "timestamp": get_firestore().SERVER_TIMESTAMP, "stages": initial_stages,
+        "fullName": metadata.get('fullName'),
+        "expectedValue": int(expected_value) if expected_value else None,
+        "contentDigest": content_digest
+    }
+    if seeded:
+        initial_stages.update(seeded.pop('stages'))
+        report_data.update(seeded)
+
+    try:
+        report_ref.set(report_data)
+        logging.info(f"{log_prefix} Successfully created Firestore document.")
+        record_upload(seeded is not None, log_prefix)
+    except Exception as e:
+        logging.error(f"{log_prefix} Failed to create Firestore document: {e}", exc_info=True)
+        return
+
+    if seeded:
+        # The new document may be a create rather than an update, which the state
+        # machine does not see, so the remaining agents are dispatched from here.
+        to_dispatch = ready_agents(initial_stages)
+        logging.info(f"{log_prefix} Dispatching remaining agents: {to_dispatch}")
+        dispatch_agents(
+            to_dispatch, file_id, uid, report_data['parsedTextPath'],
+            report_data['parsedTextGeneration'], report_data['parsedTextBytes']
+        )
+    else:
+        logging.info(f"{log_prefix} Publishing message to 'pdf-uploaded' topic...")
+        message_data = {
+            "fileId": file_id, "uid": uid, "filePath": file_path, "contentDigest": content_digest,
+            "uploadedAt": event.data.time_created
+        }
+        publish_messages([(get_topic_path('pdf-uploaded'), message_data)], log_prefix)
+
+    logging.info(f"{log_prefix} Upload trigger processing complete.")
+    return
@@ -137,11 +137,12 @@ def _fork(
         while 1:
             if verbose:
                 pymupdf.log(f'{os.getpid()=}: calling get().')
-            page_num = queue_down.get()
+            index = queue_down.get()
             if verbose:
-                pymupdf.log(f'{os.getpid()=}: {page_num=}.')
-            if page_num is None:
+                pymupdf.log(f'{os.getpid()=}: {index=}.')
+            if index is None:
                 break
+            page_num = pages[index]
             try:
                 if not document:
                     if stats:
@@ -174,7 +175,7 @@ def _fork(
             if verbose:
                 pymupdf.log(f'{os.getpid()=}: sending {page_num=} {ret=}')
                 
-            queue_up.put( (page_num, ret) )
+            queue_up.put( (index, ret) )
 
     error = None
 
@@ -206,8 +207,10 @@ def _fork(
             t = time.time()
         if verbose:
             pymupdf.log(f'Sending page numbers.')
-        for page_num in range(len(pages)):
-            queue_down.put(page_num)
+        # Send indexes into `pages`, so results come back in `pages` order
+        # whichever page numbers were requested.
+        for index in range(len(pages)):
+            queue_down.put(index)
         if stats:
             _stats_write(t, 'Send page numbers')
 
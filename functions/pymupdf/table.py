@@ -76,6 +76,7 @@ import inspect
 import itertools
 import string
 import html
+from array import array
 from collections.abc import Sequence
 from dataclasses import dataclass
 from operator import itemgetter
@@ -88,18 +89,17 @@ from . import (
     Rect,
     Matrix,
     TEXTFLAGS_TEXT,
+    TEXTFLAGS_WORDS,
     TEXT_FONT_BOLD,
     TEXT_FONT_SUPERSCRIPT,
     TOOLS,
     EMPTY_RECT,
+    FLT_EPSILON,
     sRGB_to_pdf,
     Point,
     message,
 )
 
-EDGES = []  # vector graphics from PyMuPDF
-CHARS = []  # text characters from PyMuPDF
-TEXTPAGE = None
 white_spaces = set(string.whitespace)  # for checking white space only cells
 # -------------------------------------------------------------------
 # End of PyMuPDF interface code
@@ -162,14 +162,139 @@ def to_list(collection) -> list:
         return list(collection)
 
 
+class CharStore:
+    """
+    PyMuPDF extension: the text characters of a page, stored column-wise.
+
+    Instead of one dict per character, every attribute the table code reads
+    is a compact array (or list) with one item per character, and a `char`
+    is an index into these. Attributes shared by all characters of a text
+    line or span are stored once per line or span.
+
+    Indexing returns the character as a dict in the format pdfplumber uses,
+    for code that needs other attributes (e.g. `extra_attrs`).
+    """
+
+    def __init__(self, page_number=1, doctop_base=0, ctm=None):
+        self.page_number = page_number
+        self.doctop_base = doctop_base
+        self.ctm = Matrix(1, 1) if ctm is None else ctm
+        self.text = []  # one str per character
+        self.x0 = array("d")
+        self.top = array("d")
+        self.x1 = array("d")
+        self.bottom = array("d")
+        self.doctop = array("d")
+        self.origin_x = array("d")  # character origin (for "matrix")
+        self.origin_y = array("d")
+        self.upright = array("b")
+        self.line = array("i")  # index into self.line_dirs
+        self.span = array("i")  # index into self.spans
+        self.line_dirs = []  # (cosine, sine) of the line, rounded
+        self.spans = []  # (fontname, fontsize, color) of the span
+        self._centers = None  # horizontal and vertical centers, on demand
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __getitem__(self, i) -> dict:
+        if not -len(self.text) <= i < len(self.text):
+            raise IndexError("char index out of range")
+        if i < 0:
+            i += len(self.text)
+        bbox = Rect(self.x0[i], self.top[i], self.x1[i], self.bottom[i])
+        bbox_ctm = bbox * self.ctm
+        origin = Point(self.origin_x[i], self.origin_y[i]) * self.ctm
+        cos, sin = self.line_dirs[self.line[i]]
+        fontname, fontsize, color = self.spans[self.span[i]]
+        upright = bool(self.upright[i])
+        return {
+            "adv": bbox.x1 - bbox.x0 if upright else bbox.y1 - bbox.y0,
+            "bottom": bbox.y1,
+            "doctop": self.doctop[i],
+            "fontname": fontname,
+            "height": bbox.y1 - bbox.y0,
+            "matrix": (cos, -sin, sin, cos, origin.x, origin.y),
+            "ncs": "DeviceRGB",
+            "non_stroking_color": color,
+            "non_stroking_pattern": None,
+            "object_type": "char",
+            "page_number": self.page_number,
+            "size": fontsize if upright else bbox.y1 - bbox.y0,
+            "stroking_color": color,
+            "stroking_pattern": None,
+            "text": self.text[i],
+            "top": bbox.y0,
+            "upright": upright,
+            "width": bbox.x1 - bbox.x0,
+            "x0": bbox.x0,
+            "x1": bbox.x1,
+            "y0": bbox_ctm.y0,
+            "y1": bbox_ctm.y1,
+        }
+
+    def add_line(self, line_dir) -> int:
+        """Register a text line by its (cosine, sine) and return its index."""
+        self.line_dirs.append(line_dir)
+        return len(self.line_dirs) - 1
+
+    def add_span(self, fontname, fontsize, color) -> int:
+        """Register a text span and return its index."""
+        self.spans.append((fontname, fontsize, color))
+        return len(self.spans) - 1
+
+    def append(self, text, bbox, origin, upright, line, span):
+        """Add a character of a registered line and span."""
+        x0, top, x1, bottom = bbox
+        self.text.append(text)
+        self.x0.append(x0)
+        self.top.append(top)
+        self.x1.append(x1)
+        self.bottom.append(bottom)
+        self.doctop.append(top + self.doctop_base)
+        self.origin_x.append(origin[0])
+        self.origin_y.append(origin[1])
+        self.upright.append(upright)
+        self.line.append(line)
+        self.span.append(span)
+        self._centers = None
+
+    def bbox(self, chars) -> tuple:
+        """Return the smallest bbox containing the given chars."""
+        x0, top, x1, bottom = self.x0, self.top, self.x1, self.bottom
+        return (
+            min(x0[c] for c in chars),
+            min(top[c] for c in chars),
+            max(x1[c] for c in chars),
+            max(bottom[c] for c in chars),
+        )
+
+    def in_bbox(self, bbox, chars=None) -> list:
+        """Return the chars (all or those given) whose center is inside bbox."""
+        if self._centers is None:
+            self._centers = (
+                array("d", [(a + b) / 2 for a, b in zip(self.x0, self.x1)]),
+                array("d", [(a + b) / 2 for a, b in zip(self.top, self.bottom)]),
+            )
+        h_mid, v_mid = self._centers
+        x0, top, x1, bottom = bbox
+        if chars is None:
+            chars = range(len(self.text))
+        return [
+            c for c in chars if x0 <= h_mid[c] < x1 and top <= v_mid[c] < bottom
+        ]
+
+
 class TextMap:
     """
     A TextMap maps each unicode character in the text to an individual `char`
-    object (or, in the case of layout-implied whitespace, `None`).
+    (an index into `chars`, a CharStore; or, in the case of layout-implied
+    whitespace, `None`).
     """
 
-    def __init__(self, tuples=None) -> None:
+    def __init__(self, tuples=None, chars=None) -> None:
         self.tuples = tuples
+        self.chars = chars
         self.as_string = "".join(map(itemgetter(0), tuples))
 
     def match_to_dict(
@@ -181,7 +306,7 @@ class TextMap:
     ) -> dict:
         subset = self.tuples[m.start(main_group) : m.end(main_group)]
         chars = [c for (text, c) in subset if c is not None]
-        x0, top, x1, bottom = objects_to_bbox(chars)
+        x0, top, x1, bottom = self.chars.bbox(chars)
 
         result = {
             "text": m.group(main_group),
@@ -202,11 +327,12 @@ class TextMap:
 
 class WordMap:
     """
-    A WordMap maps words->chars.
+    A WordMap maps words->chars (indices into `chars`, a CharStore).
     """
 
-    def __init__(self, tuples) -> None:
+    def __init__(self, tuples, chars) -> None:
         self.tuples = tuples
+        self.chars = chars
 
     def to_textmap(
         self,
@@ -262,7 +388,7 @@ class WordMap:
         _textmap = []
 
         if not len(self.tuples):
-            return TextMap(_textmap)
+            return TextMap(_textmap, self.chars)
 
         expansions = LIGATURES if expand_ligatures else {}
 
@@ -288,6 +414,7 @@ class WordMap:
             blank_line = []
 
         num_newlines = 0
+        text = self.chars.text
 
         words_sorted_doctop = (
             self.tuples
@@ -337,7 +464,7 @@ class WordMap:
                 line_len += num_spaces_prepend
 
                 for c in chars:
-                    letters = expansions.get(c["text"], c["text"])
+                    letters = expansions.get(text[c], text[c])
                     for letter in letters:
                         _textmap.append((letter, c))
                         line_len += 1
@@ -358,7 +485,7 @@ class WordMap:
             if _textmap[-1] == ("\n", None):
                 _textmap = _textmap[:-1]
 
-        return TextMap(_textmap)
+        return TextMap(_textmap, self.chars)
 
 
 class WordExtractor:
@@ -391,13 +518,15 @@ class WordExtractor:
 
         self.expansions = LIGATURES if expand_ligatures else {}
 
-    def merge_chars(self, ordered_chars: list):
-        x0, top, x1, bottom = objects_to_bbox(ordered_chars)
-        doctop_adj = ordered_chars[0]["doctop"] - ordered_chars[0]["top"]
-        upright = ordered_chars[0]["upright"]
+    def merge_chars(self, chars, ordered_chars: list):
+        x0, top, x1, bottom = chars.bbox(ordered_chars)
+        first = ordered_chars[0]
+        doctop_adj = chars.doctop[first] - chars.top[first]
+        upright = bool(chars.upright[first])
         direction = 1 if (self.horizontal_ltr if upright else self.vertical_ttb) else -1
 
-        matrix = ordered_chars[0]["matrix"]
+        cos, sin = chars.line_dirs[chars.line[first]]
+        matrix = (cos, -sin, sin, cos)  # the char "matrix" without origin
 
         rotation = 0
         if not upright and matrix[1] < 0:
@@ -409,9 +538,10 @@ class WordExtractor:
         elif matrix[1] > 0:
             rotation = 90
 
+        text = chars.text
         word = {
             "text": "".join(
-                self.expansions.get(c["text"], c["text"]) for c in ordered_chars
+                self.expansions.get(text[c], text[c]) for c in ordered_chars
             ),
             "x0": x0,
             "x1": x1,
@@ -423,13 +553,16 @@ class WordExtractor:
             "rotation": rotation,
         }
 
-        for key in self.extra_attrs:
-            word[key] = ordered_chars[0][key]
+        if self.extra_attrs:
+            char = chars[first]
+            for key in self.extra_attrs:
+                word[key] = char[key]
 
         return word
 
     def char_begins_new_word(
         self,
+        chars,
         prev_char,
         curr_char,
     ) -> bool:
@@ -466,34 +599,34 @@ class WordExtractor:
         """
 
         # Note: Due to the grouping step earlier in the process,
-        # curr_char["upright"] will always equal prev_char["upright"].
-        if curr_char["upright"]:
+        # chars.upright[curr_char] will always equal chars.upright[prev_char].
+        if chars.upright[curr_char]:
             x = self.x_tolerance
             y = self.y_tolerance
-            ay = prev_char["top"]
-            cy = curr_char["top"]
+            ay = chars.top[prev_char]
+            cy = chars.top[curr_char]
             if self.horizontal_ltr:
-                ax = prev_char["x0"]
-                bx = prev_char["x1"]
-                cx = curr_char["x0"]
+                ax = chars.x0[prev_char]
+                bx = chars.x1[prev_char]
+                cx = chars.x0[curr_char]
             else:
-                ax = -prev_char["x1"]
-                bx = -prev_char["x0"]
-                cx = -curr_char["x1"]
+                ax = -chars.x1[prev_char]
+                bx = -chars.x0[prev_char]
+                cx = -chars.x1[curr_char]
 
         else:
             x = self.y_tolerance
             y = self.x_tolerance
-            ay = prev_char["x0"]
-            cy = curr_char["x0"]
+            ay = chars.x0[prev_char]
+            cy = chars.x0[curr_char]
             if self.vertical_ttb:
-                ax = prev_char["top"]
-                bx = prev_char["bottom"]
-                cx = curr_char["top"]
+                ax = chars.top[prev_char]
+                bx = chars.bottom[prev_char]
+                cx = chars.top[curr_char]
             else:
-                ax = -prev_char["bottom"]
-                bx = -prev_char["top"]
-                cx = -curr_char["bottom"]
+                ax = -chars.bottom[prev_char]
+                bx = -chars.top[prev_char]
+                cx = -chars.bottom[curr_char]
 
         return bool(
             # Intraline test
@@ -503,7 +636,7 @@ class WordExtractor:
             or (cy > ay + y)
         )
 
-    def iter_chars_to_words(self, ordered_chars):
+    def iter_chars_to_words(self, chars, ordered_chars):
         current_word: list = []
 
         def start_next_word(new_char=None):
@@ -515,7 +648,7 @@ class WordExtractor:
             current_word = [] if new_char is None else [new_char]
 
         for char in ordered_chars:
-            text = char["text"]
+            text = chars.text[char]
 
             if not self.keep_blank_chars and text.isspace():
                 yield from start_next_word(None)
@@ -524,7 +657,9 @@ class WordExtractor:
                 yield from start_next_word(char)
                 yield from start_next_word(None)
 
-            elif current_word and self.char_begins_new_word(current_word[-1], char):
+            elif current_word and self.char_begins_new_word(
+                chars, current_word[-1], char
+            ):
                 yield from start_next_word(char)
 
             else:
@@ -534,23 +669,23 @@ class WordExtractor:
         if current_word:
             yield current_word
 
-    def iter_sort_chars(self, chars):
+    def iter_sort_chars(self, chars, indices):
         def upright_key(x) -> int:
-            return -int(x["upright"])
+            return -chars.upright[x]
 
-        for upright_cluster in cluster_objects(list(chars), upright_key, 0):
-            upright = upright_cluster[0]["upright"]
-            cluster_key = "doctop" if upright else "x0"
+        for upright_cluster in cluster_objects(list(indices), upright_key, 0):
+            upright = chars.upright[upright_cluster[0]]
+            cluster_key = chars.doctop if upright else chars.x0
 
             # Cluster by line
             subclusters = cluster_objects(
-                upright_cluster, itemgetter(cluster_key), self.y_tolerance
+                upright_cluster, cluster_key.__getitem__, self.y_tolerance
             )
 
             for sc in subclusters:
                 # Sort within line
-                sort_key = "x0" if upright else "doctop"
-                to_yield = sorted(sc, key=itemgetter(sort_key))
+                sort_key = chars.x0 if upright else chars.doctop
+                to_yield = sorted(sc, key=sort_key.__getitem__)
 
                 # Reverse order if necessary
                 if not (self.horizontal_ltr if upright else self.vertical_ttb):
@@ -558,39 +693,55 @@ class WordExtractor:
                 else:
                     yield from to_yield
 
-    def iter_extract_tuples(self, chars):
-        ordered_chars = chars if self.use_text_flow else self.iter_sort_chars(chars)
+    def iter_extract_tuples(self, chars, indices):
+        ordered_chars = (
+            indices if self.use_text_flow else self.iter_sort_chars(chars, indices)
+        )
 
-        grouping_key = itemgetter("upright", *self.extra_attrs)
-        grouped_chars = itertools.groupby(ordered_chars, grouping_key)
+        if self.extra_attrs:
+            attrs_getter = itemgetter("upright", *self.extra_attrs)
 
-        for keyvals, char_group in grouped_chars:
-            for word_chars in self.iter_chars_to_words(char_group):
-                yield (self.merge_chars(word_chars), word_chars)
+            def grouping_key(c):
+                return attrs_getter(chars[c])
 
-    def extract_wordmap(self, chars) -> WordMap:
-        return WordMap(list(self.iter_extract_tuples(chars)))
+        else:
+            grouping_key = chars.upright.__getitem__
+        grouped_chars = itertools.groupby(ordered_chars, grouping_key)
 
-    def extract_words(self, chars: list) -> list:
-        words = list(word for word, word_chars in self.iter_extract_tuples(chars))
+        for keyvals, char_group in grouped_chars:
+            for word_chars in self.iter_chars_to_words(chars, char_group):
+                yield (self.merge_chars(chars, word_chars), word_chars)
+
+    def extract_wordmap(self, chars, indices=None) -> WordMap:
+        if indices is None:
+            indices = range(len(chars))
+        return WordMap(list(self.iter_extract_tuples(chars, indices)), chars)
+
+    def extract_words(self, chars, indices=None) -> list:
+        if indices is None:
+            indices = range(len(chars))
+        words = list(
+            word for word, word_chars in self.iter_extract_tuples(chars, indices)
+        )
         return words
 
 
-def extract_words(chars: list, **kwargs) -> list:
-    return WordExtractor(**kwargs).extract_words(chars)
+def extract_words(chars, indices=None, **kwargs) -> list:
+    """Extract the words of a CharStore (all chars or those in indices)."""
+    return WordExtractor(**kwargs).extract_words(chars, indices)
 
 
 TEXTMAP_KWARGS = inspect.signature(WordMap.to_textmap).parameters.keys()
 WORD_EXTRACTOR_KWARGS = inspect.signature(WordExtractor).parameters.keys()
 
 
-def chars_to_textmap(chars: list, **kwargs) -> TextMap:
+def chars_to_textmap(chars, indices=None, **kwargs) -> TextMap:
     kwargs.update({"presorted": True})
 
     extractor = WordExtractor(
         **{k: kwargs[k] for k in WORD_EXTRACTOR_KWARGS if k in kwargs}
     )
-    wordmap = extractor.extract_wordmap(chars)
+    wordmap = extractor.extract_wordmap(chars, indices)
     textmap = wordmap.to_textmap(
         **{k: kwargs[k] for k in TEXTMAP_KWARGS if k in kwargs}
     )
@@ -598,19 +749,21 @@ def chars_to_textmap(chars: list, **kwargs) -> TextMap:
     return textmap
 
 
-def extract_text(chars: list, **kwargs) -> str:
-    chars = to_list(chars)
-    if len(chars) == 0:
+def extract_text(chars, indices=None, **kwargs) -> str:
+    """Extract the text of a CharStore (all chars or those in indices)."""
+    if indices is None:
+        indices = range(len(chars))
+    if len(indices) == 0:
         return ""
 
     if kwargs.get("layout"):
-        return chars_to_textmap(chars, **kwargs).as_string
+        return chars_to_textmap(chars, indices, **kwargs).as_string
     else:
         y_tolerance = kwargs.get("y_tolerance", DEFAULT_Y_TOLERANCE)
         extractor = WordExtractor(
             **{k: kwargs[k] for k in WORD_EXTRACTOR_KWARGS if k in kwargs}
         )
-        words = extractor.extract_words(chars)
+        words = extractor.extract_words(chars, indices)
         if words:
             rotation = words[0]["rotation"]  # rotation cannot change within a cell
         else:
@@ -1190,10 +1343,11 @@ def intersections_to_cells(intersections):
     return list(filter(None, cell_gen))
 
 
-def cells_to_tables(page, cells) -> list:
+def cells_to_tables(cells, chars) -> list:
     """
     Given a list of bounding boxes (`cells`), return a list of tables that
-    hold those cells most simply (and contiguously).
+    hold those cells most simply (and contiguously). Tables containing none
+    of the text characters in `chars` are dropped.
     """
 
     def bbox_to_corners(bbox) -> tuple:
@@ -1254,16 +1408,7 @@ def cells_to_tables(page, cells) -> list:
             r |= c
             x1_vals.add(c[2])
             x0_vals.add(c[0])
-        if (
-            len(x1_vals) < 2
-            or len(x0_vals) < 2
-            or white_spaces.issuperset(
-                page.get_textbox(
-                    r,
-                    textpage=TEXTPAGE,
-                )
-            )
-        ):
+        if len(x1_vals) < 2 or len(x0_vals) < 2 or not has_text(chars, r):
             del tables[i]
 
     # Sort the tables top-to-bottom-left-to-right based on the value of the
@@ -1298,9 +1443,10 @@ class TableHeader:
 
 
 class Table:
-    def __init__(self, page, cells):
+    def __init__(self, page, cells, context=None):
         self.page = page
         self.cells = cells
+        self.context = context if context is not None else TableContext(page)
         self.header = self._get_header()  # PyMuPDF extension
 
     @property
@@ -1333,28 +1479,18 @@ class Table:
         return max([len(r.cells) for r in self.rows])
 
     def extract(self, **kwargs) -> list:
-        chars = CHARS
+        chars = self.context.chars
         table_arr = []
 
-        def char_in_bbox(char, bbox) -> bool:
-            v_mid = (char["top"] + char["bottom"]) / 2
-            h_mid = (char["x0"] + char["x1"]) / 2
-            x0, top, x1, bottom = bbox
-            return bool(
-                (h_mid >= x0) and (h_mid < x1) and (v_mid >= top) and (v_mid < bottom)
-            )
-
         for row in self.rows:
             arr = []
-            row_chars = [char for char in chars if char_in_bbox(char, row.bbox)]
+            row_chars = chars.in_bbox(row.bbox)
 
             for cell in row.cells:
                 if cell is None:
                     cell_text = None
                 else:
-                    cell_chars = [
-                        char for char in row_chars if char_in_bbox(char, cell)
-                    ]
+                    cell_chars = chars.in_bbox(cell, row_chars)
 
                     if len(cell_chars):
                         kwargs["x_shift"] = cell[0]
@@ -1362,7 +1498,7 @@ class Table:
                         if "layout" in kwargs:
                             kwargs["layout_width"] = cell[2] - cell[0]
                             kwargs["layout_height"] = cell[3] - cell[1]
-                        cell_text = extract_text(cell_chars, **kwargs)
+                        cell_text = extract_text(chars, cell_chars, **kwargs)
                     else:
                         cell_text = ""
                 arr.append(cell_text)
@@ -1513,8 +1649,7 @@ class Table:
 
             Returns True if any spans are bold else False.
             """
-            blocks = page.get_text("dict", flags=TEXTFLAGS_TEXT, clip=bbox)["blocks"]
-            spans = [s for b in blocks for l in b["lines"] for s in l["spans"]]
+            spans = text_spans(page, bbox)
 
             return any(s["flags"] & TEXT_FONT_BOLD for s in spans)
 
@@ -1563,14 +1698,11 @@ class Table:
         clip.y0 = 0  # start at top of page
         clip.y1 = bbox.y0  # end at top of table
 
-        blocks = page.get_text("dict", clip=clip, flags=TEXTFLAGS_TEXT)["blocks"]
         # non-empty, non-superscript spans above table, sorted descending by y1
         spans = sorted(
             [
                 s
-                for b in blocks
-                for l in b["lines"]
-                for s in l["spans"]
+                for s in text_spans(page, clip)
                 if not (
                     white_spaces.issuperset(s["text"])
                     or s["flags"] & TEXT_FONT_SUPERSCRIPT
@@ -1645,7 +1777,7 @@ class Table:
         clip.y1 = bbox.y0  # make sure we still include every word above
 
         # Confirm that no word in clip is intersecting a column separator
-        word_rects = [Rect(w[:4]) for w in page.get_text("words", clip=clip)]
+        word_rects = [Rect(w) for w in text_words(page, clip)]
         word_tops = sorted(list(set([r[1] for r in word_rects])), reverse=True)
 
         select = []
@@ -1681,7 +1813,7 @@ class Table:
         # column names: no line breaks, no excess spaces
         hdr_names = [
             (
-                page.get_textbox(c).replace("\n", " ").replace("  ", " ").strip()
+                self.context.get_textbox(c).replace("\n", " ").replace("  ", " ").strip()
                 if c is not None
                 else ""
             )
@@ -1794,9 +1926,10 @@ class TableFinder:
     https://github.com/tabulapdf/tabula-extractor/issues/16
     """
 
-    def __init__(self, page, settings=None):
+    def __init__(self, page, settings=None, context=None):
         self.page = weakref.proxy(page)
         self.settings = TableSettings.resolve(settings)
+        self.context = context if context is not None else TableContext(page)
         self.edges = self.get_edges()
         self.intersections = edges_to_intersections(
             self.edges,
@@ -1805,8 +1938,8 @@ class TableFinder:
         )
         self.cells = intersections_to_cells(self.intersections)
         self.tables = [
-            Table(self.page, cell_group)
-            for cell_group in cells_to_tables(self.page, self.cells)
+            Table(self.page, cell_group, self.context)
+            for cell_group in cells_to_tables(self.cells, self.context.chars)
         ]
 
     def get_edges(self) -> list:
@@ -1828,7 +1961,7 @@ class TableFinder:
         h_strat = settings.horizontal_strategy
 
         if v_strat == "text" or h_strat == "text":
-            words = extract_words(CHARS, **(settings.text_settings or {}))
+            words = extract_words(self.context.chars, **(settings.text_settings or {}))
         else:
             words = []
 
@@ -1851,9 +1984,9 @@ class TableFinder:
                 )
 
         if v_strat == "lines":
-            v_base = filter_edges(EDGES, "v")
+            v_base = filter_edges(self.context.edges, "v")
         elif v_strat == "lines_strict":
-            v_base = filter_edges(EDGES, "v", edge_type="line")
+            v_base = filter_edges(self.context.edges, "v", edge_type="line")
         elif v_strat == "text":
             v_base = words_to_edges_v(words, word_threshold=settings.min_words_vertical)
         elif v_strat == "explicit":
@@ -1882,9 +2015,9 @@ class TableFinder:
                 )
 
         if h_strat == "lines":
-            h_base = filter_edges(EDGES, "h")
+            h_base = filter_edges(self.context.edges, "h")
         elif h_strat == "lines_strict":
-            h_base = filter_edges(EDGES, "h", edge_type="line")
+            h_base = filter_edges(self.context.edges, "h", edge_type="line")
         elif h_strat == "text":
             h_base = words_to_edges_h(
                 words, word_threshold=settings.min_words_horizontal
@@ -1921,85 +2054,261 @@ class TableFinder:
 Start of PyMuPDF interface code.
 The following functions are executed when "page.find_tables()" is called.
 
-* make_chars: Fills the CHARS list with text character information extracted
-              via "rawdict" text extraction. Items in CHARS are formatted
+* make_chars: Fills the "chars" CharStore of a TableContext with text
+              character information extracted via "rawdict" text extraction.
+* make_edges: Fills the "edges" list of a TableContext with vector graphic
+              information extracted via "get_drawings". Items are formatted
               as expected by the table code.
-* make_edges: Fills the EDGES list with vector graphic information extracted
-              via "get_drawings". Items in EDGES are formatted as expected
-              by the table code.
 
-The lists CHARS and EDGES are used to replace respective document access
+The "chars" and "edges" are used to replace respective document access
 of pdfplumber or, respectively pdfminer.
 The table code has been modified to use these lists instead of accessing
 page information themselves.
+
+All data of one "page.find_tables()" call lives in its TableContext, which is
+passed to the table objects. No module or MuPDF global state is changed, so
+tables can be found concurrently, e.g. on pages of different documents in
+separate threads.
 """
 
 
+class TableContext:
+    """Page data of one find_tables call.
+
+    * chars: text characters of the page (a CharStore), made by make_chars.
+    * edges: vector graphics of the page, made by make_edges.
+    * text_lines: all text lines of the page with small glyph heights, made
+      on demand for get_textbox.
+    """
+
+    def __init__(self, page):
+        if not isinstance(page, weakref.ProxyType):
+            page = weakref.proxy(page)
+        self.page = page
+        self.chars = CharStore()
+        self.edges = []
+        self.text_lines = None
+
+    def get_textbox(self, rect) -> str:
+        """Text in rect, like 'page.get_textbox(rect)'."""
+        if self.text_lines is None:
+            self.text_lines = get_text_lines(self.page, 0)  # its default flags
+        return text_box(self.text_lines, rect)
+
+
 # -----------------------------------------------------------------------------
-# Extract all page characters to fill the CHARS list
+# Text with small glyph heights.
+# Table detection needs minimum character bboxes (height = font size). MuPDF
+# only offers them process-wide via TOOLS.set_small_glyph_heights(), which
+# would also change every text extraction running in other threads. So we
+# compute them from the normal "rawdict" bboxes like MuPDF does, and offer the
+# few text extractions the table code needs on top of these lines.
+# Like MuPDF, we leave the bboxes alone while quad corrections are switched off
+# (TOOLS.unset_quad_corrections(True), as pymupdf4llm does on import) and in
+# vertical writing mode.
 # -----------------------------------------------------------------------------
-def make_chars(page, clip=None):
-    """Extract text as "rawdict" to fill CHARS."""
-    global TEXTPAGE
-    page_number = page.number + 1
-    page_height = page.rect.height
-    ctm = page.transformation_matrix
-    TEXTPAGE = page.get_textpage(clip=clip, flags=TEXTFLAGS_TEXT)
-    blocks = page.get_text("rawdict", textpage=TEXTPAGE)["blocks"]
-    doctop_base = page_height * page.number
-    for block in blocks:
-        for line in block["lines"]:
-            ldir = line["dir"]  # = (cosine, sine) of angle
-            ldir = (round(ldir[0], 4), round(ldir[1], 4))
-            matrix = Matrix(ldir[0], -ldir[1], ldir[1], ldir[0], 0, 0)
-            if ldir[1] == 0:
-                upright = True
-            else:
-                upright = False
-            for span in sorted(line["spans"], key=lambda s: s["bbox"][0]):
-                fontname = span["font"]
-                fontsize = span["size"]
-                color = sRGB_to_pdf(span["color"])
-                for char in sorted(span["chars"], key=lambda c: c["bbox"][0]):
-                    bbox = Rect(char["bbox"])
-                    bbox_ctm = bbox * ctm
-                    origin = Point(char["origin"]) * ctm
-                    matrix.e = origin.x
-                    matrix.f = origin.y
-                    text = char["c"]
-                    char_dict = {
-                        "adv": bbox.x1 - bbox.x0 if upright else bbox.y1 - bbox.y0,
-                        "bottom": bbox.y1,
-                        "doctop": bbox.y0 + doctop_base,
-                        "fontname": fontname,
-                        "height": bbox.y1 - bbox.y0,
-                        "matrix": tuple(matrix),
-                        "ncs": "DeviceRGB",
-                        "non_stroking_color": color,
-                        "non_stroking_pattern": None,
-                        "object_type": "char",
-                        "page_number": page_number,
-                        "size": fontsize if upright else bbox.y1 - bbox.y0,
-                        "stroking_color": color,
-                        "stroking_pattern": None,
-                        "text": text,
-                        "top": bbox.y0,
-                        "upright": upright,
-                        "width": bbox.x1 - bbox.x0,
-                        "x0": bbox.x0,
-                        "x1": bbox.x1,
-                        "y0": bbox_ctm.y0,
-                        "y1": bbox_ctm.y1,
-                    }
-                    CHARS.append(char_dict)
+def rects_overlap(a, b) -> bool:
+    """Check whether rect-likes a and b overlap (as MuPDF's text clipping)."""
+    return not (a[0] >= b[2] or a[1] >= b[3] or a[2] <= b[0] or a[3] <= b[1])
+
+
+def small_glyph_bbox(bbox, origin, line_dir, ascender, descender, size):
+    """Return a character bbox as extracted with small glyph heights.
+
+    The character quad is moved to its origin and de-rotated, its vertical
+    extent replaced by the font's ascender / descender scaled to the font
+    size, then rotated and moved back.
+    """
+    c, s = line_dir
+    ox, oy = origin
+    d = 1 if c == -1 else c  # left-right flip
+    asc_dsc = max(ascender - descender, FLT_EPSILON)
+    asc = ascender * size / asc_dsc
+    dsc = descender * size / asc_dsc
+    if asc_dsc >= 1:  # the normal bbox uses the unscaled values
+        ya, yb = -ascender * size, -descender * size
+    else:
+        ya, yb = -asc, -dsc
+
+    # horizontal extent of the de-rotated quad
+    x0, y0, x1, y1 = bbox
+    if abs(c) >= abs(s):
+        lo, hi = sorted((-ya * s, -yb * s))
+        qx0, qx1 = sorted(((x0 - ox - lo) / c, (x1 - ox - hi) / c))
+    else:
+        lo, hi = sorted((ya * d, yb * d))
+        qx0, qx1 = sorted(((y0 - oy - lo) / s, (y1 - oy - hi) / s))
+    qx0 = max(qx0, 0)
+
+    if c == 1 and (y0 + y1) / 2 > oy:  # up-down flip
+        qy0, qy1 = dsc, asc
+    else:
+        qy0, qy1 = -asc, -dsc
+    xs = [x * c - y * s + ox for x in (qx0, qx1) for y in (qy0, qy1)]
+    ys = [x * s + y * d + oy for x in (qx0, qx1) for y in (qy0, qy1)]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def get_text_lines(page, flags, clip=None) -> list:
+    """Return the "rawdict" lines of a page with small glyph heights.
+
+    Character and span bboxes are replaced (unless MuPDF would keep them),
+    and characters no longer touching the clip (or page) are removed. MuPDF
+    selects the characters in clip by their glyph bboxes, so extractions for
+    different clips are not interchangeable.
+    """
+    area = Rect(clip) if clip is not None else page.rect
+    skip_corrections = TOOLS.unset_quad_corrections()
+    lines = []
+    for block in page.get_text("rawdict", clip=clip, flags=flags)["blocks"]:
+        for line in block.get("lines", ()):
+            keep_bboxes = skip_corrections or line["wmode"]
+            spans = []
+            for span in line["spans"]:
+                chars = []
+                for char in span["chars"]:
+                    if keep_bboxes:
+                        bbox = char["bbox"]
+                    else:
+                        bbox = small_glyph_bbox(
+                            char["bbox"],
+                            char["origin"],
+                            line["dir"],
+                            span["ascender"],
+                            span["descender"],
+                            span["size"],
+                        )
+                    if rects_overlap(bbox, area):
+                        char["bbox"] = bbox
+                        chars.append(char)
+                if chars:
+                    span["chars"] = chars
+                    span["bbox"] = (
+                        min(c["bbox"][0] for c in chars),
+                        min(c["bbox"][1] for c in chars),
+                        max(c["bbox"][2] for c in chars),
+                        max(c["bbox"][3] for c in chars),
+                    )
+                    spans.append(span)
+            line["spans"] = spans
+            lines.append(line)
+    return lines
+
+
+def text_spans(page, clip) -> list:
+    """Spans in clip, like 'get_text("dict", clip=clip)' (text, flags, bbox)."""
+    return [
+        {
+            "text": "".join(c["c"] for c in span["chars"]),
+            "flags": span["flags"],
+            "bbox": span["bbox"],
+        }
+        for line in get_text_lines(page, TEXTFLAGS_TEXT, clip=clip)
+        for span in line["spans"]
+    ]
+
+
+def text_words(page, clip) -> list:
+    """Word bboxes in clip, like 'get_text("words", clip=clip)'."""
+    words = []
+
+    def append_word(bboxes):
+        bboxes = [b for b in bboxes if b[0] < b[2] and b[1] < b[3]]
+        if bboxes:
+            words.append(
+                (
+                    min(b[0] for b in bboxes),
+                    min(b[1] for b in bboxes),
+                    max(b[2] for b in bboxes),
+                    max(b[3] for b in bboxes),
+                )
+            )
+
+    rtl = False
+    for line in get_text_lines(page, TEXTFLAGS_WORDS, clip=clip):
+        word = []  # character bboxes of the current word
+        for span in line["spans"]:
+            for char in span["chars"]:
+                code = ord(char["c"])
+                delimiter = code <= 32 or code == 160 or 0x202A <= code <= 0x202E
+                char_rtl = 0x590 <= code <= 0x900
+                if delimiter or char_rtl != rtl:
+                    if not word and delimiter:
+                        continue  # skip delimiters at line start
+                    append_word(word)
+                    word = []
+                    if delimiter:
+                        continue
+                rtl = char_rtl
+                word.append(char["bbox"])
+        append_word(word)
+    return words
+
+
+def text_box(lines, rect) -> str:
+    """Text in rect, like 'get_textbox(rect)'."""
+    texts = []
+    for line in lines:
+        text = "".join(
+            c["c"]
+            for span in line["spans"]
+            for c in span["chars"]
+            if rects_overlap(c["bbox"], rect)
+        )
+        if text:
+            texts.append(text)
+    return "\n".join(texts)
+
+
+def has_text(chars, rect) -> bool:
+    """Check whether any non-space character of a CharStore overlaps rect."""
+    x0, y0, x1, y1 = rect
+    return any(
+        not (cx0 >= x1 or top >= y1 or cx1 <= x0 or bottom <= y0)
+        and not white_spaces.issuperset(text)
+        for text, cx0, top, cx1, bottom in zip(
+            chars.text, chars.x0, chars.top, chars.x1, chars.bottom
+        )
+    )
+
+
+# -----------------------------------------------------------------------------
+# Extract all page characters to fill the context's chars list
+# -----------------------------------------------------------------------------
+def make_chars(page, context, clip=None):
+    """Extract text as "rawdict" to fill context.chars."""
+    chars = context.chars = CharStore(
+        page_number=page.number + 1,
+        doctop_base=page.rect.height * page.number,
+        ctm=page.transformation_matrix,
+    )
+    for line in get_text_lines(page, TEXTFLAGS_TEXT, clip=clip):
+        ldir = line["dir"]  # = (cosine, sine) of angle
+        ldir = (round(ldir[0], 4), round(ldir[1], 4))
+        line_index = chars.add_line(ldir)
+        upright = ldir[1] == 0
+        for span in sorted(line["spans"], key=lambda s: s["bbox"][0]):
+            span_index = chars.add_span(
+                span["font"], span["size"], sRGB_to_pdf(span["color"])
+            )
+            for char in sorted(span["chars"], key=lambda c: c["bbox"][0]):
+                chars.append(
+                    char["c"],
+                    char["bbox"],
+                    char["origin"],
+                    upright,
+                    line_index,
+                    span_index,
+                )
 
 
 # ------------------------------------------------------------------------
-# Extract all page vector graphics to fill the EDGES list.
+# Extract all page vector graphics to fill the context's edges list.
 # We are ignoring Bézier curves completely and are converting everything
 # else to lines.
 # ------------------------------------------------------------------------
-def make_edges(page, clip=None, tset=None, paths=None, add_lines=None, add_boxes=None):
+def make_edges(page, context, clip=None, tset=None, paths=None, add_lines=None, add_boxes=None):
+    edges = context.edges
     snap_x = tset.snap_x_tolerance
     snap_y = tset.snap_y_tolerance
     min_length = tset.edge_min_length
@@ -2091,7 +2400,7 @@ def make_edges(page, clip=None, tset=None, paths=None, add_lines=None, add_boxes
                         repeat = True  # keep checking the rest
 
             # move rect 0 over to result list if there is some text in it
-            if not white_spaces.issuperset(page.get_textbox(prect0, textpage=TEXTPAGE)):
+            if has_text(context.chars, prect0):
                 # contains text, so accept it as a table bbox candidate
                 new_rects.append(prect0)
             del prects[0]  # remove from rect list
@@ -2175,7 +2484,7 @@ def make_edges(page, clip=None, tset=None, paths=None, add_lines=None, add_boxes
                 p1, p2 = i[1:]
                 line_dict = make_line(p, p1, p2, clip)
                 if line_dict:
-                    EDGES.append(line_to_edge(line_dict))
+                    edges.append(line_to_edge(line_dict))
 
             elif i[0] == "re":
                 # A rectangle: decompose into 4 lines, but filter out
@@ -2190,7 +2499,7 @@ def make_edges(page, clip=None, tset=None, paths=None, add_lines=None, add_boxes
                     p2 = Point(x, rect.y1)
                     line_dict = make_line(p, p1, p2, clip)
                     if line_dict:
-                        EDGES.append(line_to_edge(line_dict))
+                        edges.append(line_to_edge(line_dict))
                     continue
 
                 if (
@@ -2201,24 +2510,24 @@ def make_edges(page, clip=None, tset=None, paths=None, add_lines=None, add_boxes
                     p2 = Point(rect.x1, y)
                     line_dict = make_line(p, p1, p2, clip)
                     if line_dict:
-                        EDGES.append(line_to_edge(line_dict))
+                        edges.append(line_to_edge(line_dict))
                     continue
 
                 line_dict = make_line(p, rect.tl, rect.bl, clip)
                 if line_dict:
-                    EDGES.append(line_to_edge(line_dict))
+                    edges.append(line_to_edge(line_dict))
 
                 line_dict = make_line(p, rect.bl, rect.br, clip)
                 if line_dict:
-                    EDGES.append(line_to_edge(line_dict))
+                    edges.append(line_to_edge(line_dict))
 
                 line_dict = make_line(p, rect.br, rect.tr, clip)
                 if line_dict:
-                    EDGES.append(line_to_edge(line_dict))
+                    edges.append(line_to_edge(line_dict))
 
                 line_dict = make_line(p, rect.tr, rect.tl, clip)
                 if line_dict:
-                    EDGES.append(line_to_edge(line_dict))
+                    edges.append(line_to_edge(line_dict))
 
             else:  # must be a quad
                 # we convert it into (up to) 4 lines
@@ -2226,37 +2535,37 @@ def make_edges(page, clip=None, tset=None, paths=None, add_lines=None, add_boxes
 
                 line_dict = make_line(p, ul, ll, clip)
                 if line_dict:
-                    EDGES.append(line_to_edge(line_dict))
+                    edges.append(line_to_edge(line_dict))
 
                 line_dict = make_line(p, ll, lr, clip)
                 if line_dict:
-                    EDGES.append(line_to_edge(line_dict))
+                    edges.append(line_to_edge(line_dict))
 
                 line_dict = make_line(p, lr, ur, clip)
                 if line_dict:
-                    EDGES.append(line_to_edge(line_dict))
+                    edges.append(line_to_edge(line_dict))
 
                 line_dict = make_line(p, ur, ul, clip)
                 if line_dict:
-                    EDGES.append(line_to_edge(line_dict))
+                    edges.append(line_to_edge(line_dict))
 
     path = {"color": (0, 0, 0), "fill": None, "width": 1}
     for bbox in bboxes:  # add the border lines for all enveloping bboxes
         line_dict = make_line(path, bbox.tl, bbox.tr, clip)
         if line_dict:
-            EDGES.append(line_to_edge(line_dict))
+            edges.append(line_to_edge(line_dict))
 
         line_dict = make_line(path, bbox.bl, bbox.br, clip)
         if line_dict:
-            EDGES.append(line_to_edge(line_dict))
+            edges.append(line_to_edge(line_dict))
 
         line_dict = make_line(path, bbox.tl, bbox.bl, clip)
         if line_dict:
-            EDGES.append(line_to_edge(line_dict))
+            edges.append(line_to_edge(line_dict))
 
         line_dict = make_line(path, bbox.tr, bbox.br, clip)
         if line_dict:
-            EDGES.append(line_to_edge(line_dict))
+            edges.append(line_to_edge(line_dict))
 
     if add_lines is not None:  # add user-specified lines
         assert isinstance(add_lines, (tuple, list))
@@ -2267,7 +2576,7 @@ def make_edges(page, clip=None, tset=None, paths=None, add_lines=None, add_boxes
         p2 = Point(p2)
         line_dict = make_line(path, p1, p2, clip)
         if line_dict:
-            EDGES.append(line_to_edge(line_dict))
+            edges.append(line_to_edge(line_dict))
 
     if add_boxes is not None:  # add user-specified rectangles
         assert isinstance(add_boxes, (tuple, list))
@@ -2277,16 +2586,16 @@ def make_edges(page, clip=None, tset=None, paths=None, add_lines=None, add_boxes
         r = Rect(box)
         line_dict = make_line(path, r.tl, r.bl, clip)
         if line_dict:
-            EDGES.append(line_to_edge(line_dict))
+            edges.append(line_to_edge(line_dict))
         line_dict = make_line(path, r.bl, r.br, clip)
         if line_dict:
-            EDGES.append(line_to_edge(line_dict))
+            edges.append(line_to_edge(line_dict))
         line_dict = make_line(path, r.br, r.tr, clip)
         if line_dict:
-            EDGES.append(line_to_edge(line_dict))
+            edges.append(line_to_edge(line_dict))
         line_dict = make_line(path, r.tr, r.tl, clip)
         if line_dict:
-            EDGES.append(line_to_edge(line_dict))
+            edges.append(line_to_edge(line_dict))
 
 
 def page_rotation_set0(page):
@@ -2373,11 +2682,6 @@ def find_tables(
     add_boxes=None,  # user-specified rectangles
     paths=None,  # accept vector graphics as parameter
 ):
-    global CHARS, EDGES
-    CHARS = []
-    EDGES = []
-    old_small = bool(TOOLS.set_small_glyph_heights())  # save old value
-    TOOLS.set_small_glyph_heights(True)  # we need minimum bboxes
     if page.rotation != 0:
         page, old_xref, old_rot, old_mediabox = page_rotation_set0(page)
     else:
@@ -2423,18 +2727,19 @@ def find_tables(
     tset = TableSettings.resolve(settings=settings)
     page.table_settings = tset
 
-    make_chars(page, clip=clip)  # create character list of page
+    context = TableContext(page)  # all data of this call
+    make_chars(page, context, clip=clip)  # create character list of page
     make_edges(
         page,
+        context,
         clip=clip,
         tset=tset,
         paths=paths,
         add_lines=add_lines,
         add_boxes=add_boxes,
     )  # create lines and curves
-    tables = TableFinder(page, settings=tset)
+    tables = TableFinder(page, settings=tset, context=context)
 
-    TOOLS.set_small_glyph_heights(old_small)
     if old_xref is not None:
         page = page_rotation_reset(page, old_xref, old_rot, old_mediabox)
     return tables
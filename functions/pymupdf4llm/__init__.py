@@ -1,4 +1,4 @@
-from .helpers.pymupdf_rag import IdentifyHeaders, TocHeaders, to_markdown
+from .helpers.pymupdf_rag import IdentifyHeaders, TocHeaders, to_markdown, to_markdown_pages
 
 __version__ = "0.0.25"
 version = __version__
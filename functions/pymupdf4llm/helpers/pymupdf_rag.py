@@ -68,6 +68,25 @@ bullet = tuple(
 GRAPHICS_TEXT = "\n![](%s)\n"
 
 
+def add_fontsizes(fontsizes: dict, blocks: list):
+    """Add the character counts of non-white spans per rounded font size.
+
+    Args:
+        fontsizes: dictionary to update, rounded font size -> character count
+        blocks: text blocks of a "dict" extraction
+    """
+    for span in [  # look at all non-empty spans
+        s
+        for b in blocks
+        if b["type"] == 0
+        for l in b["lines"]
+        for s in l["spans"]
+        if not is_white(s["text"])
+    ]:
+        fontsz = round(span["size"])  # # compute rounded fontsize
+        fontsizes[fontsz] += len(span["text"].strip())  # add character count
+
+
 class IdentifyHeaders:
     """Compute data for identifying header text.
 
@@ -88,6 +107,7 @@ class IdentifyHeaders:
         pages: list = None,
         body_limit: float = 12,  # force this to be body text
         max_levels: int = 6,  # accept this many header levels
+        fontsizes: dict = None,  # histogram already counted by the caller
     ):
         """Read all text and make a dictionary of fontsizes.
 
@@ -95,34 +115,13 @@ class IdentifyHeaders:
             doc: PDF document or filename
             pages: consider these page numbers only
             body_limit: treat text with larger font size as a header
+            fontsizes: rounded font size -> character count, as made by
+                add_fontsizes(). If given, no page is read.
         """
         if not isinstance(max_levels, int) or max_levels not in range(1, 7):
             raise ValueError("max_levels must be an integer between 1 and 6")
-        if isinstance(doc, pymupdf.Document):
-            mydoc = doc
-        else:
-            mydoc = pymupdf.open(doc)
-
-        if pages is None:  # use all pages if omitted
-            pages = range(mydoc.page_count)
-
-        fontsizes = defaultdict(int)
-        for pno in pages:
-            page = mydoc.load_page(pno)
-            blocks = page.get_text("dict", flags=pymupdf.TEXTFLAGS_TEXT)["blocks"]
-            for span in [  # look at all non-empty horizontal spans
-                s
-                for b in blocks
-                for l in b["lines"]
-                for s in l["spans"]
-                if not is_white(s["text"])
-            ]:
-                fontsz = round(span["size"])  # # compute rounded fontsize
-                fontsizes[fontsz] += len(span["text"].strip())  # add character count
-
-        if mydoc != doc:
-            # if opened here, close it now
-            mydoc.close()
+        if fontsizes is None:
+            fontsizes = self.count_fontsizes(doc, pages)
 
         # maps a fontsize to a string of multiple # header tag characters
         self.header_id = {}
@@ -151,6 +150,28 @@ class IdentifyHeaders:
         if self.header_id.keys():
             self.body_limit = min(self.header_id.keys()) - 1
 
+    @staticmethod
+    def count_fontsizes(doc, pages=None) -> dict:
+        """Read all text of the pages and count characters per font size."""
+        if isinstance(doc, pymupdf.Document):
+            mydoc = doc
+        else:
+            mydoc = pymupdf.open(doc)
+
+        if pages is None:  # use all pages if omitted
+            pages = range(mydoc.page_count)
+
+        fontsizes = defaultdict(int)
+        for pno in pages:
+            page = mydoc.load_page(pno)
+            blocks = page.get_text("dict", flags=pymupdf.TEXTFLAGS_TEXT)["blocks"]
+            add_fontsizes(fontsizes, blocks)
+
+        if mydoc != doc:
+            # if opened here, close it now
+            mydoc.close()
+        return fontsizes
+
     def get_header_id(self, span: dict, page=None) -> str:
         """Return appropriate markdown header prefix.
 
@@ -323,6 +344,9 @@ def to_markdown(
     show_progress=False,
     use_glyphs=False,
     ignore_alpha=False,
+    concurrency=None,
+    _iterate_pages=False,
+    _header_pages=None,
 ) -> str:
     """Process the document and return the text of the selected pages.
 
@@ -347,6 +371,9 @@ def to_markdown(
         show_progress: (bool, False) print progress as each page is processed.
         use_glyphs: (bool, False) replace the Invalid Unicode by glyph numbers.
         ignore_alpha: (bool, True) ignore text with alpha = 0 (transparent).
+        concurrency: (int) convert PDF pages in this many forked worker
+            processes. Output is identical to the serial conversion.
+            None or 1 converts in this process.
 
     """
     if write_images is False and embed_images is False and force_text is False:
@@ -402,8 +429,10 @@ def to_markdown(
     elif not all(hasattr(m, "__float__") for m in margins):
         raise ValueError("margin values must be floats")
 
-    # If "hdr_info" is not an object with a method "get_header_id", scan the
-    # document and use font sizes as header level indicators.
+    # If "hdr_info" is not an object with a method "get_header_id", use font
+    # sizes as header level indicators. They are counted before any page is
+    # converted, where possible from the same TextPages the pages are
+    # converted from. Pages yielded one by one count the first pages only.
     if callable(hdr_info):
         get_header_id = hdr_info
     elif hasattr(hdr_info, "get_header_id") and callable(hdr_info.get_header_id):
@@ -411,8 +440,7 @@ def to_markdown(
     elif hdr_info is False:
         get_header_id = lambda s, page=None: ""
     else:
-        hdr_info = IdentifyHeaders(doc)
-        get_header_id = hdr_info.get_header_id
+        get_header_id = None
 
     def max_header_id(spans, page):
         hdr_ids = sorted(
@@ -932,7 +960,10 @@ def to_markdown(
             Markdown string of page content and image, table and vector
             graphics information.
         """
-        page = doc[pno]
+        # reuse the page and TextPage made while counting font sizes
+        page, textpage = textpages.pop(pno, (None, None))
+        if page is None:
+            page = doc[pno]
         page.remove_rotation()  # make sure we work on rotation=0
         parms = Parameters()  # all page information
         parms.page = page
@@ -960,7 +991,9 @@ def to_markdown(
         parms.annot_rects = [a.rect for a in page.annots()]
 
         # make a TextPage for all later extractions
-        parms.textpage = page.get_textpage(flags=textflags, clip=parms.clip)
+        if textpage is None:
+            textpage = page.get_textpage(flags=textflags, clip=parms.clip)
+        parms.textpage = textpage
 
         # extract images on page
         if not IGNORE_IMAGES:
@@ -1183,36 +1216,224 @@ def to_markdown(
     if use_glyphs:
         textflags |= mupdf.FZ_STEXT_USE_GID_FOR_UNKNOWN_UNICODE
 
-    if show_progress:
-        print(f"Processing {FILENAME}...")
-        pages = ProgressBar(pages)
-    for pno in pages:
+    textpages = {}  # (page, TextPage) made while counting font sizes, by page number
+    # pages whose font sizes set the header levels
+    header_pages = pages if _header_pages is None else pages[:_header_pages]
+
+    def get_page_fontsizes(page):
+        """Count the page's characters per font size, as IdentifyHeaders does.
+
+        Also returns the page's TextPage for get_page_output() to reuse if it
+        was counted from it, i.e. if there are no margins to omit text that
+        IdentifyHeaders counts. Otherwise the TextPage is None and the page is
+        read for the count only.
+        """
+        if any(margins):
+            return None, IdentifyHeaders.count_fontsizes(page.parent, [page.number])
+        page.remove_rotation()
+        # Unlike pymupdf.TEXTFLAGS_TEXT, these flags expand ligatures, which
+        # are therefore counted as their letters.
+        textpage = page.get_textpage(flags=textflags, clip=page.rect)
+        fontsizes = defaultdict(int)
+        add_fontsizes(fontsizes, textpage.extractDICT()["blocks"])
+        return textpage, fontsizes
+
+    def count_fontsizes(doc, pnos):
+        """Count the characters per font size of these pages.
+
+        Their TextPages are kept in textpages until the pages are converted.
+        """
+        fontsizes = defaultdict(int)
+        for pno in pnos:
+            page = doc[pno]
+            textpage, page_fontsizes = get_page_fontsizes(page)
+            if textpage is not None:
+                textpages[pno] = (page, textpage)
+            for fontsz, count in page_fontsizes.items():
+                fontsizes[fontsz] += count
+        return fontsizes
+
+    def get_page_result(doc, pno):
+        """Process one page in a worker process.
+
+        Returns the parts of the page output that are used below, which
+        (unlike the page, its TextPage and tables) can be sent back to the
+        parent process.
+        """
         parms = get_page_output(
-            doc, pno, margins, textflags, FILENAME, IGNORE_IMAGES, IGNORE_GRAPHICS
+            doc,
+            pno,
+            margins,
+            textflags,
+            FILENAME,
+            IGNORE_IMAGES,
+            IGNORE_GRAPHICS,
+        )
+        result = Parameters()
+        result.md_string = parms.md_string
+        result.tables = parms.tables
+        result.images = parms.images
+        result.graphics = parms.graphics
+        result.words = parms.words
+        return result
+
+    def iter_page_results_concurrently(pages):
+        """Process pages in forked worker processes, yielding results in page order.
+
+        Of n workers, worker i converts pages[i::n]. Its results are read in
+        turn with the other workers', so each page is yielded once it and the
+        pages before it are done, while the workers go on converting.
+        Workers open their own copy of the document (as prepared above, e.g.
+        after baking), because Document objects cannot be shared across a fork.
+        If header levels are still unknown, each worker first counts the font
+        sizes of its share of header_pages, keeping their TextPages, and then
+        waits for the counts of all workers.
+        """
+        nonlocal get_header_id
+        import multiprocessing
+        import signal
+        import tempfile
+
+        n = min(concurrency, len(pages))
+        counts_down = [multiprocessing.Queue() for _ in range(n)]
+        results_up = [multiprocessing.Queue() for _ in range(n)]
+        header_set = set(header_pages)
+
+        def work(i, path):
+            nonlocal get_header_id
+            try:
+                wdoc = pymupdf.open(path)
+                wpages = pages[i::n]
+                if get_header_id is None:
+                    fontsizes = count_fontsizes(
+                        wdoc, [pno for pno in wpages if pno in header_set]
+                    )
+                    results_up[i].put(dict(fontsizes))
+                    fontsizes = counts_down[i].get()
+                    get_header_id = IdentifyHeaders(
+                        wdoc, fontsizes=fontsizes
+                    ).get_header_id
+                for pno in wpages:
+                    results_up[i].put(get_page_result(wdoc, pno))
+            except Exception as e:
+                results_up[i].put(e)
+            # deliver all results before exiting
+            results_up[i].close()
+            results_up[i].join_thread()
+
+        def get_result(i):
+            result = results_up[i].get()
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "document.pdf")
+            doc.save(path)
+            pids = []
+            finished = False
+            try:
+                for i in range(n):
+                    pid = os.fork()
+                    if pid == 0:  # worker process
+                        try:
+                            work(i, path)
+                        finally:
+                            os._exit(0)
+                    pids.append(pid)
+                if get_header_id is None:
+                    fontsizes = defaultdict(int)
+                    for i in range(n):
+                        for fontsz, count in get_result(i).items():
+                            fontsizes[fontsz] += count
+                    for queue in counts_down:
+                        queue.put(dict(fontsizes))
+                    get_header_id = IdentifyHeaders(doc, fontsizes=fontsizes).get_header_id
+                for k, pno in enumerate(pages):
+                    yield pno, get_result(k % n)
+                finished = True
+            finally:
+                for pid in pids:
+                    if not finished:  # failed, or the caller stopped iterating
+                        os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+
+    if concurrency and concurrency > 1 and doc.is_pdf and len(pages) > 1:
+        if show_progress:
+            print(f"Processing {FILENAME} in {concurrency} processes...")
+        page_results = iter_page_results_concurrently(list(pages))
+    else:
+        if get_header_id is None:
+            fontsizes = count_fontsizes(doc, header_pages)
+            get_header_id = IdentifyHeaders(doc, fontsizes=fontsizes).get_header_id
+        if show_progress:
+            print(f"Processing {FILENAME}...")
+            pages = ProgressBar(pages)
+        page_results = (
+            (
+                pno,
+                get_page_output(
+                    doc,
+                    pno,
+                    margins,
+                    textflags,
+                    FILENAME,
+                    IGNORE_IMAGES,
+                    IGNORE_GRAPHICS,
+                ),
+            )
+            for pno in pages
         )
+    def get_page_chunk(pno, parms):
+        # build subet of TOC for this page
+        page_tocs = [t for t in toc if t[-1] == pno + 1]
+
+        metadata = get_metadata(doc, pno)
+        return {
+            "metadata": metadata,
+            "toc_items": page_tocs,
+            "tables": parms.tables,
+            "images": parms.images,
+            "graphics": parms.graphics,
+            "text": parms.md_string,
+            "words": parms.words,
+        }
+
+    if _iterate_pages:
+        # see to_markdown_pages()
+        return (get_page_chunk(pno, parms) for pno, parms in page_results)
+
+    for pno, parms in page_results:
         if page_chunks is False:
             document_output += parms.md_string
         else:
-            # build subet of TOC for this page
-            page_tocs = [t for t in toc if t[-1] == pno + 1]
-
-            metadata = get_metadata(doc, pno)
-            document_output.append(
-                {
-                    "metadata": metadata,
-                    "toc_items": page_tocs,
-                    "tables": parms.tables,
-                    "images": parms.images,
-                    "graphics": parms.graphics,
-                    "text": parms.md_string,
-                    "words": parms.words,
-                }
-            )
+            document_output.append(get_page_chunk(pno, parms))
         del parms
 
     return document_output
 
 
+def to_markdown_pages(doc, header_pages=10, **kwargs):
+    """Convert the document page by page, yielding each page as it is done.
+
+    Accepts the arguments of to_markdown() and yields the page chunks that
+    to_markdown(page_chunks=True) returns as a list. Only the pages being
+    converted are held in memory, so callers can write out or forward each
+    page before the next one is converted. With "concurrency", the worker
+    processes convert ahead while the pages are yielded in order.
+
+    Without "hdr_info", header levels come from the font sizes of the first
+    header_pages pages (None: of all pages), which are read before the first
+    page is yielded and whose TextPages are kept until their conversion. The
+    "text" of all chunks joined is the to_markdown() output if these pages
+    have all the font sizes of the document (or the header levels are given).
+
+    The document must stay open until the iterator is exhausted.
+    """
+    kwargs["page_chunks"] = True
+    return to_markdown(doc, _iterate_pages=True, _header_pages=header_pages, **kwargs)
+
+
 def extract_images_on_page_simple(page, parms, image_size_limit):
     # extract images on page
     # ignore images contained in some other one (simplified mechanism)
@@ -0,0 +1,106 @@
+"""
+Benchmarks page.find_tables on a PDF: wall time and memory allocations per
+page, and the size of the page's character store against the per-character
+dicts it replaces.
+
+Usage (from the repository root):
+
+    python scripts/benchmark_find_tables.py report.pdf
+    python scripts/benchmark_find_tables.py report.pdf --strategy lines text --repeat 5
+
+Wall time is the fastest of --repeat runs; allocations are measured in one
+extra run under tracemalloc (which slows it down, so its time is not used).
+Every table is extracted as well, as pymupdf4llm does for its Markdown.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "functions")
+sys.path.insert(0, FUNCTIONS_DIR)
+
+import pymupdf  # noqa: E402
+
+
+def find_tables(page, strategy):
+    """Finds and extracts the page's tables; returns the TableFinder."""
+    tabs = page.find_tables(strategy=strategy)
+    for tab in tabs.tables:
+        tab.extract()
+    return tabs
+
+
+def deep_size(obj, seen):
+    """Bytes used by obj and the containers, strings and numbers inside it,
+    counting every object not yet in seen (a set of ids) once."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_size(item, seen) for item in obj)
+    return size
+
+
+def char_store_sizes(chars):
+    """Bytes of the columnar CharStore, and of the same chars as one dict each."""
+    seen = set()
+    columns = sum(deep_size(value, seen) for value in vars(chars).values())
+    dicts = deep_size([chars[i] for i in range(len(chars))], set())
+    return columns, dicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", help="PDF to search for tables")
+    parser.add_argument("--strategy", nargs="+", default=["lines"], help="find_tables strategies to run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per page; the fastest is reported")
+    args = parser.parse_args()
+
+    doc = pymupdf.open(args.pdf)
+    print(f"{args.pdf}: {doc.page_count} pages")
+    for strategy in args.strategy:
+        total_s = total_peak = total_blocks = total_chars = total_columns = total_dicts = 0
+        print(f"strategy {strategy}:")
+        print(f"{'page':>5} {'tables':>6} {'chars':>6} {'ms':>8} {'peak KiB':>9} {'blocks':>8} "
+              f"{'store KiB':>9} {'dicts KiB':>9}")
+        for page in doc:
+            best_s = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                find_tables(page, strategy)
+                seconds = time.perf_counter() - start
+                best_s = seconds if best_s is None else min(best_s, seconds)
+
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            tabs = find_tables(page, strategy)
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+
+            chars = tabs.context.chars
+            columns, dicts = char_store_sizes(chars)
+            print(f"{page.number:>5} {len(tabs.tables):>6} {len(chars):>6} {best_s * 1000:8.1f} "
+                  f"{peak / 1024:9.1f} {blocks:>8} {columns / 1024:9.1f} {dicts / 1024:9.1f}")
+            total_s += best_s
+            total_peak = max(total_peak, peak)
+            total_blocks += blocks
+            total_chars += len(chars)
+            total_columns += columns
+            total_dicts += dicts
+
+        page_count = max(doc.page_count, 1)
+        print(f"total: {total_chars} chars, {total_s * 1000 / page_count:.1f} ms/page, "
+              f"peak {total_peak / 1024:.1f} KiB, {total_blocks / page_count:.0f} live blocks/page, "
+              f"char store {total_columns / 1024:.1f} KiB vs {total_dicts / 1024:.1f} KiB as dicts")
+    doc.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmarks pymupdf4llm.to_markdown's page-parallel mode against the serial
+conversion on a PDF, and checks that every mode produces identical Markdown.
+
+Usage (from the repository root):
+
+    python scripts/benchmark_to_markdown.py report.pdf
+    python scripts/benchmark_to_markdown.py report.pdf --concurrency 1 2 4 --repeat 3
+
+Each run opens the document afresh and converts it with the header detection
+pdf_parser_v2 uses. The script exits with status 1 if any concurrency level's
+output differs from the serial output.
+"""
+import argparse
+import os
+import sys
+import time
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "functions")
+sys.path.insert(0, FUNCTIONS_DIR)
+
+import pymupdf  # noqa: E402
+import pymupdf4llm  # noqa: E402
+
+
+def convert(pdf_bytes, concurrency):
+    """Converts the PDF the way pdf_parser_v2 does; returns (markdown, seconds)."""
+    start = time.perf_counter()
+    doc = pymupdf.open(stream=pdf_bytes, filetype="pdf")
+    hdr_info = pymupdf4llm.TocHeaders(doc) if doc.get_toc() else None
+    md_text = pymupdf4llm.to_markdown(doc, hdr_info=hdr_info, concurrency=concurrency)
+    doc.close()
+    return md_text, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", help="PDF to convert")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4],
+                        help="worker process counts to compare (1 is the serial conversion)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per level; the fastest is reported")
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        pdf_bytes = f.read()
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        page_count = doc.page_count
+    print(f"{args.pdf}: {page_count} pages, {os.cpu_count()} CPUs")
+
+    levels = [1] + [level for level in args.concurrency if level != 1]
+    reference = None
+    serial_s = None
+    mismatched = []
+    for level in levels:
+        runs = [convert(pdf_bytes, level) for _ in range(args.repeat)]
+        md_text = runs[0][0]
+        best_s = min(seconds for _, seconds in runs)
+        if reference is None:
+            reference, serial_s = md_text, best_s
+        identical = all(text == reference for text, _ in runs)
+        if not identical:
+            mismatched.append(level)
+        print(
+            f"concurrency {level:>2}: {best_s:7.2f} s, {page_count / best_s:6.1f} pages/s, "
+            f"{serial_s / best_s:4.2f}x, {'identical' if identical else 'DIFFERENT'} output"
+        )
+
+    if mismatched:
+        print(f"Output differs from the serial conversion at concurrency {mismatched}.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Import-time profile of each deployed Cloud Function.
+
+Every function instance starts by importing functions/main.py with
+FUNCTION_TARGET set to the function it serves. This script reproduces that in a
+fresh interpreter per target under `python -X importtime` and reports the
+milliseconds spent importing each module, so cold-start regressions show up
+before deployment.
+
+After main.py, each target's hot-path modules (HOT_PATH_MODULES) are loaded the
+way its first invocation would load them, and the report shows the cold-start
+time and peak RSS of the whole process. Any FORBIDDEN_MODULES found loaded for a
+target (e.g. PyMuPDF in an agent executor) are reported as regressions.
+
+Usage (from the repository root):
+
+    python scripts/profile_imports.py
+    python scripts/profile_imports.py --target pdf_parser_v2 --top 30
+    python scripts/profile_imports.py --save-baseline scripts/import_baseline.json
+    python scripts/profile_imports.py --baseline scripts/import_baseline.json --tolerance 0.2
+
+With --baseline, the script exits with status 1 when any target's total import
+time or peak RSS exceeds its baseline by more than the tolerance (plus --slack-ms,
+which absorbs noise on very small totals). --max-ms sets an absolute budget on
+import time instead. Forbidden modules always fail the run.
+
+scripts/import_baseline.json is the committed baseline. Run the --baseline
+command above before deploying functions that change imports or dependencies.
+Timings depend on the machine, so compare against a baseline saved on the same
+one: the file records the Python version and platform it was measured with.
+Re-save it in the same commit when a change is meant to move the numbers.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "functions")
+
+ENTRY_POINTS = [
+    "upload_trigger_v2",
+    "pdf_parser_v2",
+    "report_state_machine_v2",
+    "agent_executor_v2",
+    "pipeline_executor_v2",
+]
+
+# Modules each function loads lazily on its first invocation.
+HOT_PATH_MODULES = {
+    "upload_trigger_v2": ["firebase_admin.firestore", "firebase_admin.storage", "google.cloud.pubsub_v1"],
+    "pdf_parser_v2": ["firebase_admin.firestore", "firebase_admin.storage", "pymupdf4llm", "google.cloud.pubsub_v1"],
+    "report_state_machine_v2": ["firebase_admin.firestore", "google.cloud.pubsub_v1"],
+    "agent_executor_v2": ["firebase_admin.firestore", "firebase_admin.storage", "google.generativeai", "pydantic"],
+    "pipeline_executor_v2": ["firebase_admin.firestore", "firebase_admin.storage", "google.generativeai", "pydantic"],
+}
+
+# Modules a function must never load; each is a prefix of module names.
+LLM_MODULES = ["google.generativeai", "google.ai.generativelanguage"]
+PDF_MODULES = ["pymupdf", "pymupdf4llm", "fitz"]
+FORBIDDEN_MODULES = {
+    "upload_trigger_v2": LLM_MODULES + PDF_MODULES,
+    "pdf_parser_v2": LLM_MODULES,
+    "report_state_machine_v2": LLM_MODULES + PDF_MODULES,
+    "agent_executor_v2": PDF_MODULES,
+    "pipeline_executor_v2": PDF_MODULES,
+}
+
+CHILD_CODE = """
+import importlib, json, os, resource, sys, time
+start = time.perf_counter()
+import main
+getattr(main, os.environ['FUNCTION_TARGET'])
+for module in os.environ['HOT_PATH_MODULES'].split():
+    importlib.import_module(module)
+print(json.dumps({
+    'cold_start_ms': (time.perf_counter() - start) * 1000,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': sorted(sys.modules),
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Parses `-X importtime` output into a list of (module, self_ms, cumulative_ms,
+    depth) tuples in the order the interpreter reported them.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, _, rest = line.partition("import time:")
+        self_us, cumulative_us, name = rest.split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+    return modules
+
+
+def profile_target(target, python=sys.executable):
+    """
+    Loads one target in a fresh interpreter, the way its instance cold-starts,
+    and returns its import profile, cold-start time, peak RSS and any forbidden
+    modules it loaded.
+    """
+    env = dict(os.environ, FUNCTION_TARGET=target, HOT_PATH_MODULES=" ".join(HOT_PATH_MODULES.get(target, [])))
+    # Set by the runtime; the storage trigger needs its bucket at import.
+    env.setdefault("FIREBASE_CONFIG", json.dumps({"projectId": "profile", "storageBucket": "profile.appspot.com"}))
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", CHILD_CODE],
+        cwd=FUNCTIONS_DIR, env=env, capture_output=True, text=True,
+    )
+    modules = parse_importtime(proc.stderr)
+    total_ms = next((cum for name, _, cum, _ in modules if name == "main"), None)
+    result = {"target": target, "total_ms": total_ms, "modules": modules, "error": None,
+              "cold_start_ms": None, "rss_mb": None, "forbidden": []}
+    if proc.returncode != 0:
+        result["error"] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+        return result
+
+    stats = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["cold_start_ms"] = stats["cold_start_ms"]
+    result["rss_mb"] = stats["rss_mb"]
+    prefixes = FORBIDDEN_MODULES.get(target, [])
+    result["forbidden"] = [
+        name for name in stats["modules"]
+        if any(name == prefix or name.startswith(prefix + ".") for prefix in prefixes)
+    ]
+    return result
+
+
+def best_of(target, repeat):
+    """Profiles a target `repeat` times and keeps the fastest run."""
+    runs = [profile_target(target) for _ in range(repeat)]
+    ok = [run for run in runs if run["error"] is None and run["total_ms"] is not None]
+    return min(ok, key=lambda run: run["total_ms"]) if ok else runs[-1]
+
+
+def print_report(result, top):
+    target = result["target"]
+    if result["error"]:
+        print(f"{target}: FAILED to import main ({result['error']})")
+        return
+    print(
+        f"{target}: {result['total_ms']:.1f} ms to import main, "
+        f"{result['cold_start_ms']:.1f} ms cold start with hot path, {result['rss_mb']:.1f} MB peak RSS"
+    )
+    if result["forbidden"]:
+        print(f"    forbidden modules loaded: {', '.join(result['forbidden'])}")
+    by_cumulative = sorted(result["modules"], key=lambda m: m[2], reverse=True)
+    shown = [m for m in by_cumulative if m[0] != "main"][:top]
+    for name, self_ms, cumulative_ms, _ in shown:
+        print(f"    {cumulative_ms:9.1f} ms  (self {self_ms:7.1f} ms)  {name}")
+
+
+def measured_with():
+    """The interpreter and platform timings were taken with, as stored in baselines."""
+    return f"Python {platform.python_version()} on {platform.system()} {platform.machine()}"
+
+
+def check_regressions(results, baseline, tolerance, slack_ms, max_ms):
+    failures = []
+    for result in results:
+        target, total = result["target"], result["total_ms"]
+        if result["error"] or total is None:
+            failures.append(f"{target}: import failed")
+            continue
+        if result["forbidden"]:
+            failures.append(f"{target}: loads forbidden modules {', '.join(result['forbidden'])}")
+        if max_ms is not None and total > max_ms:
+            failures.append(f"{target}: {total:.1f} ms exceeds budget of {max_ms:.1f} ms")
+
+        expected = baseline.get(target)
+        if isinstance(expected, (int, float)):
+            expected = {"total_ms": expected}
+        for key, unit, slack in (("total_ms", "ms", slack_ms), ("rss_mb", "MB", 0.0)):
+            if not expected or expected.get(key) is None or result[key] is None:
+                continue
+            allowed = expected[key] * (1 + tolerance) + slack
+            if result[key] > allowed:
+                failures.append(
+                    f"{target}: {key} {result[key]:.1f} {unit} exceeds baseline {expected[key]:.1f} {unit} "
+                    f"(allowed {allowed:.1f} {unit})"
+                )
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", help="Function to profile (repeatable). Defaults to all.")
+    parser.add_argument("--top", type=int, default=15, help="Modules to list per target.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per target; the fastest is kept.")
+    parser.add_argument("--baseline", help="JSON file written by --save-baseline to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed fractional regression over baseline.")
+    parser.add_argument("--slack-ms", type=float, default=25.0, help="Absolute allowance added to each baseline.")
+    parser.add_argument("--max-ms", type=float, help="Absolute per-target budget.")
+    parser.add_argument("--save-baseline", help="Write the measured totals to this JSON file.")
+    args = parser.parse_args(argv)
+
+    results = [best_of(target, args.repeat) for target in (args.target or ENTRY_POINTS)]
+    for result in results:
+        print_report(result, args.top)
+
+    if args.save_baseline:
+        totals = {
+            r["target"]: {key: round(r[key], 1) for key in ("total_ms", "cold_start_ms", "rss_mb")}
+            for r in results if r["error"] is None
+        }
+        with open(args.save_baseline, "w") as f:
+            json.dump({**totals, "measured_with": measured_with()}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline for {len(totals)} target(s) to {args.save_baseline}")
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("measured_with", measured_with()) != measured_with():
+            print(f"Note: the baseline was measured with {baseline['measured_with']}, not {measured_with()}.")
+    if args.baseline or args.max_ms is not None:
+        failures = check_regressions(results, baseline, args.tolerance, args.slack_ms, args.max_ms)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Re-scores the stored reports' red flags after RULES in
+functions/appraise/red_flags.py change.
+
+Reports with structured_data are read in pages of --batch-size, every page is
+evaluated in one pass of the rule engine, and only reports whose red_flags
+changed are written back (in Firestore batches of up to 500 writes). Sale ages
+are measured from each report's stored effective date; reports stored before
+it was recorded use their upload time instead.
+
+Usage (from the repository root, with application default credentials):
+
+    python scripts/rescore_red_flags.py --dry-run
+    python scripts/rescore_red_flags.py --batch-size 2000 --limit 10000
+
+Only red_flags is rewritten; results derived from it (citations, the dispute
+letter and its compliance review) keep what they were generated from until the
+report is run again.
+"""
+import argparse
+import os
+import sys
+import time
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "functions")
+sys.path.insert(0, FUNCTIONS_DIR)
+
+from appraise.core import get_db  # noqa: E402
+from appraise.red_flags import evaluate  # noqa: E402
+
+MAX_BATCH_WRITES = 500
+
+
+def report_pages(batch_size, limit=None):
+    """Yields lists of report snapshots holding structured_data, in document order."""
+    query = get_db().collection('reports').select(['structured_data', 'red_flags', 'timestamp']).order_by('__name__')
+    read = 0
+    last = None
+    while limit is None or read < limit:
+        page_query = query.limit(min(batch_size, limit - read) if limit else batch_size)
+        if last is not None:
+            page_query = page_query.start_after(last)
+        page = list(page_query.stream())
+        if not page:
+            return
+        read += len(page)
+        last = page[-1]
+        yield [snapshot for snapshot in page if isinstance((snapshot.to_dict() or {}).get('structured_data'), dict)]
+
+
+def rescore_page(snapshots, dry_run):
+    """Evaluates one page of reports together and writes back the changed red flags."""
+    reports = [snapshot.to_dict() for snapshot in snapshots]
+    scored = evaluate(
+        [report['structured_data'] for report in reports],
+        as_of=[report.get('timestamp') or snapshot.create_time for report, snapshot in zip(reports, snapshots)],
+    )
+    changed = [
+        (snapshot, red_flags) for snapshot, report, red_flags in zip(snapshots, reports, scored)
+        if report.get('red_flags') != red_flags
+    ]
+    if dry_run:
+        return len(changed)
+
+    for start in range(0, len(changed), MAX_BATCH_WRITES):
+        batch = get_db().batch()
+        for snapshot, red_flags in changed[start:start + MAX_BATCH_WRITES]:
+            batch.update(snapshot.reference, {'red_flags': red_flags})
+        batch.commit()
+    return len(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="reports evaluated per pass")
+    parser.add_argument("--limit", type=int, help="stop after reading this many reports")
+    parser.add_argument("--dry-run", action="store_true", help="count changed reports without writing")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    scored = changed = 0
+    for snapshots in report_pages(args.batch_size, args.limit):
+        changed += rescore_page(snapshots, args.dry_run)
+        scored += len(snapshots)
+        print(f"{scored} reports scored, {changed} changed")
+    verb = "would change" if args.dry_run else "changed"
+    print(f"Done in {time.perf_counter() - start:.1f} s: {scored} reports scored, {changed} {verb}.")
+
+
+if __name__ == "__main__":
+    main()
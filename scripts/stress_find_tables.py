@@ -0,0 +1,160 @@
+"""
+Stress-tests concurrent page.find_tables calls: pages of a PDF are searched for
+tables from many threads at once, and every result must equal the one found
+serially for that page.
+
+Usage (from the repository root):
+
+    python scripts/stress_find_tables.py report.pdf
+    python scripts/stress_find_tables.py report.pdf --threads 16 --rounds 5 --strategy lines lines_strict
+    python scripts/stress_find_tables.py report.pdf --pymupdf4llm
+
+Each thread opens its own Document (PyMuPDF documents must not be shared
+between threads) and works through the pages in a shuffled order, while plain
+text extractions run alongside to check that table detection no longer changes
+how other threads see the page text. The serial pass also checks the small
+glyph bboxes the table code derives against those MuPDF itself returns with
+TOOLS.set_small_glyph_heights(True). With --pymupdf4llm, pymupdf4llm is
+imported first, which switches quad corrections off as it does in the
+functions. The script exits with status 1 if any result differs.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "functions")
+sys.path.insert(0, FUNCTIONS_DIR)
+
+import pymupdf  # noqa: E402
+from pymupdf import table  # noqa: E402
+
+
+def find_tables(page, strategy):
+    """The tables of a page as comparable values: bbox, cells, header and text."""
+    return [
+        (tab.bbox, tab.cells, tab.header.names, tab.header.external, tab.extract())
+        for tab in page.find_tables(strategy=strategy).tables
+    ]
+
+
+def extract_text(page):
+    """The page's characters and their bboxes, as a plain extraction sees them."""
+    return [
+        (char["c"], char["bbox"])
+        for block in page.get_text("rawdict")["blocks"]
+        for line in block.get("lines", ())
+        for span in line["spans"]
+        for char in span["chars"]
+    ]
+
+
+def small_glyphs(page):
+    """The page's characters and small glyph bboxes, as the table code derives them."""
+    return [
+        (char["c"], char["bbox"])
+        for line in table.get_text_lines(page, table.TEXTFLAGS_TEXT)
+        for span in line["spans"]
+        for char in span["chars"]
+    ]
+
+
+def mupdf_small_glyphs(page):
+    """The page's characters and small glyph bboxes, as MuPDF returns them."""
+    pymupdf.TOOLS.set_small_glyph_heights(True)
+    try:
+        lines = [
+            line
+            for block in page.get_text("rawdict", flags=table.TEXTFLAGS_TEXT)["blocks"]
+            for line in block.get("lines", ())
+        ]
+    finally:
+        pymupdf.TOOLS.set_small_glyph_heights(False)
+    return [
+        (char["c"], char["bbox"])
+        for line in lines
+        for span in line["spans"]
+        for char in span["chars"]
+        if table.rects_overlap(char["bbox"], page.rect)
+    ]
+
+
+def same_glyphs(a, b, tolerance=1e-3):
+    """Whether two character lists agree, bboxes to within tolerance."""
+    return len(a) == len(b) and all(
+        c1 == c2 and all(abs(x1 - x2) <= tolerance for x1, x2 in zip(bbox1, bbox2))
+        for (c1, bbox1), (c2, bbox2) in zip(a, b)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", help="PDF to search for tables")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent threads")
+    parser.add_argument("--rounds", type=int, default=3, help="times every page is searched per strategy")
+    parser.add_argument("--strategy", nargs="+", default=["lines", "lines_strict"],
+                        help="find_tables strategies to run")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the task order")
+    parser.add_argument("--pymupdf4llm", action="store_true",
+                        help="import pymupdf4llm first, as the functions do")
+    args = parser.parse_args()
+    if args.pymupdf4llm:
+        import pymupdf4llm  # noqa: F401
+
+    with open(args.pdf, "rb") as f:
+        pdf_bytes = f.read()
+
+    start = time.perf_counter()
+    expected = {}
+    glyph_mismatches = []
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        page_count = doc.page_count
+        for pno in range(page_count):
+            if not same_glyphs(small_glyphs(doc[pno]), mupdf_small_glyphs(doc[pno])):
+                glyph_mismatches.append(pno)
+            expected[pno, "get_text"] = extract_text(doc[pno])
+            for strategy in args.strategy:
+                expected[pno, strategy] = find_tables(doc[pno], strategy)
+    serial_s = time.perf_counter() - start
+    table_count = sum(len(expected[pno, strategy]) for pno in range(page_count) for strategy in args.strategy)
+    print(f"{args.pdf}: {page_count} pages, {table_count} tables per round; serial pass {serial_s:.2f} s")
+    print(f"quad corrections {'off' if pymupdf.TOOLS.unset_quad_corrections() else 'on'}: "
+          f"small glyph bboxes differ from MuPDF's on {len(glyph_mismatches)} pages")
+
+    tasks = [(pno, kind) for pno in range(page_count) for kind in ["get_text"] + args.strategy] * args.rounds
+    random.Random(args.seed).shuffle(tasks)
+
+    local = threading.local()
+
+    def run(task):
+        pno, kind = task
+        if not hasattr(local, "doc"):
+            local.doc = pymupdf.open(stream=pdf_bytes, filetype="pdf")
+        page = local.doc[pno]
+        result = extract_text(page) if kind == "get_text" else find_tables(page, kind)
+        return task, result == expected[task]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        results = list(executor.map(run, tasks))
+    concurrent_s = time.perf_counter() - start
+
+    mismatched = sorted({task for task, ok in results if not ok})
+    print(f"{len(tasks)} tasks on {args.threads} threads in {concurrent_s:.2f} s: "
+          f"{len(tasks) - sum(1 for _, ok in results if not ok)} matched the serial result")
+    if pymupdf.TOOLS.set_small_glyph_heights():
+        print("Small glyph heights were left switched on.")
+        sys.exit(1)
+    for pno in glyph_mismatches:
+        print(f"page {pno}: small glyph bboxes differ from MuPDF's")
+    for pno, kind in mismatched:
+        print(f"page {pno}: {kind} differs from the serial result")
+    if glyph_mismatches or mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()